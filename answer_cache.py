@@ -0,0 +1,133 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class AnswerCache:
+    """Two-level cache of RAG answers, partitioned by filter and k
+
+    Level one matches the normalized question exactly; level two reuses the query embedding and
+    accepts a cached answer whose question is at least similarity_threshold cosine-similar.
+    Entries expire after ttl seconds and the least recently used entry is evicted past max_entries.
+    """
+
+    _punctuation = re.compile(r"[^\w\s]")
+    _whitespace = re.compile(r"\s+")
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600, similarity_threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._partitions = {}
+        self._matrices = {}
+        self._lock = threading.Lock()
+        # Bumped by clear(); answers computed before a clear are not stored after it
+        self.generation = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def normalize(self, question: str) -> str:
+        question = self._punctuation.sub(" ", question.lower())
+        return self._whitespace.sub(" ", question).strip()
+
+    @staticmethod
+    def partition(filter_dict: Optional[Dict], k: int) -> str:
+        return json.dumps({"filter": filter_dict or {}, "k": k}, sort_keys=True, default=str)
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expired(self, entry: Dict) -> bool:
+        return time.monotonic() - entry["created"] > self.ttl
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        partition = key[0]
+        self._partitions.get(partition, set()).discard(key)
+        self._matrices.pop(partition, None)
+        return entry
+
+    def get_exact(self, question: str, filter_dict: Optional[Dict], k: int) -> Optional[Dict[str, Any]]:
+        """Return the cached answer for the same normalized question and filter, if fresh"""
+        key = (self.partition(filter_dict, k), self.normalize(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return dict(entry["result"], cache="exact")
+
+    def get_similar(self, question: str, filter_dict: Optional[Dict], k: int,
+                    query_vector: List[float]) -> Optional[Dict[str, Any]]:
+        """Return the cached answer of the most similar question in the same partition, if close enough"""
+        partition = self.partition(filter_dict, k)
+        vector = self._unit(query_vector)
+
+        with self._lock:
+            keys = [key for key in self._partitions.get(partition, ()) if not self._expired(self._entries[key])]
+            if keys:
+                matrix = self._matrices.get(partition)
+                if matrix is None or matrix[0] != keys:
+                    matrix = (keys, np.stack([self._entries[key]["vector"] for key in keys]))
+                    self._matrices[partition] = matrix
+                scores = matrix[1] @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    key = keys[best]
+                    self._entries.move_to_end(key)
+                    self.semantic_hits += 1
+                    return dict(self._entries[key]["result"], cache="semantic")
+
+            self.misses += 1
+            return None
+
+    def put(self, question: str, filter_dict: Optional[Dict], k: int, result: Dict[str, Any],
+            query_vector: List[float] = None, generation: int = None):
+        partition = self.partition(filter_dict, k)
+        key = (partition, self.normalize(question))
+        vector = self._unit(query_vector) if query_vector is not None else None
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {"result": result, "vector": vector, "created": time.monotonic()}
+            if vector is not None:
+                self._partitions.setdefault(partition, set()).add(key)
+                self._matrices.pop(partition, None)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        """Drop every entry, e.g. after the knowledge base changed"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._partitions.clear()
+            self._matrices.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0
+            }
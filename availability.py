@@ -0,0 +1,48 @@
+import logging
+from typing import Any, Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class AvailabilityClient:
+    """Client for a live hotel availability service
+
+    Expects GET {base_url}/availability?city=&checkin=&checkout=&adults=&children= to answer
+    {"hotels": [{"name": ..., "price": ..., "rooms_left": ...}, ...]}.
+    """
+
+    def __init__(self, base_url: str, session: requests.Session = None, timeout: float = 5.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def lookup(self, city: str, check_in: str, check_out: str, adults: int = 2,
+               children: int = 0) -> List[Dict[str, Any]]:
+        response = self.session.get(
+            f"{self.base_url}/availability",
+            params={"city": city, "checkin": check_in, "checkout": check_out,
+                    "adults": adults, "children": children},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json().get("hotels", [])
+
+
+def format_availability(hotels: List[Dict[str, Any]], limit: int = 5) -> str:
+    """Render live availability rows as a markdown list"""
+    if not hotels:
+        return "No rooms reported available for those dates."
+
+    lines = []
+    for hotel in hotels[:limit]:
+        details = [str(hotel[key]) for key in ["price"] if hotel.get(key)]
+        if hotel.get("rooms_left") is not None:
+            details.append(f"{hotel['rooms_left']} rooms left")
+        lines.append(f"- **{hotel['name']}**" + (f" — {' · '.join(details)}" if details else ""))
+    return "\n".join(lines)
@@ -0,0 +1,154 @@
+"""Query embedding under concurrent sessions, one call per query vs micro-batched.
+
+A fake provider stands in for the embedding API: each call costs a fixed
+round trip plus a little per text, and only a few calls may run at once (as a
+rate-limited API allows). Simulated sessions embed questions concurrently,
+first with a provider call per question, then through EmbeddingBatcher. A last
+run floods a small queue to show backpressure rejecting requests instead of
+queueing them without bound. Before timing, batched query vectors are checked
+against embed_query for the fake provider and for the Google embeddings client
+as ragsystem wraps it (its API call replaced by a local function that encodes
+the task type), so queries, and the intent router's examples, are never
+embedded as documents.
+
+    python bench_embedding_batcher.py --sessions 64 --queries 10 --latency 0.08
+"""
+import argparse
+import hashlib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from unittest import mock
+
+from embedding_batcher import EmbeddingBatcher, EmbeddingQueueFull
+from embeddings import CachedEmbeddings, EmbeddingCache, HashEmbeddings
+from intent_router import IntentRouter
+
+
+class FakeProvider(HashEmbeddings):
+    """HashEmbeddings behind a simulated network round trip and a concurrency limit"""
+
+    def __init__(self, latency: float, per_text: float, max_concurrent: int):
+        super().__init__()
+        self.latency = latency
+        self.per_text = per_text
+        self.slots = threading.Semaphore(max_concurrent)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self, texts: List[str]) -> List[List[float]]:
+        with self.slots:
+            with self._lock:
+                self.calls += 1
+            time.sleep(self.latency + self.per_text * len(texts))
+            return [self._embed(text) for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._call(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call([text])[0]
+
+
+def check_batched_queries(name: str, embeddings, texts: List[str]) -> bool:
+    """Whether the batcher returns exactly what embed_query does for each text"""
+    batcher = EmbeddingBatcher(embeddings, workers=1)
+    with ThreadPoolExecutor(max_workers=len(texts)) as executor:
+        batched = list(executor.map(batcher.embed_query, texts))
+    batcher.close()
+    mismatched = [text for text, vector in zip(texts, batched) if vector != embeddings.embed_query(text)]
+    print(f"{name:<10} batched query vectors {'differ for ' + repr(mismatched[0]) if mismatched else 'match embed_query'}")
+    return not mismatched
+
+
+def check_google_batching(texts: List[str]) -> bool:
+    """Run the check on the Google client as ragsystem wraps it, with the API call answered locally"""
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    task_types = set()
+
+    def embed_content(model, content, task_type, **kwargs):
+        # A vector per (task type, text), so texts embedded with another task type cannot match
+        task_types.add(task_type)
+        return {"embedding": [list(hashlib.sha256(f"{task_type}:{text}".encode("utf-8")).digest()[:8])
+                              for text in content]}
+
+    client = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key="offline-check")
+    embeddings = CachedEmbeddings(client, cache=EmbeddingCache(":memory:"))
+    with mock.patch("langchain_google_genai.embeddings.genai.embed_content", embed_content):
+        matched = check_batched_queries("google", embeddings, texts)
+        # The router's examples are routed against live questions, so they are embedded as queries too
+        IntentRouter(EmbeddingBatcher(embeddings))
+    if task_types != {"retrieval_query"}:
+        print(f"google     queries embedded with task types {sorted(task_types)}, not retrieval_query")
+        return False
+    return matched
+
+
+def run_sessions(embed_query, sessions: int, queries: int):
+    """Return (wall time, sorted per-query latencies, rejected count)"""
+    latencies = []
+    rejected = 0
+    lock = threading.Lock()
+
+    def session(i):
+        nonlocal rejected
+        for j in range(queries):
+            start = time.perf_counter()
+            try:
+                embed_query(f"session {i} question {j} about tawaf and hotels near the haram")
+            except EmbeddingQueueFull:
+                with lock:
+                    rejected += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(session, range(sessions)))
+    return time.perf_counter() - start, sorted(latencies), rejected
+
+
+def report(name: str, provider: FakeProvider, wall: float, latencies: List[float], rejected: int = 0):
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    print(f"{name:<10} {len(latencies) / wall:7.0f} queries/s  p50 {p50:6.1f}ms  p95 {p95:6.1f}ms  "
+          f"{provider.calls:5d} provider calls  {rejected} rejected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.08, help="provider round trip in seconds")
+    parser.add_argument("--per-text", type=float, default=0.001, help="provider time per text in seconds")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="provider calls allowed at once")
+    args = parser.parse_args()
+
+    texts = [f"question {i} about tawaf and hotels near the haram" for i in range(8)]
+    if not (check_batched_queries("fake", FakeProvider(0.0, 0.0, 8), texts) and check_google_batching(texts)):
+        sys.exit(1)
+
+    provider = FakeProvider(args.latency, args.per_text, args.max_concurrent)
+    report("direct", provider, *run_sessions(provider.embed_query, args.sessions, args.queries))
+
+    provider = FakeProvider(args.latency, args.per_text, args.max_concurrent)
+    batcher = EmbeddingBatcher(provider, workers=args.max_concurrent)
+    report("batched", provider, *run_sessions(batcher.embed_query, args.sessions, args.queries))
+    stats = batcher.stats()
+    print(f"  mean batch {stats['mean_batch_size']:.1f}, largest {stats['max_batch_size']}, "
+          f"mean queue wait {stats['mean_queue_wait_ms']:.1f}ms")
+    batcher.close()
+
+    # Backpressure: a queue far smaller than the offered load rejects quickly instead of growing
+    provider = FakeProvider(args.latency, args.per_text, 1)
+    batcher = EmbeddingBatcher(provider, max_batch_size=4, max_queue=8, submit_timeout=0.05, workers=1)
+    report("overload", provider, *run_sessions(batcher.embed_query, args.sessions, args.queries))
+    print(f"  queue capacity {batcher.stats()['queue_capacity']}, rejected {batcher.stats()['rejected']}")
+    batcher.close()
+
+
+if __name__ == "__main__":
+    main()
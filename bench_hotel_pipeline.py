@@ -0,0 +1,114 @@
+"""Latency of the concurrent hotel-answer pipeline against local stub services.
+
+Runs the three branches of a hotel answer -- the database/RAG lookup (a stub
+with fixed latency), UmrahMe link generation and a live availability lookup
+served by a local HTTP stub -- first one after another, then through
+pipeline.run_branches. A last run makes the availability stub slower than its
+branch timeout to show the partial answer arriving on time.
+
+    python bench_hotel_pipeline.py --rag-latency 0.8 --availability-latency 0.5
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from availability import AvailabilityClient, format_availability
+from pipeline import Branch, run_branches
+
+
+class StubAvailability(BaseHTTPRequestHandler):
+    latency = 0.5
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        params = parse_qs(urlsplit(self.path).query)
+        city = params.get("city", ["makkah"])[0]
+        body = json.dumps({"hotels": [
+            {"name": f"{city.title()} Hotel {i}", "price": f"SAR {400 + 50 * i}", "rooms_left": 5 - i}
+            for i in range(3)
+        ]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubRAG:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def query_hotels(self, **filters):
+        time.sleep(self.latency)
+        return {"answer": f"- **Stub hotel** matching {filters}", "sources": []}
+
+
+def build_branches(rag: StubRAG, client: AvailabilityClient, availability_timeout: float):
+    filters = {"city": "makkah", "has_kaaba_view": True}
+    return [
+        Branch("hotels", lambda: rag.query_hotels(**filters), timeout=20.0,
+               fallback={"answer": "Our hotel database is not responding right now."}),
+        Branch("link", lambda: ("https://www.umrahme.com/hotel/en-ae/listing?destinationId=235565", "Makkah"),
+               timeout=2.0, fallback=(None, None)),
+        Branch("availability", lambda: client.lookup("makkah", "2027-07-10", "2027-07-14", 4),
+               timeout=availability_timeout)
+    ]
+
+
+def run_serial(branches):
+    start = time.perf_counter()
+    for branch in branches:
+        branch.func()
+    return time.perf_counter() - start
+
+
+def run_concurrent(branches):
+    start = time.perf_counter()
+    results = run_branches(branches)
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rag-latency", type=float, default=0.8)
+    parser.add_argument("--availability-latency", type=float, default=0.5)
+    parser.add_argument("--availability-timeout", type=float, default=1.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    StubAvailability.latency = args.availability_latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAvailability)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = AvailabilityClient(f"http://127.0.0.1:{server.server_address[1]}", timeout=10)
+    rag = StubRAG(args.rag_latency)
+
+    # Warm the connection pool so both runs pay the same connection cost
+    client.lookup("makkah", "2027-07-10", "2027-07-14")
+
+    serial = run_serial(build_branches(rag, client, args.availability_timeout))
+    concurrent, results = run_concurrent(build_branches(rag, client, args.availability_timeout))
+    print(f"serial      {serial:6.3f}s")
+    print(f"concurrent  {concurrent:6.3f}s  ({serial / concurrent:.1f}x)")
+    for result in results.values():
+        print(f"  {result.name:<13} {result.elapsed:6.3f}s  {'ok' if result.ok else result.error}")
+    print(format_availability(results["availability"].value))
+
+    # An availability service slower than its budget must not hold up the answer
+    StubAvailability.latency = args.availability_timeout * 3
+    slow, results = run_concurrent(build_branches(rag, client, args.availability_timeout))
+    print(f"\nslow availability service: answered in {slow:.3f}s "
+          f"(availability {'ok' if results['availability'].ok else results['availability'].error}, "
+          f"hotels {'ok' if results['hotels'].ok else 'fallback'})")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Recall, memory and latency of the quantized serving indexes against the flat index.
+
+Builds one synthetic corpus with the offline HashEmbeddings and saves it once
+per index type (flat, sq8, ivfpq); the exact neighbours from the flat index are
+the ground truth. Each type is then loaded the way serving does (memory-mapped,
+read-only) in a fresh process. That process reports recall@k of the index, the
+latency of an unfiltered search (index plus docstore fetch) and of a filtered
+one, and its memory growth. Private memory (RssAnon) is paid by every Streamlit
+process; file-backed pages (RssFile) are shared through the page cache by all
+processes mapping the same version.
+
+    python bench_index.py --documents 20000 --queries 200 --k 5
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+INDEX_TYPES = ["flat", "sq8", "ivfpq"]
+
+# Topics with their own vocabulary give the corpus neighbourhoods worth recalling
+TOPICS = {
+    "ritual_guide": "tawaf sai ihram miqat talbiyah kaaba safa marwah zamzam niyyah halq taqsir dua",
+    "hotel": "hotel room suite view shuttle breakfast walking distance clock tower stars price checkin",
+    "destination_info": "quba uhud museum market mountain cave hira thawr history mosque visit ziyarat",
+    "user_review": "experience crowd family tips advice wheelchair heat queue guide group booked trip",
+}
+COMMON_WORDS = "umrah makkah madinah haram prayer pilgrims the and for with near during after".split()
+
+LOAD_SCRIPT = """
+import json, sys, time
+import numpy as np
+from langchain_community.vectorstores import FAISS
+import index_storage
+from embeddings import HashEmbeddings
+from ragsystem import UmrahRAGSystem
+
+def rss_mb():
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("RssAnon", "RssFile"):
+                fields[name] = int(value.split()[0]) / 1024
+    return fields
+
+workdir, index_type, k = sys.argv[1], sys.argv[2], int(sys.argv[3])
+queries = np.load(workdir + "/queries.npy")
+truth = np.load(workdir + "/truth.npy")
+rag = UmrahRAGSystem("offline", embeddings=HashEmbeddings(), llm=object(),
+                     embedding_cache_path=workdir + "/embeddings.sqlite")
+
+before = rss_mb()
+start = time.perf_counter()
+assert rag.load_vector_store(workdir + "/" + index_type, mmap=True)
+load = time.perf_counter() - start
+store = rag.vector_store
+
+_, found = store.index.search(queries, k)
+recall = float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found.tolist(), truth.tolist())]))
+
+def timed(search):
+    latencies = []
+    for query in queries.tolist():
+        start = time.perf_counter()
+        docs = search(query)
+        latencies.append(time.perf_counter() - start)
+        assert docs
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95)] * 1000
+
+search_p50, search_p95 = timed(lambda query: store.similarity_search_by_vector(query, k=k))
+filtered_p50, _ = timed(lambda query: rag.metadata_index.search(store, query, k, {"type": "hotel"}))
+after = rss_mb()
+
+print(json.dumps({
+    "load": load, "recall": recall, "search_p50": search_p50, "search_p95": search_p95,
+    "filtered_p50": filtered_p50, "anon_mb": after["RssAnon"] - before["RssAnon"],
+    "file_mb": after["RssFile"] - before["RssFile"]
+}))
+"""
+
+
+def synthetic_text(rng: random.Random, topic: str, words: int) -> str:
+    vocabulary = TOPICS[topic].split()
+    return " ".join(rng.choice(vocabulary) if rng.random() < 0.6 else rng.choice(COMMON_WORDS)
+                    for _ in range(words))
+
+
+def synthetic_documents(count: int, seed: int = 0):
+    from langchain_core.documents import Document
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    for i in range(count):
+        topic = topics[i % len(topics)]
+        yield Document(
+            page_content=synthetic_text(rng, topic, 60),
+            metadata={"type": topic, "doc_id": f"synthetic:{i}", "city": rng.choice(["makkah", "madina"])}
+        )
+
+
+def build(workdir: str, documents: int, queries: int, k: int):
+    """Save the corpus once per index type and the flat index's exact neighbours of the queries"""
+    from embeddings import HashEmbeddings
+    from ragsystem import UmrahRAGSystem
+
+    rag = UmrahRAGSystem("offline", embeddings=HashEmbeddings(), llm=object(),
+                         embedding_cache_path=os.path.join(workdir, "embeddings.sqlite"))
+    rag.create_vector_store(synthetic_documents(documents))
+    for index_type in INDEX_TYPES:
+        rag.save_vector_store(os.path.join(workdir, index_type), index_type=index_type)
+
+    rng = random.Random(1)
+    texts = [synthetic_text(rng, rng.choice(list(TOPICS)), 12) for _ in range(queries)]
+    vectors = np.asarray(rag.embeddings.embed_documents(texts), dtype=np.float32)
+    _, truth = rag.vector_store.index.search(vectors, k)
+    np.save(os.path.join(workdir, "queries.npy"), vectors)
+    np.save(os.path.join(workdir, "truth.npy"), truth)
+
+
+def serving_size_mb(path: str) -> float:
+    """Size of the files a serving process maps or reads for this version"""
+    with open(os.path.join(path, "artifact.json"), "r", encoding="utf-8") as f:
+        artifact = json.load(f)
+    if artifact.get("serving_index"):
+        names = [artifact["serving_index"], "docstore.sqlite"]
+    else:
+        names = ["index.faiss", "index.pkl"]
+    return sum(os.path.getsize(os.path.join(path, name)) for name in names) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        build(workdir, args.documents, args.queries, args.k)
+        print(f"\n{args.documents} documents, {args.queries} queries, k={args.k}")
+        print(f"{'index':<7} {'on disk':>8} {'load':>7} {'recall@k':>9} {'search p50/p95':>15} "
+              f"{'filtered p50':>13} {'private':>8} {'shared':>8}")
+        for index_type in INDEX_TYPES:
+            result = subprocess.run(
+                [sys.executable, "-c", LOAD_SCRIPT, workdir, index_type, str(args.k)],
+                cwd=HERE, capture_output=True, text=True, check=True
+            )
+            run = json.loads(result.stdout)
+            print(f"{index_type:<7} {serving_size_mb(os.path.join(workdir, index_type)):6.1f}MB "
+                  f"{run['load']:6.3f}s {run['recall']:9.3f} "
+                  f"{run['search_p50']:6.2f}/{run['search_p95']:5.2f}ms {run['filtered_p50']:10.2f}ms "
+                  f"{run['anon_mb']:6.1f}MB {run['file_mb']:6.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
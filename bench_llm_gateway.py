@@ -0,0 +1,151 @@
+"""LLM calls under concurrent sessions, direct to one provider vs through LLMGateway.
+
+Fake chat models stand in for the providers: each answer takes a lognormal
+time around a median, a small share of calls hang far longer (a heavy tail),
+some fail outright, and only a few calls may run at once. Simulated sessions
+ask questions concurrently, first straight to the primary, then through the
+gateway with timeouts, retries and fallback, then with hedging as well. The
+per-provider histograms and counters show where each answer came from.
+
+    python bench_llm_gateway.py --sessions 32 --queries 10 --median 0.3
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List
+
+from llm_gateway import LLMGateway, Provider, ProviderUnavailable
+
+
+@dataclass
+class Message:
+    content: str
+
+
+class FakeChatModel:
+    """A chat model with lognormal latency, occasional stalls and failures, and a concurrency limit"""
+
+    def __init__(self, name: str, median: float, stall_rate: float, stall: float, failure_rate: float,
+                 max_concurrent: int, seed: int = 0):
+        self.name = name
+        self.median = median
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.failure_rate = failure_rate
+        self.slots = threading.Semaphore(max_concurrent)
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _latency(self) -> float:
+        with self._lock:
+            if self.random.random() < self.stall_rate:
+                return self.stall
+            failed = self.random.random() < self.failure_rate
+            latency = self.median * self.random.lognormvariate(0, 0.3)
+        if failed:
+            raise ConnectionError(f"{self.name}: 503 service unavailable")
+        return latency
+
+    def invoke(self, prompt) -> Message:
+        with self.slots:
+            time.sleep(self._latency())
+            return Message(f"{self.name} answer to: {prompt}")
+
+    def stream(self, prompt):
+        with self.slots:
+            time.sleep(self._latency())
+            for word in f"{self.name} answer to: {prompt}".split():
+                time.sleep(0.005)
+                yield Message(word + " ")
+
+
+def run_sessions(invoke, sessions: int, queries: int):
+    """Return (wall time, sorted per-query latencies, failed count)"""
+    latencies = []
+    failures = 0
+    lock = threading.Lock()
+
+    def session(i):
+        nonlocal failures
+        for j in range(queries):
+            start = time.perf_counter()
+            try:
+                invoke(f"session {i} question {j}")
+            except (ProviderUnavailable, ConnectionError):
+                with lock:
+                    failures += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(session, range(sessions)))
+    return time.perf_counter() - start, sorted(latencies), failures
+
+
+def report(name: str, wall: float, latencies: List[float], failures: int):
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else 0.0
+    print(f"{name:<10} {len(latencies) / wall:6.1f} answers/s  p50 {percentile(0.5):7.0f}ms  "
+          f"p95 {percentile(0.95):7.0f}ms  p99 {percentile(0.99):7.0f}ms  max {percentile(1.0):7.0f}ms  "
+          f"{failures} failed")
+
+
+def report_providers(gateway: LLMGateway):
+    for name, stats in gateway.stats().items():
+        latency = stats.pop("latency")
+        counts = ", ".join(f"{event} {count}" for event, count in sorted(stats.items()) if event != "in_flight")
+        percentiles = "  ".join(f"{q} {latency[q] * 1000:.0f}ms" for q in ("p50", "p95", "p99") if latency[q])
+        print(f"  {name:<9} {counts}  {percentiles}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--median", type=float, default=0.3, help="median answer time in seconds")
+    parser.add_argument("--stall-rate", type=float, default=0.03, help="share of calls that hang")
+    parser.add_argument("--stall", type=float, default=8.0, help="how long a hanging call takes, in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--max-concurrent", type=int, default=16, help="calls each provider allows at once")
+    parser.add_argument("--timeout", type=float, default=2.0, help="gateway timeout per attempt in seconds")
+    parser.add_argument("--hedge-percentile", type=float, default=0.95)
+    parser.add_argument("--stream", action="store_true", help="stream answers instead of invoking")
+    args = parser.parse_args()
+    # Every failed attempt is logged as a warning; the counters below summarize them
+    logging.getLogger("llm_gateway").setLevel(logging.ERROR)
+
+    def providers():
+        models = [
+            FakeChatModel("primary", args.median, args.stall_rate, args.stall, args.failure_rate,
+                          args.max_concurrent, seed=1),
+            FakeChatModel("fallback", args.median * 1.5, args.stall_rate, args.stall, args.failure_rate,
+                          args.max_concurrent, seed=2)
+        ]
+        return [Provider(model.name, model, max_concurrent=args.max_concurrent, timeout=args.timeout,
+                         retries=1) for model in models]
+
+    def call(llm):
+        if args.stream:
+            return lambda prompt: "".join(chunk.content for chunk in llm.stream(prompt))
+        return lambda prompt: llm.invoke(prompt).content
+
+    direct = providers()[0].llm
+    report("direct", *run_sessions(call(direct), args.sessions, args.queries))
+
+    gateway = LLMGateway(providers(), backoff_base=0.05)
+    report("gateway", *run_sessions(call(gateway), args.sessions, args.queries))
+    report_providers(gateway)
+
+    gateway = LLMGateway(providers(), hedge_percentile=args.hedge_percentile, backoff_base=0.05)
+    report("hedged", *run_sessions(call(gateway), args.sessions, args.queries))
+    report_providers(gateway)
+
+
+if __name__ == "__main__":
+    main()
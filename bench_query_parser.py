@@ -0,0 +1,213 @@
+"""Property corpus and microbenchmark for QueryParser.
+
+Generates a seeded corpus of hotel queries from templates whose slots are known
+(city spellings, day-month and month-day ranges including cross-month and
+cross-year ones, ISO dates as the sidebar form writes them, "N nights", guest
+counts, star ratings, sort words and features), checks that the parser
+recovers every slot, then times it against the original slot work of
+handle_hotel_query (its keyword scans plus UmrahMeChecker.parse_query).
+
+    python bench_query_parser.py --cases 2000 --repeat 5
+"""
+import argparse
+import random
+import re
+import time
+from datetime import date, datetime, timedelta
+
+from query_parser import CITY_WORDS, FEATURE_WORDS, SORT_WORDS, QueryParser
+
+TODAY = date(2026, 10, 17)
+MONTH_NAMES = ["january", "february", "march", "april", "may", "june", "july",
+               "august", "september", "october", "november", "december"]
+ORDINALS = {1: "st", 2: "nd", 3: "rd", 21: "st", 22: "nd", 23: "rd", 31: "st"}
+
+
+def legacy_parse_query(query: str):
+    """The original UmrahMeChecker.parse_query, kept as the timing baseline"""
+    city = "makkah"
+    if any(word in query.lower() for word in ["madinah", "medina", "madina"]):
+        city = "madinah"
+    elif "jeddah" in query.lower():
+        city = "jeddah"
+    elif any(word in query.lower() for word in ["haram", "makkah", "mecca"]):
+        city = "makkah"
+
+    check_in = None
+    check_out = None
+
+    date_range_pattern = r'(\d{1,2})(?:st|nd|rd|th)?\s*[-to]+\s*(\d{1,2})(?:st|nd|rd|th)?\s+(\w+)'
+    range_match = re.search(date_range_pattern, query.lower())
+
+    if range_match:
+        day_start = int(range_match.group(1))
+        day_end = int(range_match.group(2))
+        month_name = range_match.group(3)
+
+        months = {
+            'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3,
+            'april': 4, 'apr': 4, 'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7,
+            'august': 8, 'aug': 8, 'september': 9, 'sep': 9, 'october': 10, 'oct': 10,
+            'november': 11, 'nov': 11, 'december': 12, 'dec': 12
+        }
+
+        month = months.get(month_name.lower(), datetime.now().month)
+        year = datetime.now().year
+
+        if month < datetime.now().month:
+            year += 1
+
+        check_in = f"{year}-{month:02d}-{day_start:02d}"
+        check_out = f"{year}-{month:02d}-{day_end:02d}"
+
+    if not check_in:
+        today = datetime.now()
+        check_in = today.strftime("%Y-%m-%d")
+        check_out = (today + timedelta(days=3)).strftime("%Y-%m-%d")
+
+    adults = 2
+    children = 0
+
+    people_pattern = r'(\d+)\s*(?:people|person|pax)'
+    people_match = re.search(people_pattern, query.lower())
+    if people_match:
+        adults = int(people_match.group(1))
+
+    return city, check_in, check_out, adults, children
+
+
+def legacy_hotel_slots(query: str):
+    """The slot work the original handle_hotel_query did per query: its own scans, then parse_query"""
+    query_lower = query.lower()
+    stars_match = re.search(r'(\d)\s*-?\s*stars?\b', query_lower)
+    sort_by = None
+    if any(word in query_lower for word in ["cheapest", "lowest price", "budget"]):
+        sort_by = "price"
+    elif any(word in query_lower for word in ["closest", "nearest"]):
+        sort_by = "distance"
+    features = {column for word, column in FEATURE_WORDS.items() if word in query_lower}
+    return legacy_parse_query(query), stars_match, sort_by, features
+
+
+def day(n: int, rng: random.Random) -> str:
+    return f"{n}{ORDINALS.get(n, 'th')}" if rng.random() < 0.5 else str(n)
+
+
+def make_case(rng: random.Random):
+    """Return (query, expected slots) for one random hotel query"""
+    expected = {}
+    parts = [rng.choice(["hotels", "find hotels", "show me hotels", "any rooms", "accommodation"])]
+
+    if rng.random() < 0.8:
+        spelling = rng.choice([word for word in CITY_WORDS if word != "haram"])
+        expected["city"] = CITY_WORDS[spelling]
+        parts.append(f"in {spelling.title() if rng.random() < 0.5 else spelling}")
+
+    style = rng.choice(["iso", "range", "cross", "month_first", "nights", None])
+    if style:
+        year = TODAY.year
+        month = rng.randint(1, 12)
+        if month < TODAY.month:
+            year += 1
+        start = date(year, month, rng.randint(1, 20))
+        if style == "cross":
+            start = date(year, month, 28)
+        end = start + timedelta(days=rng.randint(1, 9))
+        expected["check_in"], expected["check_out"] = start, end
+
+        if style == "iso":
+            parts.append(f"from {start.isoformat()} to {end.isoformat()}")
+        elif style == "range" and end.month == start.month:
+            separator = rng.choice(["-", " - ", " to "])
+            parts.append(f"from {day(start.day, rng)}{separator}{day(end.day, rng)} {MONTH_NAMES[month - 1]}")
+        elif style in ("range", "cross"):
+            parts.append(f"{day(start.day, rng)} {MONTH_NAMES[start.month - 1]} - "
+                         f"{day(end.day, rng)} {MONTH_NAMES[end.month - 1][:3]}")
+        elif style == "month_first" and end.month == start.month:
+            parts.append(f"{MONTH_NAMES[month - 1].title()} {start.day}-{end.day}")
+        elif style == "month_first":
+            parts.append(f"{MONTH_NAMES[start.month - 1]} {start.day} to {MONTH_NAMES[end.month - 1]} {end.day}")
+        else:
+            nights = (end - start).days
+            expected["nights"] = nights
+            parts.append(f"from {start.isoformat()} for {nights} night{'s' if nights > 1 else ''}")
+
+    if rng.random() < 0.6:
+        adults = rng.randint(1, 9)
+        expected["adults"] = adults
+        parts.append(f"for {adults} {rng.choice(['people', 'adults', 'guests', 'pax'])}")
+        if rng.random() < 0.4:
+            children = rng.randint(1, 4)
+            expected["children"] = children
+            parts.append(f"and {children} {rng.choice(['children', 'kids'])}")
+
+    if rng.random() < 0.4:
+        stars = rng.randint(1, 5)
+        expected["stars"] = stars
+        parts.append(rng.choice([f"{stars} star", f"{stars}-star", f"{stars} stars"]))
+
+    if rng.random() < 0.3:
+        word = rng.choice(list(SORT_WORDS))
+        expected["sort_by"] = SORT_WORDS[word]
+        parts.insert(0, word)
+
+    features = set(rng.sample(list(FEATURE_WORDS), rng.randint(0, 2)))
+    if features:
+        parts.append("with " + " and ".join(features))
+    expected["features"] = {FEATURE_WORDS[word] for word in features}
+
+    return " ".join(parts), expected
+
+
+def check_corpus(parser: QueryParser, cases):
+    """Return the cases whose parsed slots differ from the expected ones"""
+    failures = []
+    for query, expected in cases:
+        parsed = parser.parse(query, today=TODAY)
+        for slot in ["city", "check_in", "check_out", "nights", "adults", "children", "stars", "sort_by", "features"]:
+            want = expected.get(slot, set() if slot == "features" else None)
+            if getattr(parsed, slot) != want:
+                failures.append((query, slot, want, getattr(parsed, slot)))
+    return failures
+
+
+def time_per_call(function, queries, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            function(query)
+        best = min(best, time.perf_counter() - start)
+    return best / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = [make_case(rng) for _ in range(args.cases)]
+    query_parser = QueryParser()
+
+    failures = check_corpus(query_parser, cases)
+    print(f"Property corpus: {len(cases)} queries, {len(failures)} slot mismatches")
+    for query, slot, want, got in failures[:10]:
+        print(f"  {slot}: expected {want!r}, got {got!r}  <- {query}")
+
+    queries = [query for query, _ in cases]
+    parse_only = time_per_call(legacy_parse_query, queries, args.repeat)
+    legacy = time_per_call(legacy_hotel_slots, queries, args.repeat)
+    compiled = time_per_call(lambda query: query_parser.parse(query, today=TODAY), queries, args.repeat)
+    print(f"legacy parse_query alone        {parse_only:7.2f} µs/query  (city, one date form, adults)")
+    print(f"legacy hotel handler slot work  {legacy:7.2f} µs/query")
+    print(f"QueryParser.parse (all slots)   {compiled:7.2f} µs/query  ({legacy / compiled:.1f}x)")
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""End-to-end RAG benchmark over a synthetic corpus, fully offline.
+
+Generates a corpus in the scraped data schema (synthetic_corpus.py) at the
+given scale, then runs UmrahRAGSystem with the deterministic HashEmbeddings
+and a stub LLM whose first-token latency and token rate are configurable:
+
+- build: full index build from the scraped data file (time, chunks, peak RSS)
+- load: the serving path, a memory-mapped load of the saved index (time, RSS)
+- query: one question at a time at k=5 and k=10, without the answer cache;
+  retrieval is the time to the sources event, total includes the stub LLM
+- sessions: concurrent sessions asking questions at k=5
+
+Build and serving each run in a fresh process, so their memory is measured
+separately. Every run is appended to a JSONL history (bench_results.jsonl) and
+compared with the last run of the same configuration.
+
+    python bench_rag.py --scale 10 --queries 200 --sessions 8 --llm-latency 0.05
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import synthetic_corpus
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Results compared between runs, with whether lower is better
+TRACKED = {
+    "build.seconds": True, "build.peak_rss_mb": True, "load.seconds": True, "load.rss_mb": True,
+    "query.k5.retrieval_p50_ms": True, "query.k5.retrieval_p95_ms": True, "query.k5.total_p95_ms": True,
+    "query.k5.qps": False, "query.k10.retrieval_p50_ms": True, "query.k10.retrieval_p95_ms": True,
+    "query.k10.qps": False, "sessions.answers_per_s": False, "sessions.p95_ms": True
+}
+
+# Settings that change the numbers; only runs agreeing on all of them are compared
+CONFIG_KEYS = ["scale", "seed", "queries", "sessions", "session_queries", "llm_latency", "llm_tokens",
+               "llm_token_interval", "index_type"]
+
+
+class Chunk:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class StubLLM:
+    """Answers after a fixed first-token latency, then streams tokens at a fixed interval"""
+
+    def __init__(self, latency: float = 0.0, tokens: int = 40, token_interval: float = 0.0):
+        self.latency = latency
+        self.tokens = tokens
+        self.token_interval = token_interval
+
+    def _words(self, prompt: str) -> List[str]:
+        words = prompt.split()
+        return [words[i % len(words)] for i in range(self.tokens)] if words else ["answer"]
+
+    def invoke(self, prompt: str) -> Chunk:
+        time.sleep(self.latency + self.token_interval * self.tokens)
+        return Chunk(" ".join(self._words(prompt)))
+
+    def stream(self, prompt: str):
+        time.sleep(self.latency)
+        for word in self._words(prompt):
+            if self.token_interval:
+                time.sleep(self.token_interval)
+            yield Chunk(word + " ")
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def questions(count: int, seed: int):
+    """(question, filter) pairs: half unfiltered, the rest filtered as the chat handlers filter"""
+    rng = random.Random(seed)
+    filters = [None, None, {"type": "ritual_guide"}, {"type": "hotel", "city": "makkah"}]
+    topics = {None: "reddit_reviews", "ritual_guide": "rituals", "hotel": "hotels"}
+    result = []
+    for i in range(count):
+        filter_dict = filters[i % len(filters)]
+        topic = topics[filter_dict["type"] if filter_dict else None]
+        result.append((synthetic_corpus.sentence(rng, topic, rng.randint(4, 10)), filter_dict))
+    return result
+
+
+def make_rag(args, workdir: str):
+    from embeddings import HashEmbeddings
+    from ragsystem import UmrahRAGSystem
+    return UmrahRAGSystem("offline", embeddings=HashEmbeddings(),
+                          llm=StubLLM(args.llm_latency, args.llm_tokens, args.llm_token_interval),
+                          embedding_cache_path=os.path.join(workdir, "embeddings.sqlite"))
+
+
+def ask(rag, question: str, filter_dict: Dict, k: int):
+    """Return (retrieval seconds, total seconds) for one streamed answer"""
+    start = time.perf_counter()
+    retrieved = None
+    for event in rag.query_stream(question, k=k, filter_dict=filter_dict, use_cache=False):
+        if event["type"] == "sources":
+            retrieved = time.perf_counter() - start
+        elif event["type"] == "error":
+            raise RuntimeError(event["error"])
+    return retrieved, time.perf_counter() - start
+
+
+def phase_build(args, workdir: str) -> Dict:
+    data_file = os.path.join(workdir, "umrah_scraped_data.jsonl.gz")
+    start = time.perf_counter()
+    counts = synthetic_corpus.write(data_file, args.scale, args.seed)
+    generated = time.perf_counter() - start
+
+    rag = make_rag(args, workdir)
+    before = rss_mb()
+    start = time.perf_counter()
+    assert rag.build_rag_system(path=os.path.join(workdir, "index"), data_file=data_file,
+                                index_type=args.index_type)
+    return {
+        "records": sum(counts.values()),
+        "generate_seconds": generated,
+        "seconds": time.perf_counter() - start,
+        "chunks": rag.vector_store.index.ntotal,
+        "rss_mb": rss_mb() - before,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def phase_serve(args, workdir: str) -> Dict:
+    rag = make_rag(args, workdir)
+    before = rss_mb()
+    start = time.perf_counter()
+    assert rag.load_vector_store(os.path.join(workdir, "index"), mmap=True)
+    results = {"load": {"seconds": time.perf_counter() - start, "rss_mb": rss_mb() - before}}
+
+    asked = questions(args.queries, args.seed + 1)
+    # Warm up the lazily started workers and the first page faults before timing
+    for question, filter_dict in asked[:5]:
+        ask(rag, question, filter_dict, 5)
+
+    results["query"] = {}
+    for k in (5, 10):
+        retrieval, total = [], []
+        start = time.perf_counter()
+        for question, filter_dict in asked:
+            retrieved, answered = ask(rag, question, filter_dict, k)
+            retrieval.append(retrieved)
+            total.append(answered)
+        elapsed = time.perf_counter() - start
+        results["query"][f"k{k}"] = {
+            "qps": len(asked) / elapsed,
+            "retrieval_p50_ms": percentile(retrieval, 0.5) * 1000,
+            "retrieval_p95_ms": percentile(retrieval, 0.95) * 1000,
+            "retrieval_p99_ms": percentile(retrieval, 0.99) * 1000,
+            "total_p50_ms": percentile(total, 0.5) * 1000,
+            "total_p95_ms": percentile(total, 0.95) * 1000,
+            "total_p99_ms": percentile(total, 0.99) * 1000
+        }
+
+    latencies = []
+    lock = threading.Lock()
+
+    def session(i):
+        for question, filter_dict in questions(args.session_queries, args.seed + 100 + i):
+            _, answered = ask(rag, question, filter_dict, 5)
+            with lock:
+                latencies.append(answered)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        list(executor.map(session, range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    results["sessions"] = {
+        "answers_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000
+    }
+    results["serve_peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+PHASES = {"build": phase_build, "serve": phase_serve}
+
+
+def run_phase(name: str, argv: List[str], workdir: str) -> Dict:
+    """Run one phase in a fresh process and return the JSON it prints last"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *argv, "--phase", name, "--workdir", workdir],
+        check=True, capture_output=True, text=True, cwd=HERE
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=HERE, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_run(history: str, config: Dict):
+    """The most recent recorded run with the same configuration, if any"""
+    if not os.path.exists(history):
+        return None
+    match = None
+    with open(history, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("config") == config:
+                match = record
+    return match
+
+
+def report(results: Dict, previous: Dict = None):
+    flat = flatten(results)
+    before = flatten(previous["results"]) if previous else {}
+    if previous:
+        print(f"Compared with {previous['timestamp']} ({previous.get('commit') or 'unknown commit'}):")
+    for key, value in flat.items():
+        line = f"  {key:<32} {value:12.2f}"
+        if key in before and before[key]:
+            change = (value - before[key]) / before[key]
+            worse = change > 0 if TRACKED.get(key, True) else change < 0
+            flag = " (worse)" if key in TRACKED and worse and abs(change) >= 0.1 else ""
+            line += f"  {change:+7.1%}{flag}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1, help="corpus size as a multiple of a real scrape")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=200, help="sequential questions per k")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--session-queries", type=int, default=25, help="questions per session")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="stub LLM first-token latency in seconds")
+    parser.add_argument("--llm-tokens", type=int, default=40, help="tokens per stub answer")
+    parser.add_argument("--llm-token-interval", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--index-type", default="flat", help="serving index: flat, sq8 or ivfpq")
+    parser.add_argument("--history", default=os.path.join(HERE, "bench_results.jsonl"))
+    parser.add_argument("--no-record", action="store_true", help="compare with the history without appending")
+    parser.add_argument("--phase", choices=list(PHASES), help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        # Worker process: the orchestrator reads the last line of output
+        import logging
+        logging.disable(logging.INFO)
+        print(json.dumps(PHASES[args.phase](args, args.workdir)))
+        return
+
+    argv = sys.argv[1:]
+    config = {key: getattr(args, key) for key in CONFIG_KEYS}
+    with tempfile.TemporaryDirectory(prefix="bench_rag_") as workdir:
+        results = {"build": run_phase("build", argv, workdir)}
+        results.update(run_phase("serve", argv, workdir))
+
+    previous = previous_run(args.history, config)
+    print(f"Scale {args.scale:g}: {results['build']['records']} records, {results['build']['chunks']} chunks")
+    report(results, previous)
+
+    if not args.no_record:
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "config": config,
+            "results": results
+        }
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"Recorded in {args.history}")
+
+
+if __name__ == "__main__":
+    main()
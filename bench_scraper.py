@@ -0,0 +1,200 @@
+"""Wall-clock benchmark of UmrahDataScraper against a local HTTP stand-in server.
+
+Serves synthetic Nusuk, Funadiq and Reddit responses with a fixed per-request
+latency and compares the serial scrape (one worker, scrapers run one after
+another) with the concurrent engine, cold and then with a warm HTTP cache (the
+stand-in answers If-None-Match with 304). Each site is served on its own
+loopback address so the per-host rate limiter sees three distinct hosts.
+
+    python bench_scraper.py --latency 0.2 --interval 0.05
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from scraper import UmrahDataScraper
+
+NUSUK_PAGE = """<html><body><main>
+<h1>Umrah Rituals</h1>
+<p>Introduction to performing Umrah.</p>
+{sections}
+</main></body></html>"""
+
+FUNADIQ_CARD = """<div class="hotel-card">
+<h3 class="hotel-title">Hotel {i}</h3>
+<span>Area: {area}</span>
+<div class="star-rating">{stars} stars</div>
+<span>{distance} meters to Haram</span>
+<div class="price">SAR {price:,} / night</div>
+<ul class="amenities">{amenities}</ul>
+<p>{features}</p>
+</div>"""
+
+# Room-type phrases spread over the cards, so every room-type check has matches and misses
+FUNADIQ_FEATURES = ["Kaaba view rooms available, walking distance", "Haram View suites", "Free shuttle to the mosque",
+                    "Prayer hall on the ground floor", "Family rooms and breakfast"]
+
+FUNADIQ_AMENITIES = ["Free WiFi", "Breakfast", "Restaurant", "Laundry"]
+
+
+def build_nusuk_page(anchors):
+    sections = "\n".join(
+        f'<section id="{anchor}"><h3>{anchor.title()}</h3><p>Guidance about {anchor}.</p></section>'
+        for anchor in anchors
+    )
+    return NUSUK_PAGE.format(sections=sections)
+
+
+def build_funadiq_page(count=50):
+    cards = "\n".join(
+        FUNADIQ_CARD.format(i=i, stars=3 + i % 3, distance=100 + 25 * i, area=["Ajyad", "Aziziyah"][i % 2],
+                            features=FUNADIQ_FEATURES[i % len(FUNADIQ_FEATURES)], price=150 + 35 * (i % 97),
+                            amenities="".join(f"<li>{amenity}</li>"
+                                              for amenity in FUNADIQ_AMENITIES[:1 + i % len(FUNADIQ_AMENITIES)]))
+        for i in range(count)
+    )
+    return f"<html><body>{cards}</body></html>"
+
+
+def build_reddit_search(subreddit, count=10, limit=None, after=None, newest_first=False):
+    """One page of search.json over count posts, continuing after the post named by an after cursor"""
+    posts = [
+        {
+            "data": {
+                "id": f"{subreddit}{i}",
+                "name": f"t3_{subreddit}{i}",
+                "title": f"My umrah trip {i}",
+                "selftext": "Stayed near the Haram, highly recommend.",
+                "score": i,
+                "created_utc": 1700000000 + i,
+                "permalink": f"/r/{subreddit}/comments/{subreddit}{i}/"
+            }
+        }
+        for i in range(count)
+    ]
+    if newest_first:
+        posts.reverse()
+    names = [post["data"]["name"] for post in posts]
+    start = names.index(after) + 1 if after in names else 0
+    end = start + limit if limit else len(posts)
+    return {
+        "data": {
+            "after": names[end - 1] if end < len(posts) else None,
+            "children": posts[start:end]
+        }
+    }
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves canned responses for the scraper's URL layout after a fixed delay"""
+
+    latency = 0.2
+    hotels = 50
+    # Posts per subreddit; raise it between runs to have new posts appear
+    reddit_posts = 10
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlsplit(self.path)
+        path = url.path
+
+        if path.startswith("/r/") and path.endswith("/search.json"):
+            query = parse_qs(url.query)
+            body = json.dumps(build_reddit_search(
+                path.split("/")[2], self.reddit_posts, int(query.get("limit", ["25"])[0]),
+                query.get("after", [None])[0], query.get("sort", [""])[0] == "new"
+            )).encode("utf-8")
+            content_type = "application/json"
+        elif path.startswith("/properties_"):
+            body = build_funadiq_page(self.hotels).encode("utf-8")
+            content_type = "text/html"
+        elif path == "/rituals" or path.startswith("/destination/"):
+            anchors = ["entrance", "access", "miqat", "ihram", "sanctuary", "tawaf", "sai", "ziyarah",
+                       "the-grand-mosque", "holy-sites", "shopping", "restaurants-and-cafes"]
+            body = build_nusuk_page(anchors).encode("utf-8")
+            content_type = "text/html"
+        else:
+            self.send_error(404)
+            return
+
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in(latency: float):
+    """Start the stand-in server on an ephemeral port and return it"""
+    StandInHandler.latency = latency
+    server = ThreadingHTTPServer(("0.0.0.0", 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def point_at(scraper: UmrahDataScraper, port: int):
+    """Route each site to its own loopback host on the stand-in server"""
+    scraper.NUSUK_BASE_URL = f"http://127.0.0.1:{port}"
+    scraper.FUNADIQ_BASE_URL = f"http://127.0.0.2:{port}"
+    scraper.REDDIT_BASE_URL = f"http://127.0.0.3:{port}"
+
+
+def run(max_workers: int, parallel: bool, interval: float, port: int, output: str,
+        http_cache_dir: str = None) -> float:
+    scraper = UmrahDataScraper(max_workers=max_workers, min_interval=interval, host_intervals={},
+                               http_cache_dir=http_cache_dir)
+    point_at(scraper, port)
+    start = time.perf_counter()
+    scraper.scrape_all(parallel=parallel, filename=output)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="per-request server latency (s)")
+    parser.add_argument("--interval", type=float, default=0.05, help="per-host minimum request interval (s)")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    server = start_stand_in(args.latency)
+    port = server.server_address[1]
+    workdir = tempfile.mkdtemp()
+    output = os.path.join(workdir, "bench_scraped_data.jsonl")
+    http_cache_dir = os.path.join(workdir, "http_cache")
+
+    try:
+        serial = run(1, False, args.interval, port, output)
+        concurrent = run(args.workers, True, args.interval, port, output)
+        run(args.workers, True, args.interval, port, output, http_cache_dir)
+        cached = run(args.workers, True, args.interval, port, output, http_cache_dir)
+    finally:
+        server.shutdown()
+
+    print(f"serial:     {serial:.2f}s")
+    print(f"concurrent: {concurrent:.2f}s ({args.workers} workers)")
+    print(f"speedup:    {serial / concurrent:.1f}x")
+    print(f"warm cache: {cached:.2f}s (304 revalidation, records reused)")
+
+
+if __name__ == "__main__":
+    main()
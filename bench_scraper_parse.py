@@ -0,0 +1,95 @@
+"""Parse throughput of the scrapers over recorded fixtures, with a golden output check.
+
+Replays the responses saved by scraper_fixtures.py through UmrahDataScraper
+with no network, capturing each page handed to a parser. Each page is then
+parsed --repeat times and the best time kept, reported per parser as time per
+page, throughput, and time per extracted record (per hotel for Funadiq
+listings). The replayed records are compared with the golden output, and a
+mismatch fails the run, so a faster parser is only accepted if its output is
+unchanged.
+
+    python scraper_fixtures.py record --stand-in --hotels 2000 --fixtures scraper_fixtures
+    python bench_scraper_parse.py --fixtures scraper_fixtures --repeat 5
+"""
+import argparse
+import logging
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from scraper_fixtures import FixtureStore, compare, replay_scraper, scrape, use_utc
+
+PARSERS = ["parse_ritual_page", "parse_destination_page", "parse_hotel_listing", "parse_reddit_search"]
+
+
+def capture_pages(scraper) -> List[Tuple[str, dict, object]]:
+    """Wrap the scraper's parsers so every (parser, job, response) they are given is kept"""
+    pages = []
+    for name in PARSERS:
+        def recorded(job, response, parse=getattr(scraper, name), name=name):
+            pages.append((name, job, response))
+            return parse(job, response)
+        setattr(scraper, name, recorded)
+    return pages
+
+
+def time_parser(parse, job, response, repeat: int) -> Tuple[float, int]:
+    """Best of repeat parses of one page, in seconds, and the number of records it yields"""
+    best = float("inf")
+    records = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        records = parse(job, response)
+        best = min(best, time.perf_counter() - start)
+    return best, len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", default="scraper_fixtures", help="directory written by scraper_fixtures.py")
+    parser.add_argument("--repeat", type=int, default=5, help="parses per page; the fastest counts")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    use_utc()
+
+    store = FixtureStore(args.fixtures)
+    if not store.responses:
+        sys.exit(f"No fixtures in {args.fixtures}; record them with scraper_fixtures.py first")
+    scraper = replay_scraper(store)
+    pages = capture_pages(scraper)
+    problems = compare(store.load_golden(), scrape(scraper))
+
+    # Time the parsers themselves, not the wrappers installed above
+    plain = replay_scraper(store)
+    # Pages missing a section would warn again on every timed parse
+    logging.getLogger("scraper").setLevel(logging.ERROR)
+    totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for name, job, response in pages:
+        seconds, records = time_parser(getattr(plain, name), job, response, args.repeat)
+        total = totals[name]
+        total["pages"] += 1
+        total["seconds"] += seconds
+        total["bytes"] += len(response.content)
+        total["records"] += records
+
+    print(f"{'parser':<24} {'pages':>5} {'KiB':>8} {'ms/page':>9} {'MB/s':>7} {'records':>8} {'us/record':>10}")
+    for name in PARSERS:
+        total = totals.get(name)
+        if not total:
+            continue
+        per_record = total["seconds"] / total["records"] * 1e6 if total["records"] else 0.0
+        print(f"{name:<24} {total['pages']:5.0f} {total['bytes'] / 1024:8.0f} "
+              f"{total['seconds'] / total['pages'] * 1000:9.2f} {total['bytes'] / total['seconds'] / 1e6:7.2f} "
+              f"{total['records']:8.0f} {per_record:10.1f}")
+
+    for problem in problems[:20]:
+        print(problem)
+    if problems:
+        print(f"FAIL: {len(problems)} differences from the golden records")
+        sys.exit(1)
+    print("Output matches the golden records")
+
+
+if __name__ == "__main__":
+    main()
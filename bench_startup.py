@@ -0,0 +1,139 @@
+"""Cold-start benchmark: import time and time to first answer, each in a fresh process.
+
+Import time compares the modules chatbot.py imported eagerly before lazy
+loading (including the RAG module it pulled in) with the module-level imports
+chatbot.py has now, read from its source. Time to first answer builds a
+synthetic index once with the offline HashEmbeddings, then in new processes
+loads it either eagerly (FAISS.load_local reads the whole index, plus the
+update manifest) or as the serving path does (memory-mapped read-only index)
+and answers one filtered query with a stub LLM.
+
+    python bench_startup.py --documents 20000 --runs 3
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Module-level imports of chatbot.py and ragsystem.py before lazy loading
+EAGER_IMPORTS = [
+    "streamlit", "langchain_openai", "langchain.memory", "langchain.prompts", "requests", "bs4",
+    "langchain.text_splitter", "langchain_google_genai", "langchain.vectorstores", "langchain.schema",
+    "langchain.chains", "numpy"
+]
+
+BUILD_SCRIPT = """
+import random, sys
+from langchain_core.documents import Document
+from embeddings import HashEmbeddings
+from ragsystem import UmrahRAGSystem
+
+class StubLLM:
+    pass
+
+path, count = sys.argv[1], int(sys.argv[2])
+rng = random.Random(0)
+words = "umrah tawaf sai ihram miqat haram kaaba hotel makkah madinah shuttle view prayer zamzam".split()
+types = ["ritual_guide", "destination_info", "hotel", "user_review"]
+documents = (
+    Document(
+        page_content=" ".join(rng.choice(words) for _ in range(60)),
+        metadata={"type": types[i % 4], "doc_id": f"synthetic:{i}", "city": rng.choice(["makkah", "madina"])}
+    )
+    for i in range(count)
+)
+rag = UmrahRAGSystem("offline", embeddings=HashEmbeddings(), llm=StubLLM(),
+                     embedding_cache_path=path + "/embeddings.sqlite")
+rag.create_vector_store(documents)
+rag.save_vector_store(path + "/index")
+"""
+
+FIRST_ANSWER_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from embeddings import HashEmbeddings
+from ragsystem import UmrahRAGSystem
+imported = time.perf_counter()
+
+class Chunk:
+    content = "stub answer"
+
+class StubLLM:
+    def invoke(self, prompt):
+        return Chunk()
+
+path, mmap = sys.argv[1], sys.argv[2] == "mmap"
+rag = UmrahRAGSystem("offline", embeddings=HashEmbeddings(), llm=StubLLM(),
+                     embedding_cache_path=path + "/embeddings.sqlite")
+assert rag.load_vector_store(path + "/index", mmap=mmap)
+loaded = time.perf_counter()
+result = rag.query("how do I perform tawaf", filter_dict={"type": "ritual_guide"})
+answered = time.perf_counter()
+assert len(result["sources"]) == 5
+
+import resource
+print(json.dumps({
+    "import": imported - start, "load": loaded - imported, "first_query": answered - loaded,
+    "total": answered - start, "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}))
+"""
+
+
+def chatbot_imports():
+    """Module-level imports of chatbot.py, from its source"""
+    with open(os.path.join(HERE, "chatbot.py"), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            modules.append(node.module)
+    return modules
+
+
+def run_python(code: str, *args) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code, *args], cwd=HERE, capture_output=True, text=True, check=True
+    )
+    return result.stdout
+
+
+def import_time(modules) -> float:
+    code = "import importlib, time\nstart = time.perf_counter()\n"
+    code += "".join(f"importlib.import_module({module!r})\n" for module in modules)
+    code += "print(time.perf_counter() - start)"
+    return float(run_python(code))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    lazy_imports = chatbot_imports()
+    eager = statistics.median(import_time(EAGER_IMPORTS) for _ in range(args.runs))
+    lazy = statistics.median(import_time(lazy_imports) for _ in range(args.runs))
+    print(f"chatbot.py imports  eager {eager:6.3f}s   lazy {lazy:6.3f}s  ({eager / lazy:.1f}x)")
+    print(f"  lazy set: {', '.join(lazy_imports)}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        run_python(BUILD_SCRIPT, workdir, str(args.documents))
+        print(f"\nTime to first answer over {args.documents} synthetic documents (median of {args.runs}):")
+        for mode in ["eager", "mmap"]:
+            runs = [json.loads(run_python(FIRST_ANSWER_SCRIPT, workdir, mode)) for _ in range(args.runs)]
+            median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            print(f"  {mode:<6} import {median['import']:6.3f}s  load {median['load']:6.3f}s  "
+                  f"first query {median['first_query']:6.3f}s  total {median['total']:6.3f}s  "
+                  f"max RSS {median['max_rss_mb']:6.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import logging
+import pickle
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Okapi BM25 parameters: term-frequency saturation and document-length normalization
+K1 = 1.2
+B = 0.75
+
+# Reciprocal rank fusion constant; 60 is the value from the original RRF paper and rarely needs tuning
+RRF_K = 60
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "how", "i", "in", "is",
+    "it", "me", "my", "of", "on", "or", "should", "the", "to", "what", "when", "where", "which", "with"
+}
+
+_token_pattern = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords; hyphenated names split into their parts ("al-salam")"""
+    return [token for token in _token_pattern.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Sparse keyword index over the same chunks as the FAISS store, keyed by FAISS row position
+
+    Catches exact-term questions (hotel names, gates, miqat names) that dense similarity ranks
+    low. Postings are kept as flat arrays, like MetadataIndex, so the index saves and loads fast.
+    """
+
+    def __init__(self, vocabulary: Dict[str, int], offsets: np.ndarray, positions: np.ndarray,
+                 frequencies: np.ndarray, lengths: np.ndarray):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.positions = positions
+        self.frequencies = frequencies
+        self.lengths = lengths
+        self.size = len(lengths)
+
+        document_frequency = np.diff(offsets).astype(np.float32)
+        self.idf = np.log1p((self.size - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        average_length = float(lengths.mean()) if self.size else 1.0
+        # Per-row part of the BM25 denominator, computed once
+        self.length_norm = (K1 * (1 - B + B * lengths / (average_length or 1.0))).astype(np.float32)
+
+    @classmethod
+    def build(cls, vector_store) -> "BM25Index":
+        """Index the text of every row in the store"""
+        postings = defaultdict(list)
+        lengths = np.zeros(len(vector_store.index_to_docstore_id), dtype=np.float32)
+        for position, docstore_id in vector_store.index_to_docstore_id.items():
+            tokens = tokenize(vector_store.docstore.search(docstore_id).page_content)
+            lengths[position] = len(tokens)
+            for token, count in Counter(tokens).items():
+                postings[token].append((position, count))
+
+        terms = sorted(postings)
+        vocabulary = {term: i for i, term in enumerate(terms)}
+        counts = [len(postings[term]) for term in terms]
+        offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]).astype(np.int64)
+        pairs = [pair for term in terms for pair in sorted(postings[term])]
+        positions = np.fromiter((position for position, _ in pairs), dtype=np.int64, count=len(pairs))
+        frequencies = np.fromiter((count for _, count in pairs), dtype=np.float32, count=len(pairs))
+
+        logger.info(f"Keyword index built: {len(terms)} terms over {len(lengths)} rows")
+        return cls(vocabulary, offsets, positions, frequencies, lengths)
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            pickle.dump({
+                "terms": list(self.vocabulary), "offsets": self.offsets, "positions": self.positions,
+                "frequencies": self.frequencies, "lengths": self.lengths
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load an index written by save; the file is produced by our own builds, so it is trusted"""
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        vocabulary = {term: i for i, term in enumerate(state["terms"])}
+        return cls(vocabulary, state["offsets"], state["positions"], state["frequencies"], state["lengths"])
+
+    def search(self, query: str, k: int, candidates: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Return up to k (position, score) pairs, best first, optionally only among candidate positions"""
+        term_ids = {self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary}
+        if not term_ids or k <= 0:
+            return []
+
+        # Only rows containing a query term score above zero, so accumulate over their postings
+        matched, contributions = [], []
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            positions = self.positions[start:end]
+            frequencies = self.frequencies[start:end]
+            matched.append(positions)
+            contributions.append(
+                self.idf[term_id] * frequencies * (K1 + 1) / (frequencies + self.length_norm[positions])
+            )
+        positions, inverse = np.unique(np.concatenate(matched), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions))
+
+        if candidates is not None:
+            keep = np.isin(positions, candidates, assume_unique=True)
+            positions, scores = positions[keep], scores[keep]
+            if positions.size == 0:
+                return []
+
+        k = min(k, positions.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(positions[i]), float(scores[i])) for i in top]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = RRF_K) -> List[Hashable]:
+    """Merge ranked id lists by summing 1 / (k + rank); ids ranked well by several lists come first"""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] += 1.0 / (k + rank)
+    return sorted(scores, key=lambda item: -scores[item])
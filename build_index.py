@@ -0,0 +1,101 @@
+"""Build a new index version offline and publish it to serving processes.
+
+Each build is written to <root>/versions/<UTC timestamp>-<corpus hash>/ (index,
+docstore, manifests and an artifact.json recording the corpus hash, data file
+and embedding model). Only a complete build is renamed into place, and only
+then is <root>/CURRENT switched to it atomically. Serving processes watching
+the root hot-reload it. A lock on the root keeps concurrent builders from
+racing, and a build whose corpus and embedding model match the current version
+is skipped unless --force is given. --index-type sq8 or ivfpq adds a quantized
+index and a SQLite docstore that serving processes memory-map instead of the
+flat index.
+
+    python build_index.py --root vector_store --incremental --keep 3 --index-type sq8
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+
+import index_versions
+from scraped_data import DATA_FILES, find_scraped_data
+
+logger = logging.getLogger("build_index")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default=os.environ.get("UMRAH_INDEX_PATH", "vector_store"))
+    parser.add_argument("--data-file", help=f"scraped data (default: newest of {', '.join(DATA_FILES)})")
+    parser.add_argument("--incremental", action="store_true",
+                        help="start from the current version and re-embed only changed documents")
+    parser.add_argument("--keep", type=int, default=3, help="versions to keep on disk")
+    parser.add_argument("--no-publish", action="store_true", help="build the version but leave CURRENT alone")
+    parser.add_argument("--force", action="store_true", help="build even if the corpus is unchanged")
+    parser.add_argument("--offline", action="store_true", help="use the local hash embeddings and no LLM")
+    parser.add_argument("--index-type", choices=["flat", "sq8", "ivfpq"], default="flat",
+                        help="serving index: exact float32, 8-bit scalar-quantized, or IVF with product quantization")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    data_file = args.data_file or find_scraped_data()
+    if not data_file or not os.path.exists(data_file):
+        logger.error("No scraped data found. Please run scraper.py first.")
+        return 1
+
+    # Imported after argument parsing so --help stays fast
+    from ragsystem import ARTIFACT_FILENAME, UmrahRAGSystem
+
+    try:
+        with index_versions.build_lock(args.root):
+            if args.offline:
+                from embeddings import HashEmbeddings
+                rag = UmrahRAGSystem("offline", embeddings=HashEmbeddings(), llm=object())
+            else:
+                rag = UmrahRAGSystem(os.getenv("GOOGLE_API_KEY", "your-api-key-here"))
+
+            corpus_hash = index_versions.file_hash(data_file)
+            info = {
+                "corpus_hash": corpus_hash,
+                "data_file": os.path.abspath(data_file),
+                "embedding_model": rag.embeddings.model_name,
+                # ivfpq falls back to sq8 on small corpora, so the requested type is what gets compared
+                "requested_index_type": args.index_type
+            }
+
+            current = index_versions.resolve(args.root)
+            artifact_path = os.path.join(current, ARTIFACT_FILENAME) if current else None
+            if artifact_path and os.path.exists(artifact_path) and not args.force:
+                with open(artifact_path, "r", encoding="utf-8") as f:
+                    artifact = json.load(f)
+                if all(artifact.get(key, "flat" if key == "requested_index_type" else None) == info[key]
+                       for key in ["corpus_hash", "embedding_model", "requested_index_type"]):
+                    logger.info(f"Index at {current} is already built from this corpus; nothing to do")
+                    return 0
+
+            name = index_versions.version_name(corpus_hash)
+            final_path = index_versions.version_path(args.root, name)
+            partial_path = os.path.join(os.path.dirname(final_path), f".{name}.partial")
+            shutil.rmtree(partial_path, ignore_errors=True)
+
+            if not rag.build_rag_system(incremental=args.incremental, path=partial_path, data_file=data_file,
+                                        base_path=current, artifact_info=info, index_type=args.index_type):
+                shutil.rmtree(partial_path, ignore_errors=True)
+                return 1
+            os.replace(partial_path, final_path)
+            logger.info(f"Built index version {name}")
+
+            if not args.no_publish:
+                index_versions.publish(args.root, name)
+            index_versions.prune(args.root, args.keep)
+            print(name)
+            return 0
+    except index_versions.BuildInProgress as e:
+        logger.error(str(e))
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,80 @@
 import streamlit as st
-from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
-import requests
-from bs4 import BeautifulSoup
 import os
-from datetime import datetime, timedelta
-import re
-from rag_system import UmrahRAGSystem, initialize_rag_system
-import json
+from datetime import date, datetime, timedelta
+from intent_router import IntentRouter, RoutedQuery, keyword_intent
+from query_parser import ParsedQuery, QueryParser
+from pipeline import Branch, run_branches, start_branches
+from healthcheck import mark_ready
+import instrumentation
+from instrumentation import span, traced_stream
 
-# Set the API key from secrets
+# Only light modules are imported above; langchain, faiss and the HTTP clients load on first use,
+# after the page has rendered
+
+# Set the API keys from secrets; Gemini and the Google embeddings share one key, as in build_index.py
 os.environ["OPENAI_API_KEY"] = st.secrets["OPENAI_API_KEY"]
+GOOGLE_API_KEY = st.secrets.get("GOOGLE_API_KEY") or os.environ.get("GOOGLE_API_KEY", "")
+
+# Prebuilt index to serve; the serving path never builds one unless UMRAH_BUILD_ON_START=1
+INDEX_PATH = os.environ.get("UMRAH_INDEX_PATH", "vector_store")
+
+# One LLM gateway per process: Gemini first, OpenAI when Gemini fails or times out, with per-provider
+# concurrency limits shared by every session. Set UMRAH_LLM_HEDGE_PERCENTILE (e.g. 0.95) to also
+# send requests to OpenAI once Gemini is slower than that percentile of its latency
+@st.cache_resource
+def get_llm_gateway():
+    from llm_gateway import LLMGateway, gemini_provider, openai_provider
+    hedge_percentile = os.environ.get("UMRAH_LLM_HEDGE_PERCENTILE")
+    return LLMGateway(
+        [
+            gemini_provider(GOOGLE_API_KEY),
+            openai_provider(st.secrets["OPENAI_API_KEY"])
+        ],
+        hedge_percentile=float(hedge_percentile) if hedge_percentile else None
+    )
 
-# Initialize the LLM
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo",
-    openai_api_key=st.secrets["OPENAI_API_KEY"],
-    temperature=0.7
-)
+# With UMRAH_INSTRUMENTATION=1, stage timings are logged as JSON and, with UMRAH_METRICS_PORT set,
+# served in the Prometheus text format (one server per process, started on first run)
+@st.cache_resource
+def start_metrics_server():
+    port = os.environ.get("UMRAH_METRICS_PORT")
+    if instrumentation.ENABLED and port:
+        return instrumentation.serve_metrics(int(port))
+    return None
+
+start_metrics_server()
 
 # Initialize RAG system
 @st.cache_resource
 def get_rag_system():
-    return initialize_rag_system(st.secrets["OPENAI_API_KEY"])
+    from ragsystem import initialize_rag_system
+    rag = initialize_rag_system(
+        GOOGLE_API_KEY,
+        path=INDEX_PATH,
+        llm=get_llm_gateway(),
+        build_if_missing=os.environ.get("UMRAH_BUILD_ON_START") == "1"
+    )
+    if rag:
+        # Pick up versions published by build_index.py without a restart
+        rag.watch_index(INDEX_PATH, interval=float(os.environ.get("UMRAH_INDEX_POLL_SECONDS", "30")))
+    return rag
+
+# Intent centroids are embedded once per process and shared by every session
+@st.cache_resource
+def get_intent_router():
+    return IntentRouter(get_rag_system().query_embeddings, parser=query_parser)
+
+# Live availability is optional; without a configured service the hotel answer skips that branch
+@st.cache_resource
+def get_availability_client():
+    base_url = st.secrets.get("AVAILABILITY_API_URL") or os.environ.get("AVAILABILITY_API_URL")
+    if not base_url:
+        return None
+    from availability import AvailabilityClient
+    return AvailabilityClient(base_url)
+
+# Compiled once; shared by the router, the processor and the UmrahMe link builder
+query_parser = QueryParser()
 
 # UmrahMe Integration Class (existing code)
 class UmrahMeChecker:
@@ -38,55 +89,19 @@ class UmrahMeChecker:
     
     def parse_query(self, query: str):
         """Parse natural language query to extract city, dates, and guests"""
-        city = "makkah"
-        if any(word in query.lower() for word in ["madinah", "medina", "madina"]):
-            city = "madinah"
-        elif "jeddah" in query.lower():
-            city = "jeddah"
-        elif any(word in query.lower() for word in ["haram", "makkah", "mecca"]):
-            city = "makkah"
-        
-        check_in = None
-        check_out = None
-        
-        date_range_pattern = r'(\d{1,2})(?:st|nd|rd|th)?\s*[-to]+\s*(\d{1,2})(?:st|nd|rd|th)?\s+(\w+)'
-        range_match = re.search(date_range_pattern, query.lower())
-        
-        if range_match:
-            day_start = int(range_match.group(1))
-            day_end = int(range_match.group(2))
-            month_name = range_match.group(3)
-            
-            months = {
-                'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3,
-                'april': 4, 'apr': 4, 'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7,
-                'august': 8, 'aug': 8, 'september': 9, 'sep': 9, 'october': 10, 'oct': 10,
-                'november': 11, 'nov': 11, 'december': 12, 'dec': 12
-            }
-            
-            month = months.get(month_name.lower(), datetime.now().month)
-            year = datetime.now().year
-            
-            if month < datetime.now().month:
-                year += 1
-                
-            check_in = f"{year}-{month:02d}-{day_start:02d}"
-            check_out = f"{year}-{month:02d}-{day_end:02d}"
-        
-        if not check_in:
-            today = datetime.now()
-            check_in = today.strftime("%Y-%m-%d")
-            check_out = (today + timedelta(days=3)).strftime("%Y-%m-%d")
-        
-        adults = 2
-        children = 0
-        
-        people_pattern = r'(\d+)\s*(?:people|person|pax)'
-        people_match = re.search(people_pattern, query.lower())
-        if people_match:
-            adults = int(people_match.group(1))
-        
-        return city, check_in, check_out, adults, children
+        return self.search_params(query_parser.parse(query))
+    
+    def search_params(self, parsed: ParsedQuery):
+        """Turn parsed query slots into (city, check_in, check_out, adults, children), filling in defaults"""
+        check_in = parsed.check_in or date.today()
+        check_out = parsed.check_out or check_in + timedelta(days=parsed.nights or 3)
+        return (
+            parsed.city or "makkah",
+            check_in.strftime("%Y-%m-%d"),
+            check_out.strftime("%Y-%m-%d"),
+            parsed.adults or 2,
+            parsed.children or 0
+        )
     
     def get_hotel_url(self, city: str, check_in: str, check_out: str, adults: int = 2, children: int = 0):
         """Generate UmrahMe hotel search URL"""
@@ -118,53 +133,79 @@ umrahme_checker = UmrahMeChecker()
 
 # Enhanced Query Processor with RAG
 class EnhancedQueryProcessor:
-    def __init__(self, rag_system):
+    # Per-branch timeouts (seconds) for the concurrent hotel pipeline
+    link_timeout = 2.0
+    availability_timeout = 6.0
+    
+    def __init__(self, rag_system, router: IntentRouter = None, availability=None):
         self.rag = rag_system
         self.umrahme = umrahme_checker
+        self.router = router
+        self.availability = availability
+        self.parser = query_parser
+        self.handlers = {
+            "ritual": self.handle_ritual_query,
+            "attraction": self.handle_attraction_query,
+            "hotel": self.handle_hotel_query,
+            "review": self.handle_review_query,
+            "package": self.handle_package_query,
+            "train": self.handle_train_query,
+            "general": self.handle_general_query
+        }
     
     def process_query(self, query: str):
-        """Process query and determine the best response approach"""
-        query_lower = query.lower()
-        
-        # Check query type
-        if any(word in query_lower for word in ["ritual", "tawaf", "sai", "ihram", "miqat", "step", "perform", "how to"]):
-            return self.handle_ritual_query(query)
-        
-        elif any(word in query_lower for word in ["attraction", "visit", "see", "shopping", "restaurant", "cafe", "places"]):
-            return self.handle_attraction_query(query)
-        
-        elif any(word in query_lower for word in ["hotel", "accommodation", "stay", "room", "kaaba view", "haram view"]):
-            return self.handle_hotel_query(query)
-        
-        elif any(word in query_lower for word in ["review", "experience", "stayed", "visited", "recommend"]):
-            return self.handle_review_query(query)
-        
-        elif any(word in query_lower for word in ["package", "deal", "offer"]):
-            return self.handle_package_query(query)
-        
-        elif any(word in query_lower for word in ["train", "haramain", "railway"]):
-            return self.handle_train_query(query)
-        
-        else:
-            # Use RAG for general queries
-            return self.handle_general_query(query)
+        """Process query and return the complete response"""
+        return "".join(self.stream_query(query))
+    
+    def route(self, query: str) -> RoutedQuery:
+        """Classify the query and extract its slots in one pass"""
+        if self.router:
+            return self.router.route(query)
+        # Without embeddings fall back to the keyword rules
+        return RoutedQuery(intent=keyword_intent(query), score=0.0, parsed=self.parser.parse(query))
+    
+    def stream_query(self, query: str):
+        """Process query and determine the best response approach, yielding the response in pieces
+        
+        Each call is one trace: routing, retrieval and LLM spans nest under its "turn" span, and the
+        time the caller spends between pieces (Streamlit rendering them) is the "render" stage.
+        """
+        with span("turn") as turn:
+            with span("route") as current:
+                routed = self.route(query)
+                current.set(intent=routed.intent, score=round(routed.score, 3))
+            turn.set(intent=routed.intent)
+            yield from traced_stream(self.handlers[routed.intent](query, routed), turn, consumer_stage="render")
     
-    def handle_ritual_query(self, query: str):
+    def _answer_tokens(self, events, sources: list):
+        """Yield answer tokens from a RAG event stream, collecting its sources into the given list"""
+        for event in events:
+            if event["type"] == "sources":
+                sources.extend(event["sources"])
+            elif event["type"] == "token":
+                yield event["text"]
+            elif event["type"] == "error":
+                raise RuntimeError(event["error"])
+    
+    def handle_ritual_query(self, query: str, routed: RoutedQuery):
         """Handle ritual-related queries using RAG"""
-        result = self.rag.query(query, filter_dict={"type": "ritual_guide"})
-        
-        response = f"📿 **Umrah Ritual Guidance**\n\n{result['answer']}\n\n"
+        sources = []
+        yield "📿 **Umrah Ritual Guidance**\n\n"
+        yield from self._answer_tokens(
+            self.rag.query_stream(query, filter_dict={"type": "ritual_guide"}, query_vector=routed.query_vector),
+            sources
+        )
+        yield "\n\n"
         
-        if result.get('sources'):
-            response += "📚 **Sources:**\n"
-            for source in result['sources'][:3]:
+        if sources:
+            response = "📚 **Sources:**\n"
+            for source in sources[:3]:
                 response += f"- {source['metadata'].get('section', 'Unknown')} from Nusuk.sa\n"
-        
-        return response
+            yield response
     
-    def handle_attraction_query(self, query: str):
+    def handle_attraction_query(self, query: str, routed: RoutedQuery):
         """Handle attraction queries using RAG"""
-        city = "makkah" if "makkah" in query.lower() or "mecca" in query.lower() else "madinah"
+        city = "makkah" if routed.parsed.city == "makkah" else "madinah"
         
         category = None
         if "shopping" in query.lower():
@@ -172,49 +213,74 @@ class EnhancedQueryProcessor:
         elif "restaurant" in query.lower() or "food" in query.lower():
             category = "restaurants"
         
-        result = self.rag.query_attractions(city, category)
+        sources = []
+        yield f"🏛️ **{city.title()} Attractions & Services**\n\n"
+        yield from self._answer_tokens(self.rag.query_attractions_stream(city, category), sources)
+        yield "\n\n"
         
-        response = f"🏛️ **{city.title()} Attractions & Services**\n\n{result['answer']}\n\n"
-        
-        if result.get('sources'):
-            response += "📍 **Information from:**\n"
-            for source in result['sources'][:3]:
+        if sources:
+            response = "📍 **Information from:**\n"
+            for source in sources[:3]:
                 response += f"- {source['metadata'].get('section', 'General').replace('_', ' ').title()}\n"
-        
-        return response
+            yield response
     
-    def handle_hotel_query(self, query: str):
+    def _hotel_branches(self, parsed: ParsedQuery):
+        """Steps of a hotel answer that run while it streams: UmrahMe link and live availability"""
+        city, check_in, check_out, adults, children = self.umrahme.search_params(parsed)
+        branches = [
+            Branch("link", lambda: self.umrahme.get_hotel_url(city, check_in, check_out, adults, children),
+                   timeout=self.link_timeout, fallback=(None, None))
+        ]
+        if self.availability:
+            branches.append(Branch(
+                "availability", lambda: self.availability.lookup(city, check_in, check_out, adults, children),
+                timeout=self.availability_timeout
+            ))
+        return branches
+    
+    def handle_hotel_query(self, query: str, routed: RoutedQuery):
         """Handle hotel queries with both RAG and UmrahMe integration"""
+        parsed = routed.parsed
+        city, check_in, check_out, adults, children = self.umrahme.search_params(parsed)
+        
         # First, check if user wants specific criteria hotels from our database
-        if any(word in query.lower() for word in ["kaaba view", "haram view", "walking distance", "shuttle"]):
-            city = "makkah" if "makkah" in query.lower() or not "madinah" in query.lower() else "madinah"
+        if parsed.features or parsed.stars or parsed.sort_by:
+            city = parsed.city or "makkah"
             
             filters = {
                 "city": city,
-                "has_kaaba_view": "kaaba view" in query.lower(),
-                "walking_distance": "walking distance" in query.lower()
+                "stars": parsed.stars,
+                "sort_by": parsed.sort_by
             }
+            filters.update({feature: True for feature in parsed.features})
             
             # Remove False values from filters
             filters = {k: v for k, v in filters.items() if v}
             
-            result = self.rag.query_hotels(**filters)
-            
-            response = f"🏨 **Hotels in {city.title()} - From Our Database**\n\n"
-            response += result['answer'] + "\n\n"
+            # Link and availability are fetched in the background while the database answer streams
+            background = start_branches(self._hotel_branches(parsed))
+            yield f"🏨 **Hotels in {city.title()} - From Our Database**\n\n"
+            # Answered from the structured hotel table when available, else by RAG search plus the LLM
+            try:
+                yield from self._answer_tokens(self.rag.query_hotels_stream(**filters), [])
+            except RuntimeError as e:
+                yield f"⚠️ Our hotel database is not available right now ({e})."
+            yield "\n\n"
+            results = background.result()
+            yield from self._availability_section(results)
             
             # Also provide UmrahMe link
-            city_param, check_in, check_out, adults, children = self.umrahme.parse_query(query)
-            url, destination_name = self.umrahme.get_hotel_url(city_param, check_in, check_out, adults, children)
+            url, destination_name = results["link"].value
             
             if url:
-                response += f"🔗 **[View live availability on UmrahMe.com]({url})**\n\n"
+                response = f"🔗 **[View live availability on UmrahMe.com]({url})**\n\n"
                 response += "💡 **Note:** The hotels above are from our database. Check UmrahMe for real-time availability and current prices."
+                yield response
         
         else:
             # For general hotel queries, use UmrahMe
-            city, check_in, check_out, adults, children = self.umrahme.parse_query(query)
-            url, destination_name = self.umrahme.get_hotel_url(city, check_in, check_out, adults, children)
+            results = run_branches(self._hotel_branches(parsed))
+            url, destination_name = results["link"].value
             
             if url:
                 response = f"""🏨 **Searching hotels in {destination_name}**
@@ -223,7 +289,10 @@ class EnhancedQueryProcessor:
 📅 Check-out: {check_out}
 👥 Guests: {adults} adults{f', {children} children' if children > 0 else ''}
 
-🔗 **[Click here to view available hotels]({url})**
+"""
+                yield response
+                yield from self._availability_section(results)
+                response = f"""🔗 **[Click here to view available hotels]({url})**
 
 This link will show you:
 - Hotels sorted by price (lowest first)
@@ -242,25 +311,37 @@ This link will show you:
 Would you like me to search for hotels with specific features?"""
             else:
                 response = "I couldn't generate a hotel search link. Please specify a valid city (Makkah, Madinah, or Jeddah)."
-        
-        return response
+            
+            yield response
+    
+    def _availability_section(self, results: dict):
+        """Yield the live availability block, or nothing when the service is off, failed or timed out"""
+        availability = results.get("availability")
+        if availability and availability.ok:
+            from availability import format_availability
+            yield f"🟢 **Live availability**\n{format_availability(availability.value)}\n\n"
     
-    def handle_review_query(self, query: str):
+    def handle_review_query(self, query: str, routed: RoutedQuery):
         """Handle review queries using Reddit data from RAG"""
-        result = self.rag.query(query, filter_dict={"type": "user_review"})
-        
-        response = f"💬 **User Reviews & Experiences**\n\n{result['answer']}\n\n"
+        sources = []
+        yield "💬 **User Reviews & Experiences**\n\n"
+        yield from self._answer_tokens(
+            self.rag.query_stream(query, filter_dict={"type": "user_review"}, query_vector=routed.query_vector),
+            sources
+        )
+        yield "\n\n"
         
-        if result.get('sources'):
+        response = ""
+        if sources:
             response += "🔍 **From Reddit discussions:**\n"
-            for source in result['sources'][:3]:
+            for source in sources[:3]:
                 response += f"- r/{source['metadata'].get('subreddit', 'unknown')} (Score: {source['metadata'].get('score', 0)})\n"
         
         response += "\n💡 **Note:** These are user experiences from Reddit. Individual experiences may vary."
         
-        return response
+        yield response
     
-    def handle_package_query(self, query: str):
+    def handle_package_query(self, query: str, routed: RoutedQuery):
         """Handle package queries"""
         response = f"""📦 **Umrah Packages on UmrahMe.com**
 
@@ -280,9 +361,9 @@ Each package typically includes:
 
 Would you like specific package recommendations based on your budget or preferences?"""
         
-        return response
+        yield response
     
-    def handle_train_query(self, query: str):
+    def handle_train_query(self, query: str, routed: RoutedQuery):
         """Handle train queries"""
         response = f"""🚄 **Haramain Express Information**
 
@@ -300,18 +381,15 @@ Train features:
 
 Need help booking train tickets?"""
         
-        return response
+        yield response
     
-    def handle_general_query(self, query: str):
+    def handle_general_query(self, query: str, routed: RoutedQuery):
         """Handle general queries using RAG"""
-        result = self.rag.query(query)
+        sources = []
+        yield from self._answer_tokens(self.rag.query_stream(query, query_vector=routed.query_vector), sources)
         
-        response = result['answer']
-        
-        if result.get('sources'):
-            response += "\n\n📚 **Sources:** Information compiled from Nusuk.sa and user experiences."
-        
-        return response
+        if sources:
+            yield "\n\n📚 **Sources:** Information compiled from Nusuk.sa and user experiences."
 
 # Initialize session state
 if "messages" not in st.session_state:
@@ -345,6 +423,11 @@ Just ask me anything! For example:
 if "rag_status" not in st.session_state:
     st.session_state.rag_status = "initializing"
 
+def queue_prompt(prompt: str):
+    """Answer a sidebar prompt on the next run, through the same path (and answer cache) as typed ones"""
+    st.session_state.pending_prompt = prompt
+    st.rerun()
+
 # UI
 st.title("🕋 Enhanced Umrah Guide with RAG")
 st.subheader("AI Assistant with Knowledge Base + Live Availability")
@@ -358,7 +441,10 @@ with st.sidebar:
             rag_system = get_rag_system()
             if rag_system:
                 st.session_state.rag_status = "ready"
-                st.session_state.query_processor = EnhancedQueryProcessor(rag_system)
+                st.session_state.query_processor = EnhancedQueryProcessor(
+                    rag_system, get_intent_router(), get_availability_client()
+                )
+                mark_ready(rag_system.artifact)
             else:
                 st.session_state.rag_status = "error"
     
@@ -368,6 +454,8 @@ with st.sidebar:
     elif st.session_state.rag_status == "error":
         st.error("❌ Failed to load knowledge base")
         if st.button("🔄 Retry"):
+            # A missing index is cached as None; forget it so the retry loads again
+            get_rag_system.clear()
             st.session_state.rag_status = "initializing"
             st.rerun()
     
@@ -379,21 +467,17 @@ with st.sidebar:
     col1, col2 = st.columns(2)
     with col1:
         if st.button("📿 Umrah Steps"):
-            st.session_state.messages.append({"role": "user", "content": "What are the complete steps of Umrah?"})
-            st.rerun()
+            queue_prompt("What are the complete steps of Umrah?")
         
         if st.button("🕋 Kaaba View Hotels"):
-            st.session_state.messages.append({"role": "user", "content": "Show me hotels with Kaaba view in Makkah"})
-            st.rerun()
+            queue_prompt("Show me hotels with Kaaba view in Makkah")
     
     with col2:
         if st.button("🏛️ Makkah Attractions"):
-            st.session_state.messages.append({"role": "user", "content": "What attractions should I visit in Makkah?"})
-            st.rerun()
+            queue_prompt("What attractions should I visit in Makkah?")
         
         if st.button("🍽️ Madinah Food"):
-            st.session_state.messages.append({"role": "user", "content": "Best restaurants in Madinah?"})
-            st.rerun()
+            queue_prompt("Best restaurants in Madinah?")
     
     st.divider()
     
@@ -415,8 +499,7 @@ with st.sidebar:
             query = f"hotels in {city} from {check_in} to {check_out} for {guests} people"
             if special_features:
                 query += f" with {' and '.join(special_features)}"
-            st.session_state.messages.append({"role": "user", "content": query})
-            st.rerun()
+            queue_prompt(query)
     
     # Clear chat
     if st.button("🗑️ Clear Chat"):
@@ -427,14 +510,43 @@ with st.sidebar:
     st.caption("🟢 Connected to UmrahMe.com")
     st.caption(f"📚 Knowledge base: {'Ready' if st.session_state.rag_status == 'ready' else 'Loading...'}")
     st.caption(f"💬 {len(st.session_state.messages)} messages")
+    
+    # The answer cache lives on the shared RAG system, so repeated questions and quick actions hit it
+    # across sessions
+    if st.session_state.rag_status == "ready":
+        cache_stats = st.session_state.query_processor.rag.answer_cache.stats()
+        st.caption(
+            f"⚡ Answer cache: {cache_stats['hit_rate']:.0%} hit rate "
+            f"({cache_stats['exact_hits']} exact, {cache_stats['semantic_hits']} similar, "
+            f"{cache_stats['misses']} misses)"
+        )
+        query_embeddings = st.session_state.query_processor.rag.query_embeddings
+        if hasattr(query_embeddings, "stats"):
+            embed_stats = query_embeddings.stats()
+            st.caption(
+                f"🧮 Query embeddings: {embed_stats['mean_batch_size']:.1f} per batch, "
+                f"queue {embed_stats['queue_depth']}/{embed_stats['queue_capacity']}"
+            )
+        for name, llm_stats in get_llm_gateway().stats().items():
+            p95 = llm_stats["latency"]["p95"]
+            st.caption(
+                f"🤖 {name}: {llm_stats.get('successes', 0)} answers, {llm_stats.get('in_flight', 0)} in flight"
+                + (f", p95 {p95:.1f}s" if p95 else "")
+            )
+        if instrumentation.ENABLED:
+            stages = instrumentation.registry.percentiles(instrumentation.STAGE_SECONDS, "stage")
+            st.caption("⏱️ p95 by stage: " + ", ".join(
+                f"{stage} {stats['p95']:.2f}s" for stage, stats in stages.items() if stats["p95"] is not None
+            ))
 
 # Display chat history
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
         st.write(msg["content"])
 
-# Chat input
+# Chat input; quick actions and the hotel form queue their prompt for this run
 prompt = st.chat_input("Ask about rituals, hotels, attractions, or anything Umrah-related...")
+prompt = prompt or st.session_state.pop("pending_prompt", None)
 
 if prompt and st.session_state.rag_status == "ready":
     # Add user message
@@ -442,24 +554,22 @@ if prompt and st.session_state.rag_status == "ready":
     with st.chat_message("user"):
         st.write(prompt)
     
-    # Process the query
+    # Process the query, rendering the header at once and answer tokens as they arrive
     with st.chat_message("assistant"):
-        with st.spinner("Searching knowledge base..."):
+        try:
+            response = st.write_stream(st.session_state.query_processor.stream_query(prompt))
+            st.session_state.messages.append({"role": "assistant", "content": response})
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
+            fallback_response = "I encountered an error. Let me try a simpler approach..."
+            
+            # Fallback to basic LLM
             try:
-                response = st.session_state.query_processor.process_query(prompt)
-                st.markdown(response)
-                st.session_state.messages.append({"role": "assistant", "content": response})
-            except Exception as e:
-                st.error(f"Error: {str(e)}")
-                fallback_response = "I encountered an error. Let me try a simpler approach..."
-                
-                # Fallback to basic LLM
-                try:
-                    llm_response = llm.invoke(prompt).content
-                    st.write(llm_response)
-                    st.session_state.messages.append({"role": "assistant", "content": llm_response})
-                except Exception as e2:
-                    st.error(f"Fallback error: {str(e2)}")
+                llm_response = get_llm_gateway().invoke(prompt).content
+                st.write(llm_response)
+                st.session_state.messages.append({"role": "assistant", "content": llm_response})
+            except Exception as e2:
+                st.error(f"Fallback error: {str(e2)}")
 
 elif prompt and st.session_state.rag_status != "ready":
     st.warning("⏳ Please wait for the knowledge base to load before asking questions.")
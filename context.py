@@ -0,0 +1,188 @@
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Set
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Separator between context passages in the prompt
+PASSAGE_SEPARATOR = "\n\n"
+
+# Rough characters per token, used when no tokenizer encoding can be loaded (e.g. offline)
+CHARS_PER_TOKEN = 4
+
+# Chunks overlap by up to 200 characters; a shorter match between two chunks is a coincidence
+MIN_TEXT_OVERLAP = 20
+MAX_TEXT_OVERLAP = 400
+
+_word_pattern = re.compile(r"\w+", re.UNICODE)
+
+
+class TokenCounter:
+    """Counts and truncates text in tokens with tiktoken, or by a character estimate without it
+
+    The encoding is loaded on first use; tiktoken downloads it the first time, so an offline
+    process without a cached copy falls back to CHARS_PER_TOKEN.
+    """
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    try:
+                        import tiktoken
+                        self._encoding = tiktoken.get_encoding(self.encoding_name)
+                    except Exception as e:
+                        logger.warning(f"No {self.encoding_name} tokenizer ({e}); estimating tokens from length")
+                    self._loaded = True
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is None:
+            return text[:max_tokens * CHARS_PER_TOKEN]
+        tokens = self.encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[:max_tokens])
+
+
+def _text_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is a prefix of right (0 below MIN_TEXT_OVERLAP)"""
+    for size in range(min(len(left), len(right), MAX_TEXT_OVERLAP), MIN_TEXT_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _shingles(text: str, size: int = 3) -> Set[tuple]:
+    words = _word_pattern.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+# Shared so the encoding is loaded (or found missing) once per process
+_default_counter = TokenCounter()
+
+
+class ContextBuilder:
+    """Assembles retrieved chunks into the passages sent to the LLM, within a token budget
+
+    Chunks of the same source document that overlap or touch (by their start_index, or by
+    matching text for chunks indexed without one) are merged into one passage, so the 200
+    characters the splitter repeats are sent once. Passages whose word 3-grams mostly repeat a
+    higher-ranked passage are dropped (templated records such as hotels share most of their
+    3-grams, hence the high threshold). The rest are kept in retrieval order until max_tokens is
+    reached; the passage that crosses the budget is cut to fit if at least min_tokens remain.
+    """
+
+    def __init__(self, max_tokens: int = 1500, duplicate_threshold: float = 0.9, min_tokens: int = 50,
+                 counter: TokenCounter = None):
+        self.max_tokens = max_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.min_tokens = min_tokens
+        self.counter = counter or _default_counter
+
+    def build(self, docs: List[Document]) -> List[Document]:
+        passages = self._drop_duplicates(self._merge(docs))
+        return self._fit(passages)
+
+    def render(self, docs: List[Document]) -> str:
+        return PASSAGE_SEPARATOR.join(doc.page_content for doc in docs)
+
+    def _merge(self, docs: List[Document]) -> List[Document]:
+        """Merge overlapping chunks per source document; a merged passage takes its best chunk's rank"""
+        groups: Dict[str, List[int]] = {}
+        for rank, doc in enumerate(docs):
+            source = doc.metadata.get("doc_id")
+            groups.setdefault(source if source is not None else f"#{rank}", []).append(rank)
+
+        passages = []
+        for ranks in groups.values():
+            ordered = sorted(ranks, key=lambda rank: self._order_key(docs[rank]))
+            merged = []  # [best rank, text, first chunk]
+            for rank in ordered:
+                chunk = docs[rank]
+                joined = self._join(merged[-1][1], merged[-1][2], chunk) if merged else None
+                if joined is None:
+                    merged.append([rank, chunk.page_content, chunk])
+                else:
+                    merged[-1][0] = min(merged[-1][0], rank)
+                    merged[-1][1] = joined
+            passages.extend(
+                (rank, Document(page_content=text, metadata=dict(first.metadata)))
+                for rank, text, first in merged
+            )
+        return [passage for _, passage in sorted(passages, key=lambda item: item[0])]
+
+    @staticmethod
+    def _order_key(doc: Document):
+        if "start_index" in doc.metadata:
+            return (0, doc.metadata["start_index"])
+        # Chunk ids end in their position within the source document ("doc_id#3")
+        suffix = str(doc.metadata.get("chunk_id", "")).rpartition("#")[2]
+        return (1, int(suffix) if suffix.isdigit() else 0)
+
+    @staticmethod
+    def _join(text: str, first: Document, chunk: Document) -> Optional[str]:
+        """Text of the passage extended by chunk, or None if they neither overlap nor touch"""
+        start = first.metadata.get("start_index")
+        next_start = chunk.metadata.get("start_index")
+        if start is not None and next_start is not None:
+            end = start + len(text)
+            if next_start > end + 1:
+                return None
+            overlap = end - next_start
+            if overlap >= len(chunk.page_content):
+                return text
+            # Adjacent chunks lost the whitespace the splitter cut on
+            return text + chunk.page_content[overlap:] if overlap >= 0 else text + " " + chunk.page_content
+        overlap = _text_overlap(text, chunk.page_content)
+        return text + chunk.page_content[overlap:] if overlap else None
+
+    def _drop_duplicates(self, passages: List[Document]) -> List[Document]:
+        kept, kept_shingles = [], []
+        for passage in passages:
+            shingles = _shingles(passage.page_content)
+            if any(self._containment(shingles, other) >= self.duplicate_threshold for other in kept_shingles):
+                continue
+            kept.append(passage)
+            kept_shingles.append(shingles)
+        return kept
+
+    @staticmethod
+    def _containment(shingles: Set[tuple], other: Set[tuple]) -> float:
+        """Share of the smaller passage's 3-grams found in the other, so a copy inside a longer text counts"""
+        if not shingles or not other:
+            return 0.0
+        return len(shingles & other) / min(len(shingles), len(other))
+
+    def _fit(self, passages: List[Document]) -> List[Document]:
+        fitted = []
+        remaining = self.max_tokens
+        separator_tokens = self.counter.count(PASSAGE_SEPARATOR)
+        for passage in passages:
+            cost = self.counter.count(passage.page_content) + (separator_tokens if fitted else 0)
+            if cost <= remaining:
+                fitted.append(passage)
+                remaining -= cost
+                continue
+            if remaining >= self.min_tokens:
+                text = self.counter.truncate(passage.page_content, remaining - (separator_tokens if fitted else 0))
+                fitted.append(Document(page_content=text, metadata={**passage.metadata, "truncated": True}))
+            break
+        return fitted
@@ -0,0 +1,159 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+from embeddings import query_embedder
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingQueueFull(RuntimeError):
+    """The batcher's queue stayed full for the whole submit timeout"""
+
+
+def query_batch_function(embeddings: Embeddings) -> Callable[[List[str]], List[List[float]]]:
+    """Return a function embedding several queries in one provider call, as embed_query would"""
+    base = getattr(embeddings, "base", embeddings)  # CachedEmbeddings caches documents only
+    return query_embedder(base).embed_documents
+
+
+class EmbeddingBatcher(Embeddings):
+    """Coalesces concurrent query embeddings from many sessions into batched provider calls
+
+    embed_query enqueues the text and waits. A worker takes the first waiting query, collects
+    whatever else arrives within max_wait (up to max_batch_size), and embeds the batch in one
+    call; identical questions in a batch are embedded once. The queue is bounded: when it stays
+    full for submit_timeout seconds, embed_query raises EmbeddingQueueFull instead of letting
+    requests pile up. Document embeddings (index builds) pass straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, embed_batch: Callable[[List[str]], List[List[float]]] = None,
+                 max_batch_size: int = 32, max_wait: float = 0.005, max_queue: int = 256,
+                 submit_timeout: float = 1.0, result_timeout: float = 30.0, workers: int = 2):
+        self.embeddings = embeddings
+        self.embed_batch = embed_batch or query_batch_function(embeddings)
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.submit_timeout = submit_timeout
+        self.result_timeout = result_timeout
+        self.worker_count = max(1, workers)
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+
+        self.requests = 0
+        self.rejected = 0
+        self.failed = 0
+        self.batches = 0
+        self.batch_sizes = Counter()
+        self._queue_wait = 0.0
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.embeddings, "model_name", self.embeddings.__class__.__name__)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed many texts as queries in one pass, bypassing the queue (e.g. intent examples)"""
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        return embed_queries(texts) if embed_queries else self.embed_batch(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self._start_workers()
+        future = Future()
+        try:
+            self._queue.put((text, future, time.perf_counter()), timeout=self.submit_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise EmbeddingQueueFull(f"{self._queue.maxsize} query embeddings already waiting")
+        with self._lock:
+            self.requests += 1
+        return future.result(timeout=self.result_timeout)
+
+    def _start_workers(self):
+        # Started on first use, so processes that only build indexes run no threads
+        if self._workers:
+            return
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.worker_count):
+                worker = threading.Thread(target=self._run, name=f"embedding-batcher-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _collect(self) -> List:
+        """Block for one request, then gather more until the batch is full or max_wait has passed"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size and batch[-1] is not None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        # A None from close() ends the worker; it is queued behind the requests still waiting
+        while True:
+            batch = self._collect()
+            requests = [request for request in batch if request is not None]
+            if requests:
+                self._embed(requests)
+            if len(requests) < len(batch):
+                return
+
+    def _embed(self, requests: List):
+        started = time.perf_counter()
+        texts = list(dict.fromkeys(text for text, _, _ in requests))
+        try:
+            vectors = dict(zip(texts, self.embed_batch(texts)))
+        except Exception as e:
+            logger.error(f"Batched query embedding of {len(texts)} texts failed: {e}")
+            with self._lock:
+                self.failed += len(requests)
+            for _, future, _ in requests:
+                future.set_exception(e)
+            return
+
+        for text, future, _ in requests:
+            future.set_result(vectors[text])
+        with self._lock:
+            self.batches += 1
+            self.batch_sizes[len(requests)] += 1
+            self._queue_wait += sum(started - enqueued for _, _, enqueued in requests)
+
+    def stats(self) -> Dict:
+        """Queue depth and batching counters since start"""
+        with self._lock:
+            embedded = sum(size * count for size, count in self.batch_sizes.items())
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "requests": self.requests,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "batches": self.batches,
+                "mean_batch_size": embedded / self.batches if self.batches else 0.0,
+                "max_batch_size": max(self.batch_sizes, default=0),
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "mean_queue_wait_ms": 1000 * self._queue_wait / embedded if embedded else 0.0
+            }
+
+    def close(self):
+        """Stop the workers once the queued requests are served"""
+        for _ in self._workers:
+            self._queue.put(None)
@@ -0,0 +1,191 @@
+import hashlib
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """Content-addressed on-disk store of embedding vectors"""
+
+    def __init__(self, path: str = "embedding_cache/embeddings.sqlite"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Hash chunk text together with the model that embedded it"""
+        digest = hashlib.sha256()
+        digest.update(model.encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Return cached vectors for the given keys, skipping misses"""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        """Store vectors keyed by their content hash"""
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                [(key, model, array("f", vector).tobytes()) for key, vector in items.items()]
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def query_embedder(embeddings: Embeddings) -> Embeddings:
+    """Embeddings whose embed_documents embeds texts as queries
+
+    Most models embed queries and documents alike. Google's models take a task type, and with none
+    set the client embeds everything as documents, its embed_query included; a copy fixed to the
+    query task type embeds questions as queries, singly or in batches.
+    """
+    if hasattr(embeddings, "task_type") and not embeddings.task_type:
+        return embeddings.copy(update={"task_type": "retrieval_query"})
+    return embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the provider, in concurrent batches"""
+
+    def __init__(self, base: Embeddings, cache: Optional[EmbeddingCache] = None,
+                 model_name: str = None, batch_size: int = 100, max_workers: int = 4):
+        self.base = base
+        self.query_base = query_embedder(base)
+        self.cache = cache or EmbeddingCache()
+        self.model_name = model_name or getattr(base, "model", None) or base.__class__.__name__
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, reusing any vector already computed for the same text and model"""
+        return self._embed_cached(texts, self.model_name, self.base)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts as embed_query would, in batches and through the cache (e.g. intent examples)
+
+        Vectors of a query task type are cached apart from the documents embedded with the same model.
+        """
+        if self.query_base is self.base:
+            return self.embed_documents(texts)
+        return self._embed_cached(texts, f"{self.model_name}:query", self.query_base)
+
+    def _embed_cached(self, texts: List[str], model_name: str, base: Embeddings) -> List[List[float]]:
+        keys = [EmbeddingCache.make_key(model_name, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            missing_keys = list(missing)
+            batches = [
+                missing_keys[start:start + self.batch_size]
+                for start in range(0, len(missing_keys), self.batch_size)
+            ]
+            logger.info(
+                f"Embedding {len(missing_keys)} uncached chunks in {len(batches)} batches "
+                f"({len(texts) - len(missing_keys)} cache hits)"
+            )
+
+            def embed_batch(batch_keys):
+                return batch_keys, base.embed_documents([missing[key] for key in batch_keys])
+
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                for batch_keys, batch_vectors in executor.map(embed_batch, batches):
+                    # Round to the stored precision so hits and misses return identical vectors
+                    new_vectors = {
+                        key: array("f", vector).tolist()
+                        for key, vector in zip(batch_keys, batch_vectors)
+                    }
+                    self.cache.put_many(model_name, new_vectors)
+                    vectors.update(new_vectors)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query through the provider"""
+        return self.query_base.embed_query(text)
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic local embeddings from hashed word and word-pair features, for offline use"""
+
+    _token_pattern = re.compile(r"\w+", re.UNICODE)
+
+    def __init__(self, size: int = 256, model: str = "local-hash-v1"):
+        self.size = size
+        self.model = f"{model}-{size}"
+
+    def _features(self, text: str) -> List[str]:
+        tokens = self._token_pattern.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.size
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+
+        norm = math.sqrt(sum(value * value for value in vector))
+        if norm:
+            vector = [value / norm for value in vector]
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
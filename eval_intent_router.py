@@ -0,0 +1,109 @@
+"""Offline evaluation of IntentRouter against the original keyword cascade.
+
+Reads a labelled query set (a JSON list of {"query", "intent"} objects) and
+reports routing accuracy for both routers, the misrouted queries, and
+per-query routing latency. Uses the local HashEmbeddings by default so it runs
+without network access; --google uses the production embedding model.
+
+    python eval_intent_router.py --data intent_eval_set.json
+"""
+import argparse
+import json
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+from embeddings import HashEmbeddings, query_embedder
+from intent_router import INTENT_EXAMPLES, IntentRouter, keyword_intent
+
+
+def percentile(samples, q):
+    return float(np.percentile(samples, q)) * 1000 if samples else 0.0
+
+
+def normalize(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def training_overlap(examples):
+    """Labelled queries that are also centroid examples, up to case and punctuation"""
+    seeds = {normalize(text) for texts in INTENT_EXAMPLES.values() for text in texts}
+    return [example["query"] for example in examples if normalize(example["query"]) in seeds]
+
+
+def evaluate(router: IntentRouter, examples):
+    """Return (results, router latencies, keyword latencies) for a labelled set"""
+    results = []
+    router_latencies = []
+    keyword_latencies = []
+    for example in examples:
+        start = time.perf_counter()
+        routed = router.route(example["query"])
+        router_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        keyword = keyword_intent(example["query"])
+        keyword_latencies.append(time.perf_counter() - start)
+
+        results.append({
+            "query": example["query"],
+            "expected": example["intent"],
+            "router": routed.intent,
+            "score": routed.score,
+            "keyword": keyword
+        })
+    return results, router_latencies, keyword_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="intent_eval_set.json")
+    parser.add_argument("--google", action="store_true", help="use GoogleGenerativeAIEmbeddings (needs GOOGLE_API_KEY)")
+    args = parser.parse_args()
+
+    with open(args.data, "r", encoding="utf-8") as f:
+        examples = json.load(f)
+
+    # Scoring the router on its own centroid seeds would overstate its accuracy
+    overlap = training_overlap(examples)
+    if overlap:
+        raise SystemExit(f"{len(overlap)} evaluation queries are router training examples: {overlap}")
+
+    if args.google:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        # Examples (embed_documents) and questions (embed_query) both with the query task type
+        embeddings = query_embedder(GoogleGenerativeAIEmbeddings(model="models/embedding-001"))
+    else:
+        embeddings = HashEmbeddings()
+
+    start = time.perf_counter()
+    router = IntentRouter(embeddings)
+    compile_time = time.perf_counter() - start
+
+    results, router_latencies, keyword_latencies = evaluate(router, examples)
+    total = len(results)
+    router_correct = sum(r["router"] == r["expected"] for r in results)
+    keyword_correct = sum(r["keyword"] == r["expected"] for r in results)
+
+    print(f"Labelled queries: {total}  (router compiled in {compile_time * 1000:.1f} ms)")
+    print(f"{'router':<10} accuracy {router_correct / total:6.1%}  "
+          f"p50 {percentile(router_latencies, 50):7.3f} ms  p95 {percentile(router_latencies, 95):7.3f} ms")
+    print(f"{'keywords':<10} accuracy {keyword_correct / total:6.1%}  "
+          f"p50 {percentile(keyword_latencies, 50):7.3f} ms  p95 {percentile(keyword_latencies, 95):7.3f} ms")
+
+    confusions = Counter((r["expected"], r["router"]) for r in results if r["router"] != r["expected"])
+    if confusions:
+        print("\nRouter confusions (expected -> routed):")
+        for (expected, routed), count in confusions.most_common():
+            print(f"  {expected:>10} -> {routed:<10} x{count}")
+
+    print("\nMisrouted queries:")
+    for r in results:
+        if r["router"] != r["expected"] or r["keyword"] != r["expected"]:
+            print(f"  [{r['expected']}] router={r['router']} ({r['score']:.2f}) keyword={r['keyword']}  {r['query']}")
+
+
+if __name__ == "__main__":
+    main()
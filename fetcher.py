@@ -0,0 +1,87 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host by a minimum interval"""
+
+    def __init__(self, min_interval: float = 1.0, host_intervals: Dict[str, float] = None):
+        self.min_interval = min_interval
+        self.host_intervals = host_intervals or {}
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        """Block until the host of this URL may be contacted again"""
+        host = urlsplit(url).netloc
+        interval = self.host_intervals.get(host, self.min_interval)
+
+        # Reserve the next free slot under the lock, then sleep outside it
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ConcurrentFetcher:
+    """Thread-pool fetch engine over a pooled session, parsing each response as soon as it arrives"""
+
+    def __init__(self, session: requests.Session = None, max_workers: int = 8,
+                 pool_size: int = 16, min_interval: float = 1.0,
+                 host_intervals: Dict[str, float] = None, timeout: float = 30):
+        self.session = session or requests.Session()
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.rate_limiter = HostRateLimiter(min_interval, host_intervals)
+
+        # Keep connections alive per host and retry transient server errors
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, url: str, **kwargs) -> requests.Response:
+        """GET a URL once its host's rate limit allows"""
+        self.rate_limiter.wait(url)
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def map(self, jobs: List[Dict[str, Any]], handler: Callable, label: Callable = None) -> List[Any]:
+        """Fetch every job's "url" concurrently and return handler(job, response) results in job order
+
+        Jobs may carry "headers" for the request. Failed jobs are logged and left out of the results.
+        """
+        label = label or (lambda job: job["url"])
+
+        def run(job):
+            try:
+                response = self.fetch(job["url"], headers=job.get("headers"))
+                return True, handler(job, response)
+            except Exception as e:
+                logger.error(f"Error scraping {label(job)}: {str(e)}")
+                return False, None
+
+        if not jobs:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            outcomes = list(executor.map(run, jobs))
+
+        return [result for ok, result in outcomes if ok]
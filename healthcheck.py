@@ -0,0 +1,115 @@
+"""Readiness probe for the chat app.
+
+Ready means: the prebuilt index artifact is complete and its FAISS header can
+be memory-mapped, the Streamlit server answers its health endpoint (with
+--url), and, with --require-loaded, a session has loaded the RAG system. Prints
+a JSON report and exits 0 when ready, 1 otherwise, so it can back an exec
+readiness probe:
+
+    python healthcheck.py --artifact vector_store --url http://localhost:8501
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+
+import index_versions
+
+# Written by the app once a session has loaded the RAG system
+READY_FILE = os.environ.get("UMRAH_READY_FILE", os.path.join(tempfile.gettempdir(), "umrah_ready.json"))
+
+ARTIFACT_FILES = ["index.faiss", "index.pkl", "artifact.json"]
+
+
+def mark_ready(artifact: dict = None, path: str = READY_FILE):
+    """Record that this process has loaded the RAG system"""
+    state = {
+        "pid": os.getpid(),
+        "version": (artifact or {}).get("version"),
+        "ready_at": time.time()
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def check_artifact(root: str):
+    """Return (ok, detail) for the prebuilt index under root (its current version, if versioned)"""
+    path = index_versions.resolve(root)
+    if path is None:
+        return False, f"no index published under {root}"
+    missing = [name for name in ARTIFACT_FILES if not os.path.exists(os.path.join(path, name))]
+    if missing:
+        return False, f"missing {', '.join(missing)} in {path}"
+
+    try:
+        with open(os.path.join(path, "artifact.json"), "r", encoding="utf-8") as f:
+            artifact = json.load(f)
+
+        # A quantized version is served from its own index file and SQLite docstore
+        serving_files = [artifact["serving_index"], "docstore.sqlite"] if artifact.get("serving_index") else []
+        missing = [name for name in serving_files if not os.path.exists(os.path.join(path, name))]
+        if missing:
+            return False, f"missing {', '.join(missing)} in {path}"
+
+        # Mapping the index reads only its header, so this stays cheap for large indexes
+        import faiss
+        flags = (faiss.IO_FLAG_MMAP if artifact.get("index_type") == "ivfpq"
+                 else getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)) | faiss.IO_FLAG_READ_ONLY
+        index = faiss.read_index(os.path.join(path, artifact.get("serving_index", "index.faiss")), flags)
+    except Exception as e:
+        return False, f"unreadable artifact: {e}"
+    if index.ntotal != artifact.get("vectors"):
+        return False, f"index has {index.ntotal} vectors, artifact says {artifact.get('vectors')}"
+    return True, f"version {artifact.get('version')} ({index.ntotal} vectors)"
+
+
+def check_server(url: str, timeout: float = 2.0):
+    """Return (ok, detail) for the Streamlit server health endpoint"""
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/_stcore/health", timeout=timeout) as response:
+            return response.status == 200, f"HTTP {response.status}"
+    except OSError as e:
+        return False, str(e)
+
+
+def check_loaded(path: str = READY_FILE):
+    """Return (ok, detail) for the ready marker written by mark_ready"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return False, f"no ready marker at {path}"
+    try:
+        os.kill(state["pid"], 0)
+    except OSError:
+        return False, f"process {state['pid']} that loaded the index is gone"
+    return True, f"version {state.get('version')} loaded by pid {state['pid']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--artifact", default=os.environ.get("UMRAH_INDEX_PATH", "vector_store"))
+    parser.add_argument("--url", help="Streamlit server base URL to probe")
+    parser.add_argument("--require-loaded", action="store_true", help="also require the ready marker")
+    parser.add_argument("--ready-file", default=READY_FILE)
+    args = parser.parse_args()
+
+    checks = {"artifact": check_artifact(args.artifact)}
+    if args.url:
+        checks["server"] = check_server(args.url)
+    if args.require_loaded:
+        checks["loaded"] = check_loaded(args.ready_file)
+
+    ready = all(ok for ok, _ in checks.values())
+    print(json.dumps({"ready": ready, "checks": {name: {"ok": ok, "detail": detail}
+                                                  for name, (ok, detail) in checks.items()}}))
+    sys.exit(0 if ready else 1)
+
+
+if __name__ == "__main__":
+    main()
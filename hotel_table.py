@@ -0,0 +1,155 @@
+import json
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Room-type labels from scrape_funadiq_hotels and the flag column each one sets
+FLAG_COLUMNS = {
+    "Kaaba view": "has_kaaba_view",
+    "Haram view": "has_haram_view",
+    "walking distance": "walking_distance",
+    "shuttle": "has_shuttle",
+    "prayer hall": "has_prayer_hall"
+}
+
+CITY_ALIASES = {
+    "mecca": "makkah",
+    "makka": "makkah",
+    "madina": "madinah",
+    "medina": "madinah"
+}
+
+SORT_COLUMNS = {"price": "price_value", "distance": "distance_m", "stars": "stars"}
+
+_distance_pattern = re.compile(r"(\d+(?:[.,]\d+)?)\s*(km|kilometers?|kilometres?|m|meters?|metres?)\b", re.I)
+_amount = r"(\d[\d,]*(?:\.\d+)?)"
+_price_pattern = re.compile(_amount)
+# An amount next to a currency, either side: "SAR 1,250", "$90", "450 SR"
+_currency_price_pattern = re.compile(rf"(?:\b(?:SAR|SR|USD)|\$)\s*{_amount}|{_amount}\s*(?:SAR|SR|USD)\b", re.I)
+
+
+def parse_distance(text: str) -> float:
+    """Parse "350 meters to Haram" or "1.2 km" into meters; inf when there is no distance"""
+    match = _distance_pattern.search(text or "")
+    if not match:
+        return math.inf
+    value = float(match.group(1).replace(",", "."))
+    return value * 1000 if match.group(2).lower().startswith("k") else value
+
+
+def parse_price(text: str) -> float:
+    """Parse the amount of a price string such as "2 adults · SAR 1,250 / night"; inf when there is none
+
+    The amount next to a currency wins over other numbers; without a currency the first amount is taken.
+    """
+    match = _currency_price_pattern.search(text or "") or _price_pattern.search(text or "")
+    if not match:
+        return math.inf
+    amount = next(group for group in match.groups() if group)
+    return float(amount.replace(",", ""))
+
+
+def normalize_city(city: str) -> str:
+    city = city.lower().strip()
+    return CITY_ALIASES.get(city, city)
+
+
+class HotelTable:
+    """Columnar in-memory table of scraped hotels, answering attribute filters and sorts without the LLM
+
+    Each column is a numpy array; city and star values are indexed as row masks and each
+    room-type flag is a boolean column, so a query is a handful of vectorized mask operations.
+    """
+
+    def __init__(self, hotels: List[Dict[str, Any]]):
+        self.hotels = list(hotels)
+        n = len(self.hotels)
+
+        self.city = np.array([normalize_city(hotel.get("city", "")) for hotel in self.hotels], dtype=object)
+        self.stars = np.array([int(hotel.get("stars") or 0) for hotel in self.hotels], dtype=np.int64)
+        self.distance_m = np.array(
+            [parse_distance(hotel.get("distance_to_haram", "")) for hotel in self.hotels], dtype=np.float64
+        )
+        self.price_value = np.array([parse_price(hotel.get("price", "")) for hotel in self.hotels], dtype=np.float64)
+
+        self.flags = {column: np.zeros(n, dtype=bool) for column in FLAG_COLUMNS.values()}
+        for row, hotel in enumerate(self.hotels):
+            for room_type in hotel.get("room_types", []):
+                if room_type in FLAG_COLUMNS:
+                    self.flags[FLAG_COLUMNS[room_type]][row] = True
+
+        self.city_index = {city: self.city == city for city in set(self.city)}
+        self.stars_index = {int(stars): self.stars == stars for stars in set(self.stars)}
+
+    def __len__(self):
+        return len(self.hotels)
+
+    def select(self, city: str = None, stars: int = None, min_stars: int = None,
+               max_distance_m: float = None, max_price: float = None, sort_by: str = None,
+               descending: bool = False, limit: Optional[int] = 10, **flags) -> List[Dict[str, Any]]:
+        """Return hotels matching every given criterion, optionally sorted by price, distance or stars
+
+        Flag keywords are the FLAG_COLUMNS values (has_kaaba_view=True, walking_distance=True, ...);
+        None means "don't care". Rows with an unknown sort value go last.
+        """
+        n = len(self.hotels)
+        mask = np.ones(n, dtype=bool)
+
+        if city:
+            mask &= self.city_index.get(normalize_city(city), np.zeros(n, dtype=bool))
+        if stars:
+            mask &= self.stars_index.get(int(stars), np.zeros(n, dtype=bool))
+        if min_stars:
+            mask &= self.stars >= min_stars
+        if max_distance_m is not None:
+            mask &= self.distance_m <= max_distance_m
+        if max_price is not None:
+            mask &= self.price_value <= max_price
+        for column, wanted in flags.items():
+            if column not in self.flags:
+                raise ValueError(f"Unknown hotel flag: {column}")
+            if wanted is not None:
+                mask &= self.flags[column] == bool(wanted)
+
+        rows = np.flatnonzero(mask)
+        if sort_by:
+            values = getattr(self, SORT_COLUMNS[sort_by])[rows].astype(np.float64)
+            if descending:
+                values = np.where(np.isinf(values), -np.inf, values)
+                rows = rows[np.argsort(-values, kind="stable")]
+            else:
+                rows = rows[np.argsort(values, kind="stable")]
+        if limit is not None:
+            rows = rows[:limit]
+
+        return [self.hotels[row] for row in rows]
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.hotels, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "HotelTable":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+
+def format_hotels(hotels: List[Dict[str, Any]]) -> str:
+    """Render hotel rows as a markdown list"""
+    if not hotels:
+        return "No hotels in our database match those criteria."
+
+    lines = []
+    for hotel in hotels:
+        details = []
+        if hotel.get("stars"):
+            details.append("⭐" * int(hotel["stars"]))
+        for key in ["area", "distance_to_haram", "price"]:
+            if hotel.get(key):
+                details.append(hotel[key])
+        if hotel.get("room_types"):
+            details.append(", ".join(hotel["room_types"]))
+        lines.append(f"- **{hotel['name']}**" + (f" — {' · '.join(details)}" if details else ""))
+    return "\n".join(lines)
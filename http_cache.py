@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urldefrag, urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPCache:
+    """On-disk store of response bodies, their validators and the records parsed from them"""
+
+    def __init__(self, directory: str = "http_cache"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def _path(self, url: str, suffix: str) -> str:
+        key = hashlib.sha256(urldefrag(url)[0].encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def _write(self, path: str, data: bytes):
+        # Write then rename so a crash never leaves a half-written entry behind
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the stored validators for a URL, if its body is also on disk"""
+        meta_path = self._path(url, "json")
+        if not (os.path.exists(meta_path) and os.path.exists(self._path(url, "body"))):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load_body(self, url: str) -> bytes:
+        with open(self._path(url, "body"), "rb") as f:
+            return f.read()
+
+    def store(self, url: str, response: requests.Response):
+        """Keep the body of a response that carries an ETag or Last-Modified validator"""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not (etag or last_modified):
+            # The page can no longer be revalidated, so nothing stored for it may be served again
+            self.delete(url)
+            return
+
+        meta = {
+            "url": urldefrag(url)[0],
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_type": response.headers.get("Content-Type")
+        }
+        self._write(self._path(url, "body"), response.content)
+        self._write(self._path(url, "json"), json.dumps(meta).encode("utf-8"))
+
+        # Records parsed from an older body no longer apply
+        self._remove_records(url)
+
+    def delete(self, url: str):
+        """Forget a URL's body, validators and records"""
+        for suffix in ["json", "body"]:
+            try:
+                os.remove(self._path(url, suffix))
+            except FileNotFoundError:
+                pass
+        self._remove_records(url)
+
+    def _remove_records(self, url: str):
+        prefix = os.path.basename(self._path(url, "records"))
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def get_records(self, url: str, key: str) -> Optional[Any]:
+        """Return records previously extracted from this URL's cached body by the given parser key"""
+        path = self._path(url, f"records.{key}")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put_records(self, url: str, key: str, records: Any):
+        self._write(
+            self._path(url, f"records.{key}"),
+            json.dumps(records, ensure_ascii=False).encode("utf-8")
+        )
+
+    def record(self, url: str, hit: bool, bytes_saved: int = 0):
+        """Count a revalidated hit or a full download for the URL's host"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            host_stats = self.stats.setdefault(host, {"hits": 0, "misses": 0, "bytes_saved": 0})
+            host_stats["hits" if hit else "misses"] += 1
+            host_stats["bytes_saved"] += bytes_saved
+
+
+class CachingSession(requests.Session):
+    """Session that revalidates GETs against an HTTPCache with If-None-Match/If-Modified-Since
+
+    A 304 is turned back into a 200 carrying the cached body, marked with from_cache=True.
+    """
+
+    def __init__(self, cache: HTTPCache):
+        super().__init__()
+        self.cache = cache
+
+    def request(self, method, url, headers=None, **kwargs):
+        if method.upper() != "GET":
+            return super().request(method, url, headers=headers, **kwargs)
+
+        entry = self.cache.lookup(url)
+        headers = dict(headers or {})
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = super().request(method, url, headers=headers, **kwargs)
+        response.from_cache = False
+
+        if response.status_code == 304 and entry:
+            body = self.cache.load_body(url)
+            response._content = body
+            response.status_code = 200
+            if entry.get("content_type"):
+                response.headers["Content-Type"] = entry["content_type"]
+            response.from_cache = True
+            self.cache.record(url, hit=True, bytes_saved=len(body))
+        else:
+            if response.status_code == 200:
+                self.cache.store(url, response)
+            self.cache.record(url, hit=False)
+
+        return response
@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Tuple, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# How a saved index is stored for serving:
+#   flat   the float32 index.faiss and pickled docstore written by langchain (exact search)
+#   sq8    8-bit scalar-quantized codes, a quarter of the flat index, searched exhaustively
+#   ivfpq  inverted lists of product-quantized codes, searched over the nprobe closest lists
+# The flat files are always written too: incremental builds start from them.
+INDEX_TYPES = ["flat", "sq8", "ivfpq"]
+
+# Documents of a quantized index, fetched by id from disk instead of unpickled into each process
+DOCSTORE_FILENAME = "docstore.sqlite"
+
+# Inverted lists probed per query unless the artifact says otherwise
+DEFAULT_NPROBE = 32
+
+# Training on a sample keeps builds fast; quantizers converge well before this
+MAX_TRAINING_VECTORS = 100_000
+
+
+def serving_index_filename(index_type: str) -> str:
+    return "index.faiss" if index_type == "flat" else f"index.{index_type}.faiss"
+
+
+def _pq_subquantizers(dimension: int, dims_per_code: int = 4) -> int:
+    """Largest subquantizer count giving each byte of code at least dims_per_code dimensions
+
+    Four dimensions per byte stores 1/16 of the float32 vector; eight would halve that again but
+    loses noticeably more recall.
+    """
+    for m in range(max(dimension // dims_per_code, 1), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def _training_sample(vectors: np.ndarray, seed: int = 0) -> np.ndarray:
+    if len(vectors) <= MAX_TRAINING_VECTORS:
+        return vectors
+    rows = np.random.default_rng(seed).choice(len(vectors), MAX_TRAINING_VECTORS, replace=False)
+    return vectors[np.sort(rows)]
+
+
+def build_quantized_index(index, index_type: str, nlist: int = None) -> Tuple[object, Dict]:
+    """Return (index, params): a quantized copy of a flat index, rows in the same order
+
+    Row positions stay the same, so the docstore ids and the metadata index apply unchanged.
+    An ivfpq index needs enough rows to train its 256-centroid codebooks; smaller corpora get
+    sq8 instead.
+    """
+    if index_type not in INDEX_TYPES or index_type == "flat":
+        raise ValueError(f"Unknown quantized index type {index_type!r}; expected one of {INDEX_TYPES[1:]}")
+    vectors = index.reconstruct_n(0, index.ntotal)
+    dimension = index.d
+
+    if index_type == "ivfpq" and index.ntotal < 256 * 39:
+        logger.warning(f"{index.ntotal} vectors are too few to train IVF-PQ codebooks; using sq8")
+        index_type = "sq8"
+
+    params = {"index_type": index_type}
+    if index_type == "sq8":
+        quantized = faiss.index_factory(dimension, "SQ8", index.metric_type)
+    else:
+        # Around 4*sqrt(n) lists, each with at least 39 training points per centroid
+        nlist = nlist or max(1, min(int(4 * np.sqrt(index.ntotal)), index.ntotal // 39))
+        m = _pq_subquantizers(dimension)
+        quantized = faiss.index_factory(dimension, f"IVF{nlist},PQ{m}", index.metric_type)
+        params.update({"nlist": nlist, "pq_subquantizers": m, "nprobe": min(DEFAULT_NPROBE, nlist)})
+
+    quantized.train(_training_sample(vectors))
+    quantized.add(vectors)
+    return quantized, params
+
+
+def read_serving_index(path: str, params: Dict):
+    """Memory-map a saved quantized index read-only"""
+    flags = faiss.IO_FLAG_READ_ONLY
+    if params.get("index_type") == "ivfpq":
+        # Maps the inverted lists; only the coarse centroids are read into memory
+        flags |= faiss.IO_FLAG_MMAP
+        # The precomputed residual tables (nlist x 256 x subquantizers floats) would be private to
+        # each process and do not measurably speed up single-query search; this is process-wide,
+        # which is fine for serving processes that only read indexes
+        faiss.cvar.precomputed_table_max_bytes = 0
+    else:
+        flags |= getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    index = faiss.read_index(path, flags)
+    if params.get("index_type") == "ivfpq":
+        index.nprobe = params.get("nprobe", DEFAULT_NPROBE)
+        # Filtered searches reconstruct rows by position
+        index.make_direct_map()
+    return index
+
+
+class SQLiteDocstore(Docstore):
+    """Read-only langchain docstore kept in SQLite, one row per FAISS position
+
+    Documents are fetched by id as queries need them, so serving processes share the file
+    through the page cache instead of each holding the whole docstore in memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._size = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    @staticmethod
+    def write(path: str, vector_store):
+        """Write the documents of a langchain FAISS store, keyed by docstore id and FAISS position"""
+        if os.path.exists(path):
+            os.remove(path)
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute(
+                "CREATE TABLE documents ("
+                "id TEXT PRIMARY KEY, position INTEGER UNIQUE NOT NULL, content TEXT NOT NULL, metadata TEXT NOT NULL)"
+            )
+            conn.executemany(
+                "INSERT INTO documents (id, position, content, metadata) VALUES (?, ?, ?, ?)",
+                (
+                    (docstore_id, position, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False, default=str))
+                    for position, docstore_id in vector_store.index_to_docstore_id.items()
+                    for doc in [vector_store.docstore.search(docstore_id)]
+                )
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def search(self, search: str) -> Union[str, Document]:
+        with self._lock:
+            row = self._conn.execute("SELECT content, metadata FROM documents WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def docstore_id(self, position: int) -> str:
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM documents WHERE position = ?", (position,)).fetchone()
+        if row is None:
+            raise KeyError(position)
+        return row[0]
+
+    def iter_ids(self) -> Iterator[Tuple[int, str]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT position, id FROM documents ORDER BY position").fetchall()
+        return iter(rows)
+
+    def index_to_docstore_id(self) -> "DocstoreIdMap":
+        return DocstoreIdMap(self)
+
+
+class DocstoreIdMap(Mapping):
+    """Lazy FAISS position -> docstore id mapping, looked up in the SQLite docstore per hit"""
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self.docstore = docstore
+
+    def __getitem__(self, position) -> str:
+        return self.docstore.docstore_id(int(position))
+
+    def __len__(self) -> int:
+        return len(self.docstore)
+
+    def __iter__(self) -> Iterator[int]:
+        return (position for position, _ in self.docstore.iter_ids())
+
+    def items(self) -> List[Tuple[int, str]]:
+        # One query instead of one per row, for MetadataIndex.build
+        return list(self.docstore.iter_ids())
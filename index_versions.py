@@ -0,0 +1,120 @@
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Layout under the index root:
+#   versions/<UTC timestamp>-<corpus hash>/   one complete saved index per build
+#   CURRENT                                   name of the version serving processes load
+VERSIONS_DIRNAME = "versions"
+CURRENT_FILENAME = "CURRENT"
+LOCK_FILENAME = ".build.lock"
+
+
+class BuildInProgress(RuntimeError):
+    """Another process holds the build lock for this index root"""
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def version_name(corpus_hash: str, now: datetime = None) -> str:
+    now = now or datetime.now(timezone.utc)
+    return f"{now:%Y%m%dT%H%M%SZ}-{corpus_hash[:12]}"
+
+
+def version_path(root: str, name: str) -> str:
+    return os.path.join(root, VERSIONS_DIRNAME, name)
+
+
+def list_versions(root: str) -> List[str]:
+    """Complete versions under root, oldest first (names sort by build time)"""
+    directory = os.path.join(root, VERSIONS_DIRNAME)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        name for name in os.listdir(directory)
+        if not name.startswith(".") and os.path.exists(os.path.join(directory, name, "artifact.json"))
+    )
+
+
+def current_version(root: str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, CURRENT_FILENAME), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve(root: str) -> Optional[str]:
+    """Directory of the index to load from root: the current version, or root itself for the flat layout"""
+    name = current_version(root)
+    if name:
+        return version_path(root, name)
+    if os.path.exists(os.path.join(root, "index.faiss")):
+        return root
+    return None
+
+
+def publish(root: str, name: str):
+    """Point CURRENT at a version; readers see either the old or the new name, never a partial write"""
+    if not os.path.exists(os.path.join(version_path(root, name), "artifact.json")):
+        raise ValueError(f"{name} is not a complete index version under {root}")
+
+    tmp_path = os.path.join(root, f".{CURRENT_FILENAME}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(name + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILENAME))
+
+    # Persist the rename itself
+    directory = os.open(root, os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+    logger.info(f"Published index version {name}")
+
+
+def prune(root: str, keep: int = 3) -> List[str]:
+    """Delete all but the newest keep versions, never the current one
+
+    Serving processes that still map a deleted version keep working; the files go away when they
+    reload.
+    """
+    current = current_version(root)
+    removed = []
+    for name in list_versions(root)[:-keep or None]:
+        if name != current:
+            shutil.rmtree(version_path(root, name), ignore_errors=True)
+            removed.append(name)
+    if removed:
+        logger.info(f"Pruned index versions: {', '.join(removed)}")
+    return removed
+
+
+@contextmanager
+def build_lock(root: str):
+    """Hold an exclusive, non-blocking lock on root so concurrent builders do not race"""
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, LOCK_FILENAME), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise BuildInProgress(f"Another index build is running in {root}")
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
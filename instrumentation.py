@@ -0,0 +1,316 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Span records go to their own logger as one JSON object per line
+trace_logger = logging.getLogger("umrah.trace")
+
+# Set UMRAH_INSTRUMENTATION=1 to time the query path; off, span() hands out a shared no-op
+ENABLED = os.environ.get("UMRAH_INSTRUMENTATION", "") not in ("", "0")
+
+# Histogram bucket upper bounds in seconds: 0.1 ms (in-process stages) to about 2 minutes (LLM
+# calls), each 25% above the last
+LATENCY_BUCKETS = [0.0001 * 1.25 ** i for i in range(64)]
+
+# Every span's duration is observed here, labelled by stage
+STAGE_SECONDS = "umrah_stage_seconds"
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; percentiles are bucket upper bounds, within 25% of the true value"""
+
+    def __init__(self, bounds: List[float] = None):
+        self.bounds = list(bounds or LATENCY_BUCKETS)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        bucket = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            cumulative = 0
+            for i, count in enumerate(self.counts):
+                cumulative += count
+                if cumulative >= rank and count:
+                    return self.bounds[min(i, len(self.bounds) - 1)]
+        return self.bounds[-1]
+
+    def cumulative(self) -> Tuple[List[int], int, float]:
+        """(cumulative count per bound plus +Inf, count, sum), read consistently"""
+        with self._lock:
+            counts, total, seconds = list(self.counts), self.count, self.sum
+        running = 0
+        for i, count in enumerate(counts):
+            running += count
+            counts[i] = running
+        return counts, total, seconds
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99)
+        }
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels: Tuple) -> str:
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+
+
+def _series(name: str, labels: Tuple) -> str:
+    return f"{name}{{{_label_text(labels)}}}" if labels else name
+
+
+class MetricsRegistry:
+    """In-process counters and latency histograms, keyed by metric name and labels"""
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def histogram(self, name: str, **labels) -> LatencyHistogram:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe(self, name: str, seconds: float, **labels):
+        self.histogram(name, **labels).observe(seconds)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """{metric name: {label text: value or percentile snapshot}}"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        result: Dict[str, Dict] = {}
+        for (name, labels), value in sorted(counters.items()):
+            result.setdefault(name, {})[_label_text(labels)] = value
+        for (name, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+            result.setdefault(name, {})[_label_text(labels)] = histogram.snapshot()
+        return result
+
+    def percentiles(self, name: str, label: str) -> Dict[str, Dict]:
+        """{label value: percentile snapshot} for one histogram metric, e.g. latency by stage"""
+        with self._lock:
+            histograms = [(dict(labels).get(label), histogram)
+                          for (metric, labels), histogram in self._histograms.items() if metric == name]
+        return {str(value): histogram.snapshot() for value, histogram in sorted(histograms, key=lambda item: str(item[0]))}
+
+    def render_prometheus(self) -> str:
+        """The registry in the Prometheus text exposition format"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{_series(name, labels)} {value:g}")
+        for (name, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            counts, total, seconds = histogram.cumulative()
+            prefix = _label_text(labels) + "," if labels else ""
+            for bound, count in zip(histogram.bounds, counts):
+                lines.append(f'{name}_bucket{{{prefix}le="{bound:.6g}"}} {count}')
+            lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {counts[-1]}')
+            lines.append(f"{_series(name + '_sum', labels)} {seconds:.6f}")
+            lines.append(f"{_series(name + '_count', labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# The innermost open span of the current thread (or task); spans opened under it join its trace
+_current_span: contextvars.ContextVar = contextvars.ContextVar("umrah_span", default=None)
+
+
+class Span:
+    """A timed stage of a request; on exit its duration is recorded and it is logged as JSON
+
+    Attributes set on the span (token counts, cache results, chunk counts) go into its log record.
+    Time added to paused (a stream's consumer working between chunks) is left out of the duration.
+    """
+    recording = True
+
+    def __init__(self, name: str, attributes: Dict):
+        self.name = name
+        self.attributes = attributes
+        parent = _current_span.get()
+        self.span_id = os.urandom(4).hex()
+        self.trace_id = parent.trace_id if parent else os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self._token = None
+        self.start = 0.0
+        self.paused = 0.0
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start - self.paused
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # A generator closed from another context (e.g. by garbage collection) cannot reset
+            pass
+        if exc_type is GeneratorExit:
+            self.attributes["closed_early"] = True
+        elif exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        registry.observe(STAGE_SECONDS, duration, stage=self.name)
+        if trace_logger.isEnabledFor(logging.INFO):
+            trace_logger.info(json.dumps({
+                "ts": time.time(),
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "span": self.name,
+                "duration_ms": round(duration * 1000, 3),
+                **self.attributes
+            }, default=str, ensure_ascii=False))
+        return False
+
+
+class _NoopSpan:
+    """Stands in for Span while instrumentation is off; callers check recording before costly attributes"""
+    recording = False
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_noop_span = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """Time a stage: `with span("embed") as s: ...; s.set(tokens=n)`"""
+    if not ENABLED:
+        return _noop_span
+    return Span(name, attributes)
+
+
+def traced_stream(chunks: Iterable, current, consumer_stage: str = None,
+                  exclude_consumer: bool = False) -> Iterator:
+    """Pass chunks through, recording on the span when the first arrived and how many there were
+
+    The time the consumer spends between chunks (rendering, for Streamlit) is recorded as
+    consumer_ms, and also as a stage of its own when consumer_stage is given. With
+    exclude_consumer, that time is also left out of the span's duration, so a stage that yields
+    (the LLM stream) is timed by its own work only.
+    """
+    if not current.recording:
+        yield from chunks
+        return
+    count = 0
+    consumer = 0.0
+    for chunk in chunks:
+        if not count:
+            current.set(first_chunk_ms=round((time.perf_counter() - current.start) * 1000, 3))
+        count += 1
+        handed_off = time.perf_counter()
+        try:
+            yield chunk
+        finally:
+            # Also counted when the consumer stops early and the stream is closed at this yield
+            waited = time.perf_counter() - handed_off
+            consumer += waited
+            if exclude_consumer:
+                current.paused += waited
+    current.set(chunks=count, consumer_ms=round(consumer * 1000, 3))
+    if consumer_stage:
+        registry.observe(STAGE_SECONDS, consumer, stage=consumer_stage)
+
+
+def increment(name: str, value: float = 1, **labels):
+    """Add to a registry counter, if instrumentation is on"""
+    if ENABLED:
+        registry.increment(name, value, **labels)
+
+
+def enable(log_stream=None):
+    """Turn instrumentation on for this process and send span records to log_stream (stderr) as JSON lines"""
+    global ENABLED
+    ENABLED = True
+    if not trace_logger.handlers:
+        handler = logging.StreamHandler(log_stream or sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        trace_logger.addHandler(handler)
+        trace_logger.setLevel(logging.INFO)
+        trace_logger.propagate = False
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would otherwise fill the log
+        pass
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve the registry at http://host:port/metrics on a daemon thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
+
+
+if ENABLED:
+    enable()
@@ -0,0 +1,188 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from query_parser import ParsedQuery, QueryParser
+
+logger = logging.getLogger(__name__)
+
+# Labelled example queries per intent; each intent is represented by the centroid of their embeddings
+INTENT_EXAMPLES = {
+    "ritual": [
+        "explain the steps of tawaf",
+        "how do I perform sai between safa and marwa",
+        "what are the rules of ihram",
+        "where is the miqat for umrah",
+        "what are the complete steps of umrah",
+        "what should I recite during tawaf",
+        "can women wear anything in ihram",
+        "what breaks ihram",
+        "how many rounds of sai",
+        "umrah ritual guide step by step",
+        "how to perform umrah",
+        "what is forbidden in ihram",
+        "what duas do I say at the kaaba",
+        "how many circuits around the kaaba",
+        "shaving or trimming hair after sai",
+        "where do I enter ihram on the plane",
+        "prayer at maqam ibrahim after tawaf"
+    ],
+    "attraction": [
+        "what attractions should I visit in makkah",
+        "best restaurants in madinah",
+        "places to see in medina",
+        "where can I go shopping in makkah",
+        "cafes near the prophet's mosque",
+        "historical sites to visit around mecca",
+        "food options near the haram",
+        "what to do in madinah after umrah",
+        "holy sites in makkah",
+        "best malls in makkah",
+        "where to eat in medina",
+        "buy souvenirs and dates in madinah",
+        "shopping malls close to the haram",
+        "museums and landmarks in makkah"
+    ],
+    "hotel": [
+        "show me hotels with kaaba view in makkah",
+        "find hotels from 10-14th july for 4 people",
+        "cheap hotel near the haram",
+        "accommodation in madinah for 3 nights",
+        "hotel rooms within walking distance of the haram",
+        "how to get to the hotel from the airport",
+        "5 star hotels in makkah",
+        "where should I stay in medina",
+        "book a room in jeddah",
+        "hotels with free shuttle to haram",
+        "how to get to my hotel",
+        "closest hotel to the prophet's mosque",
+        "family room with haram view"
+    ],
+    "review": [
+        "reviews of hotels in makkah",
+        "what was your umrah experience like",
+        "has anyone stayed at this hotel",
+        "do people recommend the hilton makkah",
+        "user experiences visiting madinah",
+        "tips from people who did umrah",
+        "is the swissotel worth it reddit",
+        "what do pilgrims say about crowds",
+        "share your experience of umrah",
+        "reviews from people who stayed near the haram",
+        "advice from pilgrims who went during ramadan",
+        "what did other people think of their hotel"
+    ],
+    "package": [
+        "umrah packages",
+        "best umrah deals this year",
+        "package with flights and hotel",
+        "vip umrah package price",
+        "any offers for umrah in ramadan",
+        "economy umrah package"
+    ],
+    "train": [
+        "haramain express train schedule",
+        "train from makkah to madinah",
+        "how long is the train to medina",
+        "railway tickets jeddah to makkah",
+        "haramain high speed railway business class",
+        "book train tickets"
+    ],
+    "general": [
+        "what is umrah",
+        "best time of year for umrah",
+        "do I need a visa for umrah",
+        "what is the weather like in makkah",
+        "how much money should I bring",
+        "what should I pack for umrah"
+    ]
+}
+
+# The original keyword cascade, kept for offline comparison and as a fallback without embeddings
+KEYWORD_RULES = [
+    ("ritual", ["ritual", "tawaf", "sai", "ihram", "miqat", "step", "perform", "how to"]),
+    ("attraction", ["attraction", "visit", "see", "shopping", "restaurant", "cafe", "places"]),
+    ("hotel", ["hotel", "accommodation", "stay", "room", "kaaba view", "haram view"]),
+    ("review", ["review", "experience", "stayed", "visited", "recommend"]),
+    ("package", ["package", "deal", "offer"]),
+    ("train", ["train", "haramain", "railway"])
+]
+
+
+def keyword_intent(query: str) -> str:
+    query_lower = query.lower()
+    for intent, words in KEYWORD_RULES:
+        if any(word in query_lower for word in words):
+            return intent
+    return "general"
+
+
+@dataclass
+class RoutedQuery:
+    """Routing decision for one query, with its slots and the query embedding for reuse in retrieval"""
+    intent: str
+    score: float
+    parsed: ParsedQuery
+    query_vector: Optional[List[float]] = None
+
+
+class IntentRouter:
+    """Nearest-centroid intent classifier over query embeddings
+
+    Centroids are computed once at construction from INTENT_EXAMPLES (through the embedding cache,
+    so restarts do not re-embed them). Routing a query costs one query embedding and a small
+    matrix-vector product; slots come from the same call via QueryParser. When the best centroid
+    scores below min_score the router defers to a matching keyword rule, if any.
+    """
+
+    def __init__(self, embeddings, examples: Dict[str, List[str]] = None, parser: QueryParser = None,
+                 min_score: float = 0.2):
+        self.embeddings = embeddings
+        self.min_score = min_score
+        self.parser = parser or QueryParser()
+        examples = examples or INTENT_EXAMPLES
+
+        self.intents = list(examples)
+        texts = [text for intent in self.intents for text in examples[intent]]
+        # Examples are embedded as queries, like the questions routed against them; with a task-typed
+        # model (Google) document vectors would sit in another space
+        embed_examples = getattr(embeddings, "embed_queries", embeddings.embed_documents)
+        vectors = self._unit_rows(np.asarray(embed_examples(texts), dtype=np.float32))
+
+        centroids = []
+        start = 0
+        for intent in self.intents:
+            count = len(examples[intent])
+            centroids.append(vectors[start:start + count].mean(axis=0))
+            start += count
+        self.centroids = self._unit_rows(np.stack(centroids))
+        logger.info(f"Intent router compiled with {len(self.intents)} intents from {len(texts)} examples")
+
+    @staticmethod
+    def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def scores(self, query_vector: List[float]) -> Dict[str, float]:
+        vector = np.asarray(query_vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        return dict(zip(self.intents, (self.centroids @ vector).tolist()))
+
+    def route(self, query: str) -> RoutedQuery:
+        """Classify a query and extract its slots"""
+        query_vector = self.embeddings.embed_query(query)
+        scores = self.scores(query_vector)
+        intent = max(scores, key=scores.get)
+        if scores[intent] < self.min_score:
+            fallback = keyword_intent(query)
+            if fallback != "general":
+                intent = fallback
+        return RoutedQuery(
+            intent=intent,
+            score=scores[intent],
+            parsed=self.parser.parse(query),
+            query_vector=query_vector
+        )
@@ -0,0 +1,247 @@
+import logging
+import queue
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from instrumentation import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderUnavailable(RuntimeError):
+    """Every provider failed or timed out for a request"""
+
+
+@dataclass
+class Provider:
+    """One LLM backend behind the gateway; llm is any langchain chat model (invoke and stream)
+
+    timeout bounds the wait for the first output, including the wait for one of max_concurrent
+    slots, and then each gap between streamed chunks. A call that times out keeps its slot until
+    the underlying request really returns, so the limit counts requests actually in flight.
+    """
+    name: str
+    llm: Any
+    max_concurrent: int = 8
+    timeout: float = 30.0
+    retries: int = 2
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    counts: Counter = field(default_factory=Counter)
+
+    def __post_init__(self):
+        self.slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+
+    def count(self, event: str, delta: int = 1):
+        with self._lock:
+            self.counts[event] += delta
+
+
+class _Attempt:
+    """One call to one provider on its own thread, reporting ("output" | "done" | "error") events"""
+
+    def __init__(self, provider: Provider, prompt: Any, stream: bool, events: queue.Queue, hedge: bool = False):
+        self.provider = provider
+        self.prompt = prompt
+        self.stream = stream
+        self.events = events
+        self.hedge = hedge
+        self.started = time.perf_counter()
+        self.deadline = self.started + provider.timeout
+        self.cancelled = threading.Event()
+        provider.count("attempts")
+        threading.Thread(target=self._run, name=f"llm-{provider.name}", daemon=True).start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _run(self):
+        provider = self.provider
+        if not provider.slots.acquire(timeout=provider.timeout):
+            self.events.put((self, "error", TimeoutError(f"{provider.name}: no free slot within {provider.timeout}s")))
+            return
+        provider.count("in_flight")
+        try:
+            if self.stream:
+                chunks = provider.llm.stream(self.prompt)
+                try:
+                    for chunk in chunks:
+                        if self.cancelled.is_set():
+                            break
+                        self.events.put((self, "output", chunk))
+                finally:
+                    close = getattr(chunks, "close", None)
+                    if close:
+                        close()
+            else:
+                self.events.put((self, "output", provider.llm.invoke(self.prompt)))
+            self.events.put((self, "done", None))
+        except Exception as e:
+            self.events.put((self, "error", e))
+        finally:
+            provider.count("in_flight", -1)
+            provider.slots.release()
+
+
+class LLMGateway:
+    """Single entry point for chat model calls, with per-provider limits, timeouts, retries and fallback
+
+    Providers are tried in order. A failed or timed-out attempt is retried on the same provider
+    after a jittered exponential backoff until its retries are used up, then the next provider
+    takes over. With hedge_percentile set, a request still waiting for the primary's first output
+    after that percentile of its observed latency is also sent to the next provider, and whichever
+    answers first is used. invoke and stream return what the winning model returns, so the
+    gateway stands in for a langchain chat model.
+    """
+
+    def __init__(self, providers: List[Provider], hedge_percentile: float = None, hedge_min_samples: int = 20,
+                 backoff_base: float = 0.25, backoff_cap: float = 4.0):
+        if not providers:
+            raise ValueError("LLMGateway needs at least one provider")
+        self.providers = providers
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def invoke(self, prompt: Any):
+        for output in self._outputs(prompt, stream=False):
+            return output
+
+    def stream(self, prompt: Any) -> Iterator:
+        yield from self._outputs(prompt, stream=True)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait for the primary before hedging, once enough latencies are observed"""
+        primary = self.providers[0]
+        if self.hedge_percentile is None or len(self.providers) < 2 or primary.latency.count < self.hedge_min_samples:
+            return None
+        return primary.latency.percentile(self.hedge_percentile)
+
+    def _backoff(self, attempt_number: int) -> float:
+        # Full jitter keeps retries from many sessions from arriving in lockstep
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt_number - 1)))
+
+    def _outputs(self, prompt: Any, stream: bool) -> Iterator:
+        events = queue.Queue()
+        started = time.perf_counter()
+        hedge_delay = self.hedge_delay()
+        live: List[_Attempt] = []
+        pending = []  # (launch time, provider index) of scheduled retries
+        tries = Counter()
+        next_provider = 1
+        last_error = None
+
+        def launch(index: int, hedge: bool = False):
+            tries[index] += 1
+            live.append(_Attempt(self.providers[index], prompt, stream, events, hedge=hedge))
+
+        def failed(attempt: _Attempt, error: Exception):
+            nonlocal next_provider, last_error
+            live.remove(attempt)
+            last_error = error
+            index = self.providers.index(attempt.provider)
+            logger.warning(f"LLM provider {attempt.provider.name} attempt {tries[index]} failed: {error}")
+            if tries[index] <= attempt.provider.retries:
+                pending.append((time.perf_counter() + self._backoff(tries[index]), index))
+            elif not live and not pending and next_provider < len(self.providers):
+                logger.warning(f"Falling back to LLM provider {self.providers[next_provider].name}")
+                launch(next_provider)
+                next_provider += 1
+
+        launch(0)
+        winner = None
+        try:
+            while winner is None:
+                now = time.perf_counter()
+                for item in [item for item in pending if item[0] <= now]:
+                    pending.remove(item)
+                    launch(item[1])
+                if not live and not pending:
+                    raise ProviderUnavailable(f"All LLM providers failed; last error: {last_error}")
+
+                hedge_at = started + hedge_delay if hedge_delay is not None and next_provider == 1 else None
+                if hedge_at is not None and now >= hedge_at:
+                    self.providers[1].count("hedges")
+                    launch(1, hedge=True)
+                    next_provider = 2
+                    continue
+
+                wake = min([attempt.deadline for attempt in live] + [item[0] for item in pending] +
+                           ([hedge_at] if hedge_at is not None else []))
+                try:
+                    attempt, kind, payload = events.get(timeout=max(0.0, wake - now))
+                except queue.Empty:
+                    for attempt in [attempt for attempt in live if attempt.deadline <= time.perf_counter()]:
+                        attempt.cancel()
+                        attempt.provider.count("timeouts")
+                        failed(attempt, TimeoutError(f"{attempt.provider.name}: no output within "
+                                                     f"{attempt.provider.timeout}s"))
+                    continue
+
+                if attempt not in live:
+                    continue  # a timed-out attempt answering late
+                if kind == "error":
+                    attempt.provider.count("errors")
+                    failed(attempt, payload)
+                    continue
+                winner = attempt
+
+            provider = winner.provider
+            provider.latency.observe(time.perf_counter() - winner.started)
+            provider.count("successes")
+            if winner.hedge:
+                provider.count("hedge_wins")
+            for attempt in live:
+                if attempt is not winner:
+                    attempt.cancel()
+
+            while kind != "done":
+                if kind == "error":
+                    raise payload
+                yield payload
+                # Once output has started the answer cannot move to another provider, only stop
+                while True:
+                    try:
+                        attempt, kind, payload = events.get(timeout=provider.timeout)
+                    except queue.Empty:
+                        raise TimeoutError(f"{provider.name} stalled for {provider.timeout}s mid-answer")
+                    if attempt is winner:
+                        break
+        finally:
+            for attempt in live:
+                attempt.cancel()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-provider counters and time-to-first-output percentiles"""
+        return {
+            provider.name: {**provider.counts, "latency": provider.latency.snapshot()}
+            for provider in self.providers
+        }
+
+
+def gemini_provider(api_key: str, model: str = "gemini-1.5-flash", temperature: float = 0.3, **options) -> Provider:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    # The gateway bounds the wait and owns retries; the client's own retry loop on quota errors can
+    # run for minutes, holding the provider slot until it gives up
+    timeout = options.get("timeout", 30.0)
+    llm = ChatGoogleGenerativeAI(model=model, google_api_key=api_key, temperature=temperature,
+                                 timeout=timeout, max_retries=1)
+    return Provider("gemini", llm, **options)
+
+
+def openai_provider(api_key: str, model: str = "gpt-3.5-turbo", temperature: float = 0.7, **options) -> Provider:
+    import httpx
+    from langchain_openai import ChatOpenAI
+    timeout = options.get("timeout", 30.0)
+    max_concurrent = options.get("max_concurrent", 8)
+    # One pooled client per process: connections are reused, and no more are opened than calls allowed
+    http_client = httpx.Client(limits=httpx.Limits(max_connections=max_concurrent,
+                                                   max_keepalive_connections=max_concurrent))
+    llm = ChatOpenAI(model=model, openai_api_key=api_key, temperature=temperature,
+                     request_timeout=timeout, max_retries=0, http_client=http_client)
+    return Provider("openai", llm, **options)
@@ -0,0 +1,149 @@
+import json
+import logging
+import pickle
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataIndex:
+    """Inverted index from metadata values to FAISS row positions, for exact search over filtered subsets
+
+    Built from a langchain FAISS store's docstore. A filtered query intersects the posting lists of
+    its filter values, then scores only the matching rows, so it always returns min(k, matches)
+    results and its cost grows with the subset size rather than the corpus size.
+    """
+
+    def __init__(self, postings: Dict, size: int, subset_cache_bytes: int = 64 << 20):
+        self.postings = postings
+        self.size = size
+        self.subset_cache_bytes = subset_cache_bytes
+        self._subset_cache = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, vector_store) -> "MetadataIndex":
+        """Index every scalar metadata value of every row in the store"""
+        postings = defaultdict(list)
+        for position, docstore_id in vector_store.index_to_docstore_id.items():
+            doc = vector_store.docstore.search(docstore_id)
+            for key, value in doc.metadata.items():
+                if isinstance(value, (str, int, float, bool)):
+                    postings[(key, cls._value_key(value))].append(position)
+
+        postings = {
+            posting_key: np.array(sorted(positions), dtype=np.int64)
+            for posting_key, positions in postings.items()
+        }
+        logger.info(f"Metadata index built: {len(postings)} values over {len(vector_store.index_to_docstore_id)} rows")
+        return cls(postings, len(vector_store.index_to_docstore_id))
+
+    def save(self, path: str):
+        # One flat positions array plus offsets: tens of thousands of tiny arrays pickle and load slowly
+        keys = list(self.postings)
+        lengths = [len(self.postings[key]) for key in keys]
+        offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]) if keys else np.zeros(1, dtype=np.int64)
+        positions = np.concatenate([self.postings[key] for key in keys]) if keys else np.empty(0, dtype=np.int64)
+        with open(path, "wb") as f:
+            pickle.dump({"keys": keys, "offsets": offsets, "positions": positions, "size": self.size}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> "MetadataIndex":
+        """Load an index written by save; the file is produced by our own builds, so it is trusted"""
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        offsets = state["offsets"].tolist()
+        positions = state["positions"]
+        postings = {key: positions[offsets[i]:offsets[i + 1]] for i, key in enumerate(state["keys"])}
+        return cls(postings, state["size"])
+
+    @staticmethod
+    def _value_key(value):
+        # Keep True and 1 apart; they hash the same in a plain dict key
+        return (type(value).__name__ if isinstance(value, bool) else "value", value)
+
+    def candidates(self, filter_dict: Dict) -> np.ndarray:
+        """Return the sorted row positions matching every filter entry (a list value matches any of its items)"""
+        result = None
+        for key, value in filter_dict.items():
+            values = value if isinstance(value, list) else [value]
+            matches = [
+                self.postings.get((key, self._value_key(item)), np.empty(0, dtype=np.int64))
+                for item in values
+            ]
+            positions = np.unique(np.concatenate(matches)) if len(matches) > 1 else matches[0]
+            result = positions if result is None else np.intersect1d(result, positions, assume_unique=True)
+            if result.size == 0:
+                break
+        if result is None:
+            return np.arange(self.size, dtype=np.int64)
+        return result
+
+    @staticmethod
+    def _flat_vectors(index) -> Optional[np.ndarray]:
+        """A zero-copy (ntotal, d) view of a flat index's vectors, memory-mapped or not; None for other indexes"""
+        if not hasattr(index, "get_xb") or index.ntotal == 0:
+            return None
+        import faiss
+        return faiss.rev_swig_ptr(index.get_xb(), index.ntotal * index.d).reshape(index.ntotal, index.d)
+
+    def _subset(self, index, filter_dict: Dict):
+        """Return (positions, vectors) for a filter
+
+        Flat indexes are read in place, so a mapped index stays shared between processes. Quantized
+        indexes have to reconstruct rows; those subsets are kept in an LRU bounded by subset_cache_bytes.
+        """
+        flat = self._flat_vectors(index)
+        if flat is not None:
+            positions = self.candidates(filter_dict)
+            return positions, flat[positions]
+
+        cache_key = json.dumps(filter_dict, sort_keys=True, default=str)
+        with self._lock:
+            if cache_key in self._subset_cache:
+                self._subset_cache.move_to_end(cache_key)
+                return self._subset_cache[cache_key]
+
+        positions = self.candidates(filter_dict)
+        vectors = index.reconstruct_batch(positions) if positions.size else np.empty((0, index.d), dtype=np.float32)
+
+        if vectors.nbytes <= self.subset_cache_bytes:
+            with self._lock:
+                if cache_key not in self._subset_cache:
+                    self._subset_cache[cache_key] = (positions, vectors)
+                    self._cached_bytes += vectors.nbytes
+                while self._cached_bytes > self.subset_cache_bytes:
+                    _, (_, evicted) = self._subset_cache.popitem(last=False)
+                    self._cached_bytes -= evicted.nbytes
+        return positions, vectors
+
+    def search(self, vector_store, query_vector: List[float], k: int, filter_dict: Dict) -> List:
+        """Exact k-nearest search restricted to the rows matching filter_dict"""
+        positions, vectors = self._subset(vector_store.index, filter_dict)
+        if positions.size == 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        if getattr(vector_store, "_normalize_L2", False):
+            query = query / (np.linalg.norm(query) or 1.0)
+
+        # Match the store's metric: inner product indexes rank by similarity, the rest by L2 distance
+        if getattr(vector_store.index, "metric_type", None) == 0:  # faiss.METRIC_INNER_PRODUCT
+            scores = -(vectors @ query)
+        else:
+            scores = ((vectors - query) ** 2).sum(axis=1)
+
+        k = min(k, positions.size)
+        top = np.argpartition(scores, k - 1)[:k]
+        top = top[np.argsort(scores[top])]
+
+        return [
+            vector_store.docstore.search(vector_store.index_to_docstore_id[int(positions[i])])
+            for i in top
+        ]
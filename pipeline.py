@@ -0,0 +1,78 @@
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Blocking branches run here rather than in the event loop's default executor: asyncio.run waits for
+# the default executor on exit, which would make a timed-out branch hold up the whole request
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="pipeline")
+
+# Branch sets started in the background wait here, apart from the workers running their branches
+_background_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="pipeline-background")
+
+
+@dataclass
+class Branch:
+    """One independent step of a request handler
+
+    func is called without arguments and may be a plain function (run on a worker thread) or a
+    coroutine function. If it raises or runs past timeout seconds, the branch yields fallback.
+    """
+    name: str
+    func: Callable[[], Any]
+    timeout: float = 10.0
+    fallback: Any = None
+
+
+@dataclass
+class BranchResult:
+    name: str
+    value: Any
+    elapsed: float
+    error: Optional[str] = None
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def run_branch(branch: Branch) -> BranchResult:
+    start = time.perf_counter()
+    try:
+        if asyncio.iscoroutinefunction(branch.func):
+            awaitable = branch.func()
+        else:
+            # Run in a copy of the caller's context, so spans opened by the branch join the request's trace
+            awaitable = asyncio.get_running_loop().run_in_executor(_executor, contextvars.copy_context().run,
+                                                                   branch.func)
+        value = await asyncio.wait_for(awaitable, branch.timeout)
+        return BranchResult(branch.name, value, time.perf_counter() - start)
+    except asyncio.TimeoutError:
+        logger.warning(f"Branch {branch.name} timed out after {branch.timeout}s, using fallback")
+        return BranchResult(branch.name, branch.fallback, time.perf_counter() - start,
+                            error=f"timed out after {branch.timeout}s", timed_out=True)
+    except Exception as e:
+        logger.error(f"Branch {branch.name} failed, using fallback: {e}")
+        return BranchResult(branch.name, branch.fallback, time.perf_counter() - start, error=str(e))
+
+
+async def gather_branches(branches: List[Branch]) -> Dict[str, BranchResult]:
+    """Run every branch concurrently; the total wait is the slowest branch, capped by its timeout"""
+    results = await asyncio.gather(*(run_branch(branch) for branch in branches))
+    return {result.name: result for result in results}
+
+
+def run_branches(branches: List[Branch]) -> Dict[str, BranchResult]:
+    """Synchronous entry point for callers without a running event loop, such as the Streamlit script"""
+    return asyncio.run(gather_branches(branches))
+
+
+def start_branches(branches: List[Branch]) -> "Future[Dict[str, BranchResult]]":
+    """Start run_branches in the background, for a caller that streams other output meanwhile"""
+    return _background_executor.submit(contextvars.copy_context().run, run_branches, branches)
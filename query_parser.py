@@ -0,0 +1,158 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Optional, Set
+
+CITY_WORDS = {
+    "makkah": "makkah", "mecca": "makkah", "makka": "makkah", "haram": "makkah",
+    "madinah": "madinah", "medina": "madinah", "madina": "madinah",
+    "jeddah": "jeddah"
+}
+
+# "haram" also names the Prophet's mosque, so it only decides the city when no city is named
+WEAK_CITY_WORDS = {"haram"}
+
+FEATURE_WORDS = {
+    "kaaba view": "has_kaaba_view",
+    "haram view": "has_haram_view",
+    "walking distance": "walking_distance",
+    "shuttle": "has_shuttle",
+    "prayer hall": "has_prayer_hall"
+}
+
+SORT_WORDS = {
+    "cheapest": "price", "lowest price": "price", "budget": "price",
+    "closest": "distance", "nearest": "distance"
+}
+
+GUEST_WORDS = {
+    "people": "adults", "person": "adults", "persons": "adults", "pax": "adults",
+    "guest": "adults", "guests": "adults", "adult": "adults", "adults": "adults",
+    "child": "children", "children": "children", "kid": "children", "kids": "children"
+}
+
+MONTHS = {
+    'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3,
+    'april': 4, 'apr': 4, 'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7,
+    'august': 8, 'aug': 8, 'september': 9, 'sep': 9, 'october': 10, 'oct': 10,
+    'november': 11, 'nov': 11, 'december': 12, 'dec': 12
+}
+
+
+def _alternation(words) -> str:
+    # Longest first so "walking distance" wins over any shorter overlapping word
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+_MONTH = rf"(?:{_alternation(MONTHS)})"
+_ORDINAL = r"(?:st|nd|rd|th)?"
+_UNTIL = r"\s*(?:-|–|to|until|till)\s*"
+
+# One compiled pattern; each top-level named group is a slot, so a single finditer pass fills them all.
+# Matches can only start at a word boundary, and the digit-led and letter-led slots are split by a
+# lookahead, so most positions are rejected after one character test.
+SLOT_PATTERN = re.compile(
+    r"\b(?:(?=\d)(?:"
+    # 2027-07-10 to 2027-07-14, as generated by the sidebar search form
+    rf"(?P<iso>(?P<iso_in>\d{{4}}-\d{{2}}-\d{{2}})(?:{_UNTIL}(?P<iso_out>\d{{4}}-\d{{2}}-\d{{2}}))?\b)"
+    # 10-14th july, 28 july - 3 august
+    rf"|(?P<range>(?P<day_start>\d{{1,2}}){_ORDINAL}(?:\s+(?P<month_start>{_MONTH}))?{_UNTIL}"
+    rf"(?P<day_end>\d{{1,2}}){_ORDINAL}\s+(?:of\s+)?(?P<month_end>{_MONTH})\b)"
+    r"|(?P<nights>(?P<night_count>\d{1,2})\s*nights?\b)"
+    rf"|(?P<guests>(?P<guest_count>\d{{1,2}})\s*(?P<guest_kind>{_alternation(GUEST_WORDS)})\b)"
+    r"|(?P<stars>(?P<star_count>[1-5])\s*-?\s*stars?\b)"
+    r")|(?=[a-z])(?:"
+    # july 10-14, july 28 - august 3
+    rf"(?P<month_range>(?P<mr_month_start>{_MONTH})\s+(?P<mr_day_start>\d{{1,2}}){_ORDINAL}{_UNTIL}"
+    rf"(?:(?P<mr_month_end>{_MONTH})\s+)?(?P<mr_day_end>\d{{1,2}}){_ORDINAL}\b)"
+    rf"|(?P<sort>(?:{_alternation(SORT_WORDS)})\b)"
+    rf"|(?P<feature>(?:{_alternation(FEATURE_WORDS)})\b)"
+    rf"|(?P<city>(?:{_alternation(CITY_WORDS)})\b)"
+    r"))"
+)
+
+
+@dataclass
+class ParsedQuery:
+    """Slots extracted from a user query; fields stay None when the query does not mention them"""
+    text: str
+    city: Optional[str] = None
+    check_in: Optional[date] = None
+    check_out: Optional[date] = None
+    nights: Optional[int] = None
+    adults: Optional[int] = None
+    children: Optional[int] = None
+    stars: Optional[int] = None
+    sort_by: Optional[str] = None
+    features: Set[str] = field(default_factory=set)
+
+
+class QueryParser:
+    """Single-pass slot extractor for city, stay dates, guests, star rating, sort order and hotel features
+
+    The query is lowercased once and scanned once with SLOT_PATTERN. The first mention of each
+    slot wins (features accumulate). A check-in month earlier than the current month is taken to
+    mean next year; a "N nights" mention fills in the check-out date when only check-in is known.
+    """
+
+    def parse(self, query: str, today: date = None) -> ParsedQuery:
+        today = today or date.today()
+        parsed = ParsedQuery(text=query)
+        weak_city = None
+
+        for match in SLOT_PATTERN.finditer(query.lower()):
+            kind = match.lastgroup
+            if kind == "feature":
+                parsed.features.add(FEATURE_WORDS[match.group("feature")])
+            elif kind == "city":
+                word = match.group("city")
+                if word in WEAK_CITY_WORDS:
+                    weak_city = weak_city or CITY_WORDS[word]
+                elif parsed.city is None:
+                    parsed.city = CITY_WORDS[word]
+            elif kind == "guests":
+                slot = GUEST_WORDS[match.group("guest_kind")]
+                if getattr(parsed, slot) is None:
+                    setattr(parsed, slot, int(match.group("guest_count")))
+            elif kind == "nights":
+                if parsed.nights is None:
+                    parsed.nights = int(match.group("night_count"))
+            elif kind == "stars":
+                if parsed.stars is None:
+                    parsed.stars = int(match.group("star_count"))
+            elif kind == "sort":
+                if parsed.sort_by is None:
+                    parsed.sort_by = SORT_WORDS[match.group("sort")]
+            elif parsed.check_in is None:
+                self._parse_dates(match, parsed, today)
+
+        if parsed.city is None:
+            parsed.city = weak_city
+        if parsed.nights and parsed.check_in and parsed.check_out is None:
+            parsed.check_out = parsed.check_in + timedelta(days=parsed.nights)
+        return parsed
+
+    @staticmethod
+    def _parse_dates(match, parsed: ParsedQuery, today: date):
+        kind = match.lastgroup
+        try:
+            if kind == "iso":
+                check_in = date.fromisoformat(match.group("iso_in"))
+                check_out = date.fromisoformat(match.group("iso_out")) if match.group("iso_out") else None
+            else:
+                prefix = "mr_" if kind == "month_range" else ""
+                month_end = match.group(prefix + "month_end")
+                month_start = match.group(prefix + "month_start")
+                start_month = MONTHS[month_start or month_end]
+                end_month = MONTHS[month_end] if month_end else start_month
+
+                year = today.year + 1 if start_month < today.month else today.year
+                check_in = date(year, start_month, int(match.group(prefix + "day_start")))
+                # A range ending in an earlier month (28 dec - 3 jan) crosses into the next year
+                end_year = year + 1 if end_month < start_month else year
+                check_out = date(end_year, end_month, int(match.group(prefix + "day_end")))
+        except ValueError:
+            return
+
+        parsed.check_in = check_in
+        parsed.check_out = check_out
@@ -1,53 +1,183 @@
+import hashlib
 import json
 import os
-from typing import List, Dict, Any
+import pickle
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 import numpy as np
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain.vectorstores import FAISS
-from langchain.schema import Document
-from langchain.chains import RetrievalQA
-from langchain_google_genai import ChatGoogleGenerativeAI
-import streamlit as st
+from langchain_core.documents import Document
 import logging
+from embeddings import CachedEmbeddings, EmbeddingCache
+from answer_cache import AnswerCache
+from metadata_index import MetadataIndex
+from bm25 import BM25Index, reciprocal_rank_fusion
+from context import ContextBuilder
+from embedding_batcher import EmbeddingBatcher
+from instrumentation import increment, span, traced_stream
+from hotel_table import CITY_ALIASES, HotelTable, format_hotels, normalize_city
+from scraped_data import DATA_FILES, find_scraped_data, iter_records
+import index_versions
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Maps each source doc_id to its content hash and chunk ids, for incremental updates
+MANIFEST_FILENAME = "doc_manifest.json"
+
+# Metadata recording how a document was found rather than what it says; a Reddit post matched by
+# another search term is the same document and must not be re-embedded
+PROVENANCE_FIELDS = {"search_term"}
+
+# Structured hotel records behind HotelTable, saved next to the index
+HOTELS_FILENAME = "hotels.json"
+
+# Prebuilt metadata inverted index, so serving does not rebuild it from the docstore
+METADATA_INDEX_FILENAME = "metadata_index.pkl"
+
+# Prebuilt BM25 keyword index over the same chunks, for hybrid retrieval
+KEYWORD_INDEX_FILENAME = "keyword_index.pkl"
+
+# Version and shape of a saved index; its presence marks a complete artifact
+ARTIFACT_FILENAME = "artifact.json"
+
+# How HotelTable criteria read in a search question, for hotel queries answered without the hotel table
+HOTEL_CRITERIA_WORDING = {
+    "has_haram_view": "with Haram view",
+    "has_shuttle": "with a shuttle to the Haram",
+    "has_prayer_hall": "with a Haram-connected prayer hall",
+    "min_stars": "with at least {} stars",
+    "max_price": "costing at most {:g} per night",
+    "max_distance_m": "within {:g} m of the Haram",
+    "sort_by": "sorted by {}"
+}
+
+# Each ranking fed to reciprocal rank fusion is this many times deeper than the k documents returned
+HYBRID_DEPTH = 4
+
+# Keyword searches run here while the question is embedded. Kept apart from the pipeline pool,
+# whose workers call into retrieval and would otherwise wait on their own pool
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="keyword-search")
+
+# Heavy dependencies (langchain integrations, faiss) are imported where they are first used, so
+# importing this module stays cheap and a serving process only loads what it needs
+
+@dataclass
+class IndexSnapshot:
+    """Everything a query reads from one index version, replaced as a whole on reload
+    
+    A query takes the current snapshot once and uses it to the end, so a hot reload never mixes
+    two versions within one answer and never waits for in-flight queries.
+    """
+    vector_store: Any = None
+    metadata_index: Optional[MetadataIndex] = None
+    hotel_table: Optional[HotelTable] = None
+    artifact: Optional[Dict] = None
+    path: Optional[str] = None
+    keyword_index: Optional[BM25Index] = None
+
 class UmrahRAGSystem:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, embeddings=None, llm=None,
+                 embedding_cache_path: str = "embedding_cache/embeddings.sqlite",
+                 embed_batch_size: int = 100, embed_max_workers: int = 4,
+                 answer_cache: AnswerCache = None, hybrid_search: bool = True,
+                 context_builder: ContextBuilder = None, batch_query_embeddings: bool = True):
         """Initialize the RAG system with embeddings and vector store"""
         self.api_key = api_key
         os.environ["GOOGLE_API_KEY"] = api_key
         
-        # Initialize embeddings
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=api_key
-        )
+        # Initialize embeddings (any langchain Embeddings can stand in, e.g. HashEmbeddings offline)
+        if embeddings is None:
+            from langchain_google_genai import GoogleGenerativeAIEmbeddings
+            embeddings = GoogleGenerativeAIEmbeddings(
+                model="models/embedding-001",
+                google_api_key=api_key
+            )
         
-        # Initialize LLM
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            google_api_key=api_key,
-            temperature=0.3
+        # Only chunks whose text changed since the last build are sent to the provider
+        self.embeddings = CachedEmbeddings(
+            embeddings,
+            cache=EmbeddingCache(embedding_cache_path),
+            batch_size=embed_batch_size,
+            max_workers=embed_max_workers
         )
         
-        self.vector_store = None
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
-        )
+        # Questions from concurrent sessions are embedded together in batched provider calls
+        self.query_embeddings = EmbeddingBatcher(self.embeddings) if batch_query_embeddings else self.embeddings
+        
+        # Initialize LLM (the chat app passes its shared gateway, which adds a fallback provider)
+        if llm is None:
+            from llm_gateway import LLMGateway, gemini_provider
+            llm = LLMGateway([gemini_provider(api_key)])
+        self.llm = llm
+        
+        # Shared by every session (and the sidebar quick actions) through the cached RAG instance
+        self.answer_cache = answer_cache or AnswerCache()
+        
+        # Fuse BM25 keyword hits with dense hits when the loaded index has a keyword index
+        self.hybrid_search = hybrid_search
+        
+        # Merges, de-duplicates and trims retrieved chunks to the prompt's token budget
+        self.context_builder = context_builder or ContextBuilder()
+        
+        self.snapshot = IndexSnapshot()
+        self.doc_manifest = None
+        self._text_splitter = None
+        self._reload_lock = threading.Lock()
     
-    def load_scraped_data(self, filename="umrah_scraped_data.json"):
-        """Load scraped data from JSON file"""
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            logger.error(f"File {filename} not found. Please run scraper.py first.")
-            return None
+    # Build steps assign these one at a time; each assignment swaps in an updated snapshot
+    @property
+    def vector_store(self):
+        return self.snapshot.vector_store
+    
+    @vector_store.setter
+    def vector_store(self, value):
+        self.snapshot = replace(self.snapshot, vector_store=value)
+    
+    @property
+    def metadata_index(self):
+        return self.snapshot.metadata_index
+    
+    @metadata_index.setter
+    def metadata_index(self, value):
+        self.snapshot = replace(self.snapshot, metadata_index=value)
+    
+    @property
+    def hotel_table(self):
+        return self.snapshot.hotel_table
+    
+    @hotel_table.setter
+    def hotel_table(self, value):
+        self.snapshot = replace(self.snapshot, hotel_table=value)
+    
+    @property
+    def keyword_index(self):
+        return self.snapshot.keyword_index
+    
+    @keyword_index.setter
+    def keyword_index(self, value):
+        self.snapshot = replace(self.snapshot, keyword_index=value)
+    
+    @property
+    def artifact(self):
+        return self.snapshot.artifact
+    
+    @property
+    def text_splitter(self):
+        # Only index builds split text
+        if self._text_splitter is None:
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=1000,
+                chunk_overlap=200,
+                # Lets the context builder merge overlapping chunks of one document
+                add_start_index=True,
+                separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
+            )
+        return self._text_splitter
     
     def process_rituals_data(self, rituals_data: List[Dict]) -> List[Document]:
         """Process ritual data into documents"""
@@ -68,7 +198,8 @@ class UmrahRAGSystem:
                 "source": "nusuk_rituals",
                 "section": ritual['section'],
                 "url": ritual['url'],
-                "type": "ritual_guide"
+                "type": "ritual_guide",
+                "doc_id": f"ritual:{ritual['section']}"
             }
             
             documents.append(Document(page_content=content, metadata=metadata))
@@ -92,7 +223,8 @@ class UmrahRAGSystem:
                     "city": city,
                     "section": section['section'],
                     "url": section['url'],
-                    "type": "destination_info"
+                    "type": "destination_info",
+                    "doc_id": f"destination:{city}:{section['section']}"
                 }
                 
                 documents.append(Document(page_content=content, metadata=metadata))
@@ -122,7 +254,8 @@ class UmrahRAGSystem:
                 "has_kaaba_view": "Kaaba view" in hotel['room_types'],
                 "has_haram_view": "Haram view" in hotel['room_types'],
                 "walking_distance": "walking distance" in hotel['room_types'],
-                "has_shuttle": "shuttle" in hotel['room_types']
+                "has_shuttle": "shuttle" in hotel['room_types'],
+                "doc_id": f"hotel:{hotel['source']}:{hotel['city']}:{hotel['name']}:{hotel['area']}"
             }
             
             documents.append(Document(page_content=content, metadata=metadata))
@@ -146,111 +279,478 @@ class UmrahRAGSystem:
                 "created": post['created'],
                 "url": post['url'],
                 "type": "user_review",
-                "search_term": post['search_term']
+                "search_term": post['search_term'],
+                "doc_id": f"reddit:{post['url']}"
             }
             
             documents.append(Document(page_content=content, metadata=metadata))
         
         return documents
     
-    def create_vector_store(self, documents: List[Document]):
-        """Create FAISS vector store from documents"""
-        logger.info(f"Creating vector store with {len(documents)} documents...")
-        
-        # Split documents into chunks
+    @staticmethod
+    def content_hash(doc: Document) -> str:
+        """Hash a source document's text and metadata to detect changes between scrapes"""
+        metadata = {key: value for key, value in doc.metadata.items() if key not in PROVENANCE_FIELDS}
+        payload = json.dumps(
+            {"content": doc.page_content, "metadata": metadata},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        """Split source documents into chunks with stable ids derived from the source doc_id"""
         split_docs = []
         for doc in documents:
             chunks = self.text_splitter.split_documents([doc])
+            for i, chunk in enumerate(chunks):
+                chunk.metadata["chunk_id"] = f"{doc.metadata['doc_id']}#{i}"
             split_docs.extend(chunks)
+        return split_docs
+    
+    def _embed_chunks(self, chunks: List[Document]):
+        """Return (text, vector) pairs, metadatas and ids ready for the FAISS store"""
+        texts = [doc.page_content for doc in chunks]
+        vectors = self.embeddings.embed_documents(texts)
+        metadatas = [doc.metadata for doc in chunks]
+        ids = [doc.metadata["chunk_id"] for doc in chunks]
+        return list(zip(texts, vectors)), metadatas, ids
+    
+    def _index_documents(self, documents: List[Document]) -> int:
+        """Split, embed and add a batch of source documents, recording their chunks in the manifest"""
+        chunks = self.split_documents(documents)
+        if chunks:
+            # Embed through the cache so unchanged chunks are not re-embedded
+            text_embeddings, metadatas, ids = self._embed_chunks(chunks)
+            if self.vector_store is None:
+                from langchain_community.vectorstores import FAISS
+                self.vector_store = FAISS.from_embeddings(
+                    text_embeddings=text_embeddings,
+                    embedding=self.embeddings,
+                    metadatas=metadatas,
+                    ids=ids
+                )
+            else:
+                self.vector_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        
+        # Remember which chunks belong to which source document
+        for doc in documents:
+            self.doc_manifest[doc.metadata["doc_id"]] = {"hash": self.content_hash(doc), "chunks": []}
+        for chunk in chunks:
+            self.doc_manifest[chunk.metadata["doc_id"]]["chunks"].append(chunk.metadata["chunk_id"])
+        
+        return len(chunks)
+    
+    def create_vector_store(self, documents: Iterable[Document], batch_size: int = 256):
+        """Create FAISS vector store from documents, consumed in batches so any iterable works"""
+        logger.info("Creating vector store...")
+        
+        self.vector_store = None
+        self.doc_manifest = {}
+        document_count = 0
+        chunk_count = 0
         
-        logger.info(f"Split into {len(split_docs)} chunks")
+        batch = []
+        for doc in documents:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                chunk_count += self._index_documents(batch)
+                document_count += len(batch)
+                batch = []
+        if batch:
+            chunk_count += self._index_documents(batch)
+            document_count += len(batch)
+        
+        self.refresh_metadata_index()
+        self.refresh_keyword_index()
         
-        # Create vector store
-        self.vector_store = FAISS.from_documents(
-            documents=split_docs,
-            embedding=self.embeddings
+        logger.info(
+            f"Vector store created successfully from {document_count} documents ({chunk_count} chunks)! "
+            f"(embedding cache: {self.embeddings.hits} hits, {self.embeddings.misses} misses)"
         )
+    
+    def update_vector_store(self, documents: Iterable[Document], batch_size: int = 256,
+                            remove_missing: bool = True) -> Dict[str, int]:
+        """Apply only added, removed and changed source documents to the loaded vector store
+        
+        With remove_missing=False the documents are a delta (such as newly ingested posts) and
+        documents not among them are kept.
+        """
+        stats = {"added": 0, "removed": 0, "changed": 0, "unchanged": 0, "chunks_deleted": 0, "chunks_added": 0}
+        seen = set()
+        stale_ids = []
+        pending = []
+        
+        def flush():
+            # Old chunks must go before their replacements are added under the same ids
+            if stale_ids:
+                self.vector_store.delete(stale_ids)
+                stats["chunks_deleted"] += len(stale_ids)
+                stale_ids.clear()
+            if pending:
+                stats["chunks_added"] += self._index_documents(pending)
+                pending.clear()
+        
+        for doc in documents:
+            doc_id = doc.metadata["doc_id"]
+            seen.add(doc_id)
+            entry = self.doc_manifest.get(doc_id)
+            if entry is None:
+                stats["added"] += 1
+            elif entry["hash"] != self.content_hash(doc):
+                stats["changed"] += 1
+                stale_ids.extend(self.doc_manifest.pop(doc_id)["chunks"])
+            else:
+                stats["unchanged"] += 1
+                continue
+            pending.append(doc)
+            if len(pending) >= batch_size:
+                flush()
+        
+        # Drop the chunks of documents that are no longer scraped
+        if remove_missing:
+            for doc_id in [doc_id for doc_id in self.doc_manifest if doc_id not in seen]:
+                stats["removed"] += 1
+                stale_ids.extend(self.doc_manifest.pop(doc_id)["chunks"])
+        flush()
+        
+        # Deletions shift FAISS row positions, so the inverted indexes are rebuilt
+        self.refresh_metadata_index()
+        self.refresh_keyword_index()
         
-        logger.info("Vector store created successfully!")
+        logger.info(f"Incremental update: {stats}")
+        return stats
     
-    def save_vector_store(self, path="vector_store"):
-        """Save vector store to disk"""
+    def refresh_metadata_index(self):
+        """Rebuild the metadata -> row inverted index used for filtered searches"""
+        self.metadata_index = MetadataIndex.build(self.vector_store) if self.vector_store else None
+    
+    def refresh_keyword_index(self):
+        """Rebuild the BM25 index over the chunks in the vector store"""
+        self.keyword_index = BM25Index.build(self.vector_store) if self.vector_store else None
+    
+    @staticmethod
+    def artifact_version(path: str, extra_files: List[str] = None) -> str:
+        """Content hash of the saved index and docstore (and any quantized serving index)"""
+        digest = hashlib.sha256()
+        for name in ["index.faiss", "index.pkl"] + (extra_files or []):
+            with open(os.path.join(path, name), "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        return digest.hexdigest()[:16]
+    
+    def save_vector_store(self, path="vector_store", artifact_info: Dict = None, index_type: str = "flat"):
+        """Save vector store to disk
+        
+        index_type "sq8" or "ivfpq" also writes a quantized copy of the index and a SQLite docstore,
+        which serving processes memory-map instead of the flat index and pickled docstore.
+        """
         if self.vector_store:
             self.vector_store.save_local(path)
-            logger.info(f"Vector store saved to {path}")
+            storage = {"index_type": "flat"}
+            if index_type != "flat":
+                import faiss
+                from index_storage import (DOCSTORE_FILENAME, SQLiteDocstore, build_quantized_index,
+                                           serving_index_filename)
+                index, storage = build_quantized_index(self.vector_store.index, index_type)
+                storage["serving_index"] = serving_index_filename(storage["index_type"])
+                faiss.write_index(index, os.path.join(path, storage["serving_index"]))
+                SQLiteDocstore.write(os.path.join(path, DOCSTORE_FILENAME), self.vector_store)
+            with open(os.path.join(path, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+                json.dump(self.doc_manifest, f, ensure_ascii=False)
+            if self.hotel_table is not None:
+                self.hotel_table.save(os.path.join(path, HOTELS_FILENAME))
+            if self.metadata_index is not None:
+                self.metadata_index.save(os.path.join(path, METADATA_INDEX_FILENAME))
+            if self.keyword_index is not None:
+                self.keyword_index.save(os.path.join(path, KEYWORD_INDEX_FILENAME))
+            
+            # Written last: a directory with an artifact file holds a complete, loadable index
+            serving_files = [storage["serving_index"]] if "serving_index" in storage else None
+            artifact = {
+                "version": self.artifact_version(path, serving_files),
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "vectors": self.vector_store.index.ntotal,
+                "dimension": self.vector_store.index.d,
+                "hotels": len(self.hotel_table) if self.hotel_table is not None else 0,
+                "embedding_model": self.embeddings.model_name,
+                **storage,
+                **(artifact_info or {})
+            }
+            with open(os.path.join(path, ARTIFACT_FILENAME), 'w', encoding='utf-8') as f:
+                json.dump(artifact, f, indent=2)
+            self.snapshot = replace(self.snapshot, artifact=artifact, path=path)
+            logger.info(f"Vector store saved to {path} (version {self.artifact['version']})")
     
-    def load_vector_store(self, path="vector_store"):
-        """Load vector store from disk"""
+    def _load_snapshot(self, path: str, mmap: bool = False):
+        """Read a saved index directory into (IndexSnapshot, doc_manifest) without touching the live one"""
+        from langchain_community.vectorstores import FAISS
+        artifact = None
+        artifact_path = os.path.join(path, ARTIFACT_FILENAME)
+        if os.path.exists(artifact_path):
+            with open(artifact_path, 'r', encoding='utf-8') as f:
+                artifact = json.load(f)
+        
+        if mmap and artifact and artifact.get("serving_index"):
+            from index_storage import DOCSTORE_FILENAME, SQLiteDocstore, read_serving_index
+            # Quantized codes and documents both stay on disk, shared between processes via the page cache
+            index = read_serving_index(os.path.join(path, artifact["serving_index"]), artifact)
+            docstore = SQLiteDocstore(os.path.join(path, DOCSTORE_FILENAME))
+            vector_store = FAISS(self.embeddings, index, docstore, docstore.index_to_docstore_id())
+        elif mmap:
+            import faiss
+            # Flat indexes need IO_FLAG_MMAP_IFC to map their codes instead of reading them
+            flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+            index = faiss.read_index(os.path.join(path, "index.faiss"), flags)
+            # The docstore pickle is written by save_vector_store, so it is trusted
+            with open(os.path.join(path, "index.pkl"), "rb") as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+            vector_store = FAISS(self.embeddings, index, docstore, index_to_docstore_id)
+        else:
+            # The index and docstore pickle are written by save_vector_store, so they are trusted
+            vector_store = FAISS.load_local(path, self.embeddings, allow_dangerous_deserialization=True)
+        
+        doc_manifest = None
+        manifest_path = os.path.join(path, MANIFEST_FILENAME)
+        if os.path.exists(manifest_path) and not mmap:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                doc_manifest = json.load(f)
+        
+        hotels_path = os.path.join(path, HOTELS_FILENAME)
+        hotel_table = HotelTable.load(hotels_path) if os.path.exists(hotels_path) else None
+        
+        metadata_index = None
+        metadata_index_path = os.path.join(path, METADATA_INDEX_FILENAME)
+        if os.path.exists(metadata_index_path):
+            metadata_index = MetadataIndex.load(metadata_index_path)
+            if metadata_index.size != vector_store.index.ntotal:
+                metadata_index = None
+        if metadata_index is None:
+            metadata_index = MetadataIndex.build(vector_store)
+        
+        keyword_index = None
+        keyword_index_path = os.path.join(path, KEYWORD_INDEX_FILENAME)
+        if os.path.exists(keyword_index_path):
+            keyword_index = BM25Index.load(keyword_index_path)
+            if keyword_index.size != vector_store.index.ntotal:
+                keyword_index = None
+        if keyword_index is None:
+            keyword_index = BM25Index.build(vector_store)
+        
+        snapshot = IndexSnapshot(vector_store, metadata_index, hotel_table, artifact, path, keyword_index)
+        return snapshot, doc_manifest
+    
+    def load_vector_store(self, path="vector_store", mmap: bool = False):
+        """Load vector store from disk
+        
+        path is an index root (its CURRENT version is loaded) or a saved index directory. With
+        mmap=True the index is memory-mapped read-only and the prebuilt metadata index is used as
+        is: loading costs no index copy, but the store cannot be updated in place. If the version was
+        saved with a quantized index_type, that index and its SQLite docstore are mapped instead.
+        """
         try:
-            self.vector_store = FAISS.load_local(path, self.embeddings)
-            logger.info(f"Vector store loaded from {path}")
+            resolved = index_versions.resolve(path)
+            if resolved is None:
+                logger.error(f"No saved index found under {path}")
+                return False
+            self.snapshot, self.doc_manifest = self._load_snapshot(resolved, mmap)
+            self.answer_cache.clear()
+            
+            version = self.artifact["version"] if self.artifact else "unversioned"
+            logger.info(f"Vector store loaded from {resolved} (version {version}{', mmap' if mmap else ''})")
             return True
         except Exception as e:
             logger.error(f"Error loading vector store: {str(e)}")
             return False
     
-    def build_rag_system(self):
-        """Build the complete RAG system"""
-        # Load scraped data
-        data = self.load_scraped_data()
-        if not data:
-            return False
+    def reload_if_changed(self, root: str = "vector_store") -> bool:
+        """Swap in the version CURRENT points at, if it is not the one being served
         
-        # Process all data types
-        all_documents = []
+        The new version is loaded next to the old one and replaces it in a single assignment;
+        queries already running finish on the snapshot they started with.
+        """
+        with self._reload_lock:
+            path = index_versions.resolve(root)
+            if path is None or path == self.snapshot.path:
+                return False
+            try:
+                snapshot, _ = self._load_snapshot(path, mmap=True)
+            except Exception as e:
+                logger.error(f"Keeping index {self.snapshot.path}; could not load {path}: {e}")
+                return False
+            self.snapshot = snapshot
+            self.answer_cache.clear()
+            logger.info(f"Hot-reloaded index {path}")
+            return True
+    
+    def watch_index(self, root: str = "vector_store", interval: float = 30.0) -> threading.Event:
+        """Poll root for a newly published version in a background thread; set the returned event to stop"""
+        stop = threading.Event()
+        
+        def poll():
+            while not stop.wait(interval):
+                self.reload_if_changed(root)
+        
+        threading.Thread(target=poll, name="index-watcher", daemon=True).start()
+        return stop
+    
+    def iter_documents(self, filename: str, hotels: List[Dict] = None) -> Iterator[Document]:
+        """Stream source documents from a scraped data file, one record at a time
         
-        # Process rituals
-        if data.get('rituals'):
-            ritual_docs = self.process_rituals_data(data['rituals'])
-            all_documents.extend(ritual_docs)
-            logger.info(f"Processed {len(ritual_docs)} ritual documents")
+        Hotel records are also appended to the hotels list, when given, for the structured hotel table.
+        """
+        processors = {
+            "rituals": self.process_rituals_data,
+            "destinations": lambda records: self.process_destination_data(
+                [{"city": record["city"], "sections": [record]} for record in records]
+            ),
+            "hotels": self.process_hotel_data,
+            "reddit_reviews": self.process_reddit_data
+        }
+        
+        # The same post or page can be scraped more than once; keep one document per doc_id
+        seen = set()
+        counts = {category: 0 for category in processors}
+        for category, record in iter_records(filename):
+            if category not in processors:
+                continue
+            for doc in processors[category]([record]):
+                if doc.metadata["doc_id"] in seen:
+                    continue
+                seen.add(doc.metadata["doc_id"])
+                counts[category] += 1
+                if category == "hotels" and hotels is not None:
+                    hotels.append(record)
+                yield doc
+        
+        logger.info(f"Processed documents: {counts}")
+    
+    def build_rag_system(self, incremental: bool = False, path: str = "vector_store", data_file: str = None,
+                         base_path: str = None, artifact_info: Dict = None, index_type: str = "flat"):
+        """Build the complete RAG system, optionally updating the saved index in place
         
-        # Process destinations
-        if data.get('destinations'):
-            dest_docs = self.process_destination_data(data['destinations'])
-            all_documents.extend(dest_docs)
-            logger.info(f"Processed {len(dest_docs)} destination documents")
+        An incremental build starts from the index at base_path (default: path) and saves to path,
+        which is how build_index.py derives a new version from the current one.
+        """
+        # Locate scraped data (JSONL, gzipped JSONL or legacy JSON)
+        filename = data_file or find_scraped_data()
+        if not filename or not os.path.exists(filename):
+            logger.error(f"No scraped data found ({data_file or ', '.join(DATA_FILES)}). Please run scraper.py first.")
+            return False
         
-        # Process hotels
-        if data.get('hotels'):
-            hotel_docs = self.process_hotel_data(data['hotels'])
-            all_documents.extend(hotel_docs)
-            logger.info(f"Processed {len(hotel_docs)} hotel documents")
+        # Records are processed as a stream, so memory does not grow with the corpus
+        hotels = []
+        documents = self.iter_documents(filename, hotels=hotels)
         
-        # Process Reddit reviews
-        if data.get('reddit_reviews'):
-            reddit_docs = self.process_reddit_data(data['reddit_reviews'])
-            all_documents.extend(reddit_docs)
-            logger.info(f"Processed {len(reddit_docs)} Reddit documents")
+        base_loaded = incremental and self.load_vector_store(base_path or path) and self.doc_manifest is not None
+        if incremental and not base_loaded:
+            logger.info("No saved index with a document manifest found, doing a full build")
+        elif base_loaded and (self.artifact or {}).get("embedding_model") != self.embeddings.model_name:
+            # Vectors from two embedding models are not comparable, so nothing of the old index is reused
+            logger.warning(f"Saved index was embedded with {(self.artifact or {}).get('embedding_model')}, "
+                           f"not {self.embeddings.model_name}; doing a full build")
+            base_loaded = False
+        if base_loaded:
+            self.update_vector_store(documents)
+        else:
+            self.create_vector_store(documents)
         
-        # Create vector store
-        self.create_vector_store(all_documents)
+        # Hotels are also kept as structured rows for attribute queries
+        self.hotel_table = HotelTable(hotels)
         
         # Save vector store
-        self.save_vector_store()
+        self.save_vector_store(path, artifact_info, index_type=index_type)
+        
+        # Cached answers may cite documents that changed
+        self.answer_cache.clear()
         
         return True
     
-    def query(self, question: str, k: int = 5, filter_dict: Dict = None) -> Dict[str, Any]:
-        """Query the RAG system"""
-        if not self.vector_store:
-            return {"error": "Vector store not initialized"}
-        
-        # Perform similarity search with optional filtering
-        if filter_dict:
-            docs = self.vector_store.similarity_search(
-                question, 
-                k=k,
-                filter=filter_dict
-            )
-        else:
-            docs = self.vector_store.similarity_search(question, k=k)
+    def _retrieve(self, question: str, k: int, filter_dict: Dict, use_cache: bool, query_vector: List[float] = None):
+        """Return (cached_result, docs, query_vector); cached_result is set on a cache hit
         
-        # Format context from retrieved documents
-        context = "\n\n".join([doc.page_content for doc in docs])
+        docs are the context passages for the prompt: the retrieved chunks merged, de-duplicated
+        and fitted to the context builder's token budget.
+        """
+        with span("retrieve", k=k, filtered=bool(filter_dict)) as current:
+            # Repeated questions skip retrieval and the LLM entirely
+            if use_cache:
+                cached = self.answer_cache.get_exact(question, filter_dict, k)
+                if cached:
+                    current.set(cache="exact")
+                    increment("umrah_answer_cache_total", result="exact")
+                    return cached, None, None
+            
+            # The keyword search needs no embedding, so it runs while the question is embedded
+            snapshot = self.snapshot
+            keyword_hits = None
+            fetch_k = k
+            if self.hybrid_search and snapshot.keyword_index is not None:
+                # Both rankings go deeper than k so fusion can promote hits either one ranks lower
+                fetch_k = k * HYBRID_DEPTH
+                candidates = snapshot.metadata_index.candidates(filter_dict) if filter_dict else None
+                keyword_hits = _search_executor.submit(snapshot.keyword_index.search, question, fetch_k, candidates)
+            
+            # Embed once: the vector serves both the semantic cache lookup and the similarity search
+            # (callers that already embedded the question, such as the intent router, pass it in)
+            if query_vector is None:
+                with span("embed"):
+                    query_vector = self.query_embeddings.embed_query(question)
+            if use_cache:
+                cached = self.answer_cache.get_similar(question, filter_dict, k, query_vector)
+                if cached:
+                    current.set(cache="similar")
+                    increment("umrah_answer_cache_total", result="similar")
+                    return cached, None, None
+                current.set(cache="miss")
+                increment("umrah_answer_cache_total", result="miss")
+            
+            with span("search", hybrid=keyword_hits is not None) as search:
+                # Filtered searches score only the rows matching the filter, so they always return k hits when available
+                if filter_dict:
+                    docs = snapshot.metadata_index.search(snapshot.vector_store, query_vector, fetch_k, filter_dict)
+                else:
+                    docs = snapshot.vector_store.similarity_search_by_vector(query_vector, k=fetch_k)
+                
+                if keyword_hits is not None:
+                    docs = self._fuse(snapshot.vector_store, docs, keyword_hits.result(), k)
+                search.set(chunks=len(docs))
+            
+            with span("prompt") as assembly:
+                passages = self.context_builder.build(docs)
+                if assembly.recording:
+                    assembly.set(passages=len(passages), truncated=any(p.metadata.get("truncated") for p in passages),
+                                 context_tokens=sum(self.context_builder.counter.count(p.page_content) for p in passages))
+            increment("umrah_retrieved_chunks_total", len(docs))
+            return None, passages, query_vector
+    
+    @staticmethod
+    def _fuse(vector_store, dense_docs: List[Document], keyword_hits, k: int) -> List[Document]:
+        """Merge dense and keyword rankings by reciprocal rank fusion into the top k documents"""
+        # Chunks are stored under their chunk_id, which is how the two rankings meet
+        docs = {doc.metadata.get("chunk_id", doc.page_content): doc for doc in dense_docs}
+        keyword_ids = [vector_store.index_to_docstore_id[position] for position, _ in keyword_hits]
+        fused = reciprocal_rank_fusion([list(docs), keyword_ids])[:k]
+        return [docs[docstore_id] if docstore_id in docs else vector_store.docstore.search(docstore_id)
+                for docstore_id in fused]
+    
+    def _count_tokens(self, current, prompt: str, answer: str):
+        """Record prompt and answer token counts on an LLM span, only while instrumentation is on"""
+        if not current.recording:
+            return
+        prompt_tokens = self.context_builder.counter.count(prompt)
+        completion_tokens = self.context_builder.counter.count(answer)
+        current.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        increment("umrah_llm_tokens_total", prompt_tokens, kind="prompt")
+        increment("umrah_llm_tokens_total", completion_tokens, kind="completion")
+    
+    def _build_prompt(self, question: str, docs: List[Document]) -> str:
+        # Format context from the assembled passages
+        context = self.context_builder.render(docs)
         
         # Create prompt
-        prompt = f"""Based on the following context about Umrah, hotels, and destinations, 
+        return f"""Based on the following context about Umrah, hotels, and destinations, 
         please answer the question accurately and helpfully.
         
         Context:
@@ -259,24 +759,81 @@ class UmrahRAGSystem:
         Question: {question}
         
         Answer:"""
+    
+    @staticmethod
+    def _format_sources(docs: List[Document]) -> List[Dict]:
+        return [
+            {
+                "content": doc.page_content[:200] + "...",
+                "metadata": doc.metadata
+            } for doc in docs
+        ]
+    
+    def query(self, question: str, k: int = 5, filter_dict: Dict = None, use_cache: bool = True,
+              query_vector: List[float] = None) -> Dict[str, Any]:
+        """Query the RAG system"""
+        if not self.vector_store:
+            return {"error": "Vector store not initialized"}
+        
+        generation = self.answer_cache.generation
+        cached, docs, query_vector = self._retrieve(question, k, filter_dict, use_cache, query_vector)
+        if cached:
+            return cached
         
         # Get response from LLM
-        response = self.llm.invoke(prompt).content
+        prompt = self._build_prompt(question, docs)
+        with span("llm", stream=False) as current:
+            response = self.llm.invoke(prompt).content
+            self._count_tokens(current, prompt, response)
         
         # Return response with sources
-        return {
+        result = {
             "answer": response,
-            "sources": [
-                {
-                    "content": doc.page_content[:200] + "...",
-                    "metadata": doc.metadata
-                } for doc in docs
-            ]
+            "sources": self._format_sources(docs)
         }
+        if use_cache:
+            self.answer_cache.put(question, filter_dict, k, result, query_vector, generation)
+        return result
     
-    def query_hotels(self, city: str = None, stars: int = None, 
-                    has_kaaba_view: bool = None, walking_distance: bool = None) -> List[Dict]:
-        """Query hotels with specific filters"""
+    def query_stream(self, question: str, k: int = 5, filter_dict: Dict = None,
+                     use_cache: bool = True, query_vector: List[float] = None) -> Iterator[Dict[str, Any]]:
+        """Query the RAG system, yielding a "sources" event as soon as retrieval is done, then "token" events
+        
+        An "error" event is yielded instead if the vector store is not initialized.
+        """
+        if not self.vector_store:
+            yield {"type": "error", "error": "Vector store not initialized"}
+            return
+        
+        generation = self.answer_cache.generation
+        cached, docs, query_vector = self._retrieve(question, k, filter_dict, use_cache, query_vector)
+        if cached:
+            yield {"type": "sources", "sources": cached["sources"]}
+            yield {"type": "token", "text": cached["answer"]}
+            return
+        
+        sources = self._format_sources(docs)
+        yield {"type": "sources", "sources": sources}
+        
+        # Relay answer tokens as the LLM produces them
+        prompt = self._build_prompt(question, docs)
+        parts = []
+        with span("llm", stream=True) as current:
+            for chunk in traced_stream(self.llm.stream(prompt), current, exclude_consumer=True):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield {"type": "token", "text": chunk.content}
+            self._count_tokens(current, prompt, "".join(parts))
+        
+        if use_cache:
+            self.answer_cache.put(
+                question, filter_dict, k, {"answer": "".join(parts), "sources": sources}, query_vector, generation
+            )
+    
+    @staticmethod
+    def _hotel_request(city: str = None, stars: int = None, has_kaaba_view: bool = None,
+                       walking_distance: bool = None):
+        """Turn hotel criteria into a question and metadata filter"""
         filter_dict = {"type": "hotel"}
         
         if city:
@@ -296,18 +853,116 @@ class UmrahRAGSystem:
         if walking_distance:
             question += " within walking distance to Haram"
         
-        return self.query(question, k=10, filter_dict=filter_dict)
+        return question, filter_dict
+    
+    @staticmethod
+    def _hotel_search_fallback(question: str, criteria: Dict) -> tuple:
+        """Fold HotelTable criteria into the search question, with a note that they were not applied as filters"""
+        wording = [
+            HOTEL_CRITERIA_WORDING[key].format(value)
+            for key, value in criteria.items()
+            if key in HOTEL_CRITERIA_WORDING and value not in (None, False)
+        ]
+        if not wording:
+            return question, None
+        logger.info(f"No hotel table; criteria only passed to the search as text: {wording}")
+        note = (f"_Without our hotel table these criteria are only part of the search, not exact filters: "
+                f"{', '.join(wording)}._")
+        return f"{question} {' '.join(wording)}", note
+    
+    def _select_hotels(self, city, stars, has_kaaba_view, walking_distance, criteria) -> List[Dict]:
+        with span("hotel_table") as current:
+            hotels = self.hotel_table.select(
+                city=city,
+                stars=stars,
+                has_kaaba_view=has_kaaba_view or None,
+                walking_distance=walking_distance or None,
+                **criteria
+            )
+            current.set(rows=len(hotels))
+            return hotels
+    
+    def _hotel_summary_prompt(self, hotels: List[Dict], question: str) -> str:
+        return f"""Summarize these hotels for a pilgrim asking: "{question}".
+        Keep the given order, mention what sets each one apart and do not invent details.
+        
+        Hotels:
+        {json.dumps(hotels, ensure_ascii=False)}
+        
+        Summary:"""
+    
+    def query_hotels(self, city: str = None, stars: int = None, 
+                    has_kaaba_view: bool = None, walking_distance: bool = None,
+                    summarize: bool = False, **criteria) -> Dict[str, Any]:
+        """Query hotels with specific filters
+        
+        Answered from the structured hotel table when it is available; criteria are passed on to
+        HotelTable.select (min_stars, max_price, max_distance_m, sort_by, limit, has_haram_view, ...).
+        The LLM is only called when summarize is True.
+        """
+        question, filter_dict = self._hotel_request(city, stars, has_kaaba_view, walking_distance)
+        if self.hotel_table is None:
+            question, note = self._hotel_search_fallback(question, criteria)
+            result = self.query(question, k=10, filter_dict=filter_dict)
+            if note and "answer" in result:
+                result = dict(result, answer=f"{note}\n\n{result['answer']}")
+            return result
+        
+        hotels = self._select_hotels(city, stars, has_kaaba_view, walking_distance, criteria)
+        if summarize and hotels:
+            prompt = self._hotel_summary_prompt(hotels, question)
+            with span("llm", stream=False) as current:
+                answer = self.llm.invoke(prompt).content
+                self._count_tokens(current, prompt, answer)
+        else:
+            answer = format_hotels(hotels)
+        
+        return {
+            "answer": answer,
+            "sources": [{"content": hotel["name"], "metadata": hotel} for hotel in hotels],
+            "hotels": hotels
+        }
+    
+    def query_hotels_stream(self, city: str = None, stars: int = None,
+                            has_kaaba_view: bool = None, walking_distance: bool = None,
+                            summarize: bool = False, **criteria) -> Iterator[Dict[str, Any]]:
+        """Streaming variant of query_hotels"""
+        question, filter_dict = self._hotel_request(city, stars, has_kaaba_view, walking_distance)
+        if self.hotel_table is None:
+            question, note = self._hotel_search_fallback(question, criteria)
+            if note:
+                yield {"type": "token", "text": f"{note}\n\n"}
+            yield from self.query_stream(question, k=10, filter_dict=filter_dict)
+            return
+        
+        hotels = self._select_hotels(city, stars, has_kaaba_view, walking_distance, criteria)
+        yield {"type": "sources", "sources": [{"content": hotel["name"], "metadata": hotel} for hotel in hotels]}
+        
+        if summarize and hotels:
+            prompt = self._hotel_summary_prompt(hotels, question)
+            parts = []
+            with span("llm", stream=True) as current:
+                for chunk in traced_stream(self.llm.stream(prompt), current, exclude_consumer=True):
+                    if chunk.content:
+                        parts.append(chunk.content)
+                        yield {"type": "token", "text": chunk.content}
+                self._count_tokens(current, prompt, "".join(parts))
+        else:
+            yield {"type": "token", "text": format_hotels(hotels)}
     
     def query_rituals(self, ritual_name: str) -> Dict[str, Any]:
         """Query specific ritual information"""
         filter_dict = {"type": "ritual_guide"}
         return self.query(f"Explain the {ritual_name} ritual in detail", filter_dict=filter_dict)
     
-    def query_attractions(self, city: str, category: str = None) -> Dict[str, Any]:
-        """Query attractions and destinations"""
+    @staticmethod
+    def _attraction_request(city: str, category: str = None):
+        """Turn a city and optional category into a question and metadata filter"""
+        # Destination pages are scraped under their Nusuk slug ("madina"), so match every spelling of the city
+        canonical = normalize_city(city)
         filter_dict = {
             "type": "destination_info",
-            "city": city.lower()
+            "city": sorted({canonical} | {alias for alias, name in CITY_ALIASES.items() if name == canonical})
         }
         
         if category:
@@ -315,19 +970,35 @@ class UmrahRAGSystem:
         else:
             question = f"What are the main attractions and services in {city}?"
         
+        return question, filter_dict
+    
+    def query_attractions(self, city: str, category: str = None) -> Dict[str, Any]:
+        """Query attractions and destinations"""
+        question, filter_dict = self._attraction_request(city, category)
         return self.query(question, filter_dict=filter_dict)
+    
+    def query_attractions_stream(self, city: str, category: str = None) -> Iterator[Dict[str, Any]]:
+        """Streaming variant of query_attractions"""
+        question, filter_dict = self._attraction_request(city, category)
+        return self.query_stream(question, filter_dict=filter_dict)
 
-# Utility function to initialize RAG in Streamlit
-@st.cache_resource
-def initialize_rag_system(api_key: str):
-    """Initialize and cache the RAG system"""
-    rag = UmrahRAGSystem(api_key)
+# Utility function to initialize RAG for the chat app (which caches the instance)
+def initialize_rag_system(api_key: str, path: str = "vector_store", build_if_missing: bool = False, llm=None):
+    """Initialize the RAG system from a prebuilt index
+    
+    Serving never builds: the index is memory-mapped from path, and without one this returns None.
+    Pass build_if_missing=True for a local development run that may build from scraped data.
+    """
+    rag = UmrahRAGSystem(api_key, llm=llm)
     
     # Try to load existing vector store
-    if not rag.load_vector_store():
+    if not rag.load_vector_store(path, mmap=not build_if_missing):
+        if not build_if_missing:
+            logger.error(f"No prebuilt index at {path}; run `python build_index.py` to build one")
+            return None
         # Build from scratch if not found
         logger.info("Building RAG system from scratch...")
-        if rag.build_rag_system():
+        if rag.build_rag_system(path=path):
             logger.info("RAG system built successfully!")
         else:
             logger.error("Failed to build RAG system")
@@ -340,8 +1011,8 @@ if __name__ == "__main__":
     api_key = os.getenv("GOOGLE_API_KEY", "your-api-key-here")
     rag = UmrahRAGSystem(api_key)
     
-    # Build the system
-    if rag.build_rag_system():
+    # Build the system (pass --incremental to update the saved index in place)
+    if rag.build_rag_system(incremental="--incremental" in sys.argv):
         print("RAG system built successfully!")
         
         # Test queries
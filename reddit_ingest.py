@@ -0,0 +1,246 @@
+"""Incremental Reddit ingestion: fetch only posts newer than the last run and apply them as a delta.
+
+Each subreddit/search term pair is searched newest first and paged with the
+listing's after cursor until it reaches the query's high-water mark (the
+latest created_utc ingested for it), so a run fetches only what was posted
+since the previous one; the first run backfills up to --max-pages pages.
+Posts are deduplicated by id across terms, subreddits and runs. New posts are
+written as reddit_reviews records to a delta JSONL file, optionally appended to
+the scraped data file, and optionally applied to the current index version
+without touching the rest of it. The index is updated before the data file is
+appended to, and the marks and seen ids are saved to the state file last, so
+a run that fails at any step is simply repeated without appending twice.
+--stand-in serves bench_scraper.py's local Reddit stand-in with --posts posts
+per subreddit instead of contacting Reddit.
+
+    python reddit_ingest.py --state reddit_state.json --append-to umrah_scraped_data.jsonl --index-root vector_store
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+from urllib.parse import urlencode
+
+import index_versions
+from fetcher import ConcurrentFetcher
+from scraped_data import JsonlWriter, append_records
+from scraper import UmrahDataScraper, reddit_post_record
+
+logger = logging.getLogger(__name__)
+
+# Reddit serves at most 100 posts per listing page
+MAX_PAGE_SIZE = 100
+
+
+class IngestState:
+    """High-water marks per query and the ids of posts already ingested, kept in a JSON file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.high_water: Dict[str, float] = {}
+        self.seen: Dict[str, float] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.high_water = state.get("high_water", {})
+            self.seen = state.get("seen", {})
+
+    @staticmethod
+    def key(subreddit: str, term: str) -> str:
+        return f"{subreddit}/{term}"
+
+    def prune(self):
+        """Forget ids older than every mark; no query with a mark can return them again"""
+        if self.high_water:
+            oldest = min(self.high_water.values())
+            self.seen = {post_id: created for post_id, created in self.seen.items() if created >= oldest}
+
+    def save(self):
+        self.prune()
+        partial = self.path + ".partial"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump({
+                "updated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "high_water": self.high_water,
+                "seen": self.seen
+            }, f, indent=2, sort_keys=True)
+        os.replace(partial, self.path)
+
+
+class RedditIngester:
+    """Pages Reddit search listings down to each query's high-water mark and collects unseen posts"""
+
+    def __init__(self, state: IngestState, base_url: str = UmrahDataScraper.REDDIT_BASE_URL,
+                 subreddits: List[str] = None, terms: List[str] = None, page_size: int = MAX_PAGE_SIZE,
+                 max_pages: int = 10, fetcher: ConcurrentFetcher = None):
+        self.state = state
+        self.base_url = base_url
+        self.subreddits = subreddits or UmrahDataScraper.REDDIT_SUBREDDITS
+        self.terms = terms or UmrahDataScraper.REDDIT_SEARCH_TERMS
+        self.page_size = min(page_size, MAX_PAGE_SIZE)
+        self.max_pages = max_pages
+        self.fetcher = fetcher or ConcurrentFetcher(min_interval=1.0)
+
+    def search_url(self, subreddit: str, term: str, after: str = None) -> str:
+        params = {"q": term, "restrict_sr": 1, "sort": "new", "limit": self.page_size}
+        if after:
+            params["after"] = after
+        return f"{self.base_url}/r/{subreddit}/search.json?{urlencode(params)}"
+
+    def fetch_query(self, subreddit: str, term: str, high_water: float) -> List[Dict]:
+        """Posts of one search newer than the mark, newest first
+
+        Posts at exactly the mark are returned too; the seen ids tell whether they are new.
+        """
+        posts = []
+        after = None
+        for _ in range(self.max_pages):
+            response = self.fetcher.fetch(self.search_url(subreddit, term, after),
+                                          headers={'User-Agent': 'UmrahBot/1.0'})
+            response.raise_for_status()
+            listing = response.json().get("data", {})
+            children = [child.get("data", {}) for child in listing.get("children", [])]
+            newer = [post for post in children if post.get("created_utc", 0) >= high_water]
+            posts.extend(newer)
+            after = listing.get("after")
+            # Results are newest first, so an older post means the rest were ingested before
+            if len(newer) < len(children) or not after:
+                break
+        else:
+            logger.warning(f"r/{subreddit} '{term}': stopped after {self.max_pages} pages")
+        return posts
+
+    def ingest(self) -> Tuple[List[Dict], Dict[str, float]]:
+        """Return the new reddit_reviews records and the marks to save once they are stored
+
+        A query that fails keeps its old mark, so its posts are fetched again on the next run.
+        """
+        records = []
+        marks = dict(self.state.high_water)
+        for subreddit in self.subreddits:
+            for term in self.terms:
+                key = self.state.key(subreddit, term)
+                high_water = self.state.high_water.get(key, 0)
+                try:
+                    posts = self.fetch_query(subreddit, term, high_water)
+                except Exception as e:
+                    logger.error(f"Error ingesting Reddit {key}: {str(e)}")
+                    continue
+
+                new = 0
+                for post in posts:
+                    post_id = post.get("name") or post.get("id")
+                    if not post_id or post_id in self.state.seen:
+                        continue
+                    self.state.seen[post_id] = post.get("created_utc", 0)
+                    record = reddit_post_record(post, subreddit, term)
+                    if record["title"] and record["content"]:
+                        records.append(record)
+                        new += 1
+                if posts:
+                    marks[key] = max(high_water, max(post.get("created_utc", 0) for post in posts))
+                logger.info(f"r/{subreddit} '{term}': {len(posts)} posts since the last run, {new} new")
+        return records, marks
+
+
+def apply_delta(rag, records: List[Dict]) -> Dict[str, int]:
+    """Add new posts to a loaded (not memory-mapped) index, keeping every other document"""
+    return rag.update_vector_store(rag.process_reddit_data(records), remove_missing=False)
+
+
+def update_index(root: str, records: List[Dict], delta_file: str, offline: bool = False, keep: int = 3) -> str:
+    """Apply the delta to the current index version under root and publish the result as a new version"""
+    from ragsystem import UmrahRAGSystem
+
+    with index_versions.build_lock(root):
+        if offline:
+            from embeddings import HashEmbeddings
+            rag = UmrahRAGSystem("offline", embeddings=HashEmbeddings(), llm=object())
+        else:
+            rag = UmrahRAGSystem(os.getenv("GOOGLE_API_KEY", "your-api-key-here"))
+        current = index_versions.resolve(root)
+        if current is None or not rag.load_vector_store(current) or rag.doc_manifest is None:
+            raise RuntimeError(f"No index with a document manifest under {root}; build one with build_index.py")
+        index_model = (rag.artifact or {}).get("embedding_model")
+        if index_model != rag.embeddings.model_name:
+            raise RuntimeError(f"Index at {current} was embedded with {index_model}, not "
+                               f"{rag.embeddings.model_name}; rebuild it with build_index.py")
+
+        stats = apply_delta(rag, records)
+        artifact = rag.artifact or {}
+        corpus_hash = index_versions.file_hash(delta_file)
+        info = {key: artifact[key] for key in ["data_file", "requested_index_type"] if key in artifact}
+        # The index no longer matches the data file alone, so build_index.py will not skip the next build
+        info.update({"corpus_hash": corpus_hash, "embedding_model": rag.embeddings.model_name,
+                     "reddit_delta": {"file": os.path.abspath(delta_file), **stats}})
+
+        name = index_versions.version_name(corpus_hash)
+        final_path = index_versions.version_path(root, name)
+        partial_path = os.path.join(os.path.dirname(final_path), f".{name}.partial")
+        shutil.rmtree(partial_path, ignore_errors=True)
+        rag.save_vector_store(partial_path, info, index_type=artifact.get("requested_index_type", "flat"))
+        os.replace(partial_path, final_path)
+        index_versions.publish(root, name)
+        index_versions.prune(root, keep)
+        return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--state", default="reddit_state.json", help="high-water marks and seen post ids")
+    parser.add_argument("--output", default="reddit_delta.jsonl", help="where this run's new records go")
+    parser.add_argument("--append-to", help="scraped data file (JSONL) to append the new records to")
+    parser.add_argument("--index-root", help="apply the new records to this index root and publish a version")
+    parser.add_argument("--offline", action="store_true", help="use the local hash embeddings for --index-root")
+    parser.add_argument("--page-size", type=int, default=MAX_PAGE_SIZE)
+    parser.add_argument("--max-pages", type=int, default=10, help="pages per query; bounds the first backfill")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between requests to Reddit")
+    parser.add_argument("--stand-in", action="store_true", help="ingest from the local Reddit stand-in")
+    parser.add_argument("--posts", type=int, default=250, help="posts per subreddit on the stand-in")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    server = None
+    base_url = UmrahDataScraper.REDDIT_BASE_URL
+    if args.stand_in:
+        import bench_scraper
+        bench_scraper.StandInHandler.reddit_posts = args.posts
+        server = bench_scraper.start_stand_in(0.0)
+        base_url = f"http://127.0.0.3:{server.server_address[1]}"
+
+    state = IngestState(args.state)
+    ingester = RedditIngester(state, base_url, page_size=args.page_size, max_pages=args.max_pages,
+                              fetcher=ConcurrentFetcher(min_interval=0.0 if args.stand_in else args.interval))
+    try:
+        records, marks = ingester.ingest()
+    finally:
+        if server:
+            server.shutdown()
+
+    with JsonlWriter(args.output) as writer:
+        for record in records:
+            writer.write("reddit_reviews", record)
+    if records and args.index_root:
+        try:
+            name = update_index(args.index_root, records, args.output, args.offline)
+        except (RuntimeError, index_versions.BuildInProgress) as e:
+            logger.error(str(e))
+            return 1
+        logger.info(f"Published index version {name} with {len(records)} new posts")
+    # Appended only once the index has them: a failed update leaves the data file as it was
+    if records and args.append_to:
+        append_records(args.append_to, "reddit_reviews", records)
+
+    # Saved last: a run that fails before this point is repeated from the old marks
+    state.high_water = marks
+    state.save()
+    print(f"{len(records)} new posts written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import gzip
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ["rituals", "destinations", "hotels", "reddit_reviews"]
+
+# Newest format first; the single JSON document is the legacy format
+DATA_FILES = ["umrah_scraped_data.jsonl.gz", "umrah_scraped_data.jsonl", "umrah_scraped_data.json"]
+
+
+def _open_text(filename: str, mode: str, compressed: bool = None):
+    if compressed is None:
+        compressed = filename.endswith(".gz")
+    if compressed:
+        return gzip.open(filename, mode + "t", encoding="utf-8")
+    return open(filename, mode, encoding="utf-8")
+
+
+def find_scraped_data(directory: str = ".") -> Optional[str]:
+    """Return the most recently written scraped data file, preferring the streaming formats on a tie"""
+    present = [os.path.join(directory, name) for name in DATA_FILES
+               if os.path.exists(os.path.join(directory, name))]
+    if not present:
+        return None
+    # max() keeps the first of equally new files, and DATA_FILES lists the preferred format first
+    newest = max(present, key=os.path.getmtime)
+    if len(present) > 1:
+        logger.warning(f"Several scraped data files found ({', '.join(present)}); using the newest, {newest}")
+    return newest
+
+
+class JsonlWriter:
+    """Appends category-tagged records to a JSONL file (gzip when it ends in .gz) as they are scraped
+
+    Records go to "<filename>.partial" and are flushed one by one, so a crash keeps everything
+    written so far; close() moves the finished file into place.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.partial_filename = filename + ".partial"
+        self._file = _open_text(self.partial_filename, "w", compressed=filename.endswith(".gz"))
+        self._lock = threading.Lock()
+        self.counts = {category: 0 for category in CATEGORIES}
+
+    def write(self, category: str, record: Dict[str, Any]):
+        line = json.dumps(dict(record, category=category), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.counts[category] = self.counts.get(category, 0) + 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            os.replace(self.partial_filename, self.filename)
+        logger.info(f"Data saved to {self.filename}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            with self._lock:
+                self._file.close()
+            logger.error(f"Scrape failed, partial data kept in {self.partial_filename}")
+
+
+def append_records(filename: str, category: str, records: Iterable[Dict[str, Any]]):
+    """Append category-tagged records to an existing JSONL or gzipped JSONL data file"""
+    with _open_text(filename, "a") as f:
+        for record in records:
+            f.write(json.dumps(dict(record, category=category), ensure_ascii=False) + "\n")
+
+
+def iter_records(filename: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (category, record) pairs from a JSONL, gzipped JSONL or legacy JSON data file
+
+    Destinations are yielded one section at a time with their city, whatever the file format.
+    """
+    if filename.endswith(".json"):
+        with open(filename, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for category in CATEGORIES:
+            for record in data.get(category, []):
+                if category == "destinations":
+                    for section in record.get("sections", []):
+                        yield category, dict(section, city=record["city"])
+                else:
+                    yield category, record
+        return
+
+    with _open_text(filename, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can truncate the last line; everything before it is still good
+                logger.warning(f"Skipping unreadable line {line_number} in {filename}")
+                continue
+            yield record.pop("category"), record
@@ -1,215 +1,508 @@
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString, SoupStrainer
 import json
-import time
 from typing import List, Dict, Any
 import logging
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import re
+import hashlib
+import threading
+from urllib.parse import urldefrag
+from fetcher import ConcurrentFetcher
+from http_cache import HTTPCache, CachingSession
+from scraped_data import CATEGORIES, JsonlWriter
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+# lxml builds the tree several times faster than the stdlib parser; fall back to it when lxml is missing
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Parsed records cached for 304 responses are only reused by the code and backend that produced them
+with open(__file__, 'rb') as _source:
+    PARSER_VERSION = hashlib.sha256(_source.read() + HTML_PARSER.encode('utf-8')).hexdigest()[:12]
+
+SLUG_SEPARATOR = re.compile(r'[^a-z0-9]+')
+CONTENT_CLASS = re.compile('content|main')
+HOTEL_CARD_CLASS = re.compile('hotel|property|listing')
+HOTEL_NAME_TAGS = {'h2', 'h3', 'h4'}
+HOTEL_NAME_CLASS = re.compile('title|name')
+HOTEL_STARS_CLASS = re.compile('star|rating')
+HOTEL_AREA_TEXT = re.compile('Area|District|Location')
+HOTEL_DISTANCE_TEXT = re.compile('meter|km|Haram')
+# Prices are read from a price element, else from the first text naming a currency next to an amount
+# (that text alone: its parent may be the whole card)
+HOTEL_PRICE_CLASS = re.compile('price')
+HOTEL_PRICE_TEXT = re.compile(r'(?:SAR|SR|USD|\$)\s*\d|\d\s*(?:SAR|SR|USD)\b')
+HOTEL_AMENITIES_CLASS = re.compile('amenit|facilit')
+DIGITS = re.compile(r'(\d+)')
+ROOM_TYPES = [(room_type, re.compile(room_type, re.I))
+              for room_type in ["Kaaba view", "Haram view", "walking distance", "shuttle", "prayer hall"]]
+
+# Only these elements and their contents are built into a tree; the rest of the page is skipped
+MAIN_ELEMENT = SoupStrainer('main')
+CONTENT_DIVS = SoupStrainer('div', class_=CONTENT_CLASS)
+HOTEL_CARDS = SoupStrainer('div', class_=HOTEL_CARD_CLASS)
+
+def group_by_page(items: List[Dict]) -> List[Dict]:
+    """Group section requests by their URL without fragment, since fragments never reach the server"""
+    pages = {}
+    for item in items:
+        page_url, fragment = urldefrag(item["url"])
+        page = pages.setdefault(page_url, {"url": page_url, "sections": []})
+        page["sections"].append(dict(item, anchor=fragment or None))
+    return list(pages.values())
+
+def slugify(text: str) -> str:
+    """Turn heading text into the anchor form used in Nusuk URLs"""
+    return SLUG_SEPARATOR.sub('-', text.lower()).strip('-')
+
+def find_main_content(content: bytes):
+    """The first <main> of a page, else its first content div, parsed without the rest of the page"""
+    main_content = BeautifulSoup(content, HTML_PARSER, parse_only=MAIN_ELEMENT).find('main')
+    if main_content is None:
+        main_content = BeautifulSoup(content, HTML_PARSER, parse_only=CONTENT_DIVS).find('div', class_=CONTENT_CLASS)
+    return main_content
+
+def find_section(soup, anchor: str) -> List:
+    """Return the elements that make up the section an anchor points at, by element id or heading"""
+    target = soup.find(id=anchor)
+    if target is None:
+        for heading in soup.find_all(HEADING_TAGS):
+            if slugify(heading.get_text(strip=True)) == anchor:
+                target = heading
+                break
+    if target is None:
+        return []
+    
+    if target.name not in HEADING_TAGS:
+        return [target]
+    
+    # A heading anchor owns its following siblings up to the next heading of the same or higher level
+    level = int(target.name[1])
+    elements = [target]
+    for sibling in target.find_next_siblings():
+        if sibling.name in HEADING_TAGS and int(sibling.name[1]) <= level:
+            break
+        if sibling.get('id'):
+            break
+        elements.append(sibling)
+    return elements
+
+def split_sections(main_content, anchors: List[str]) -> Dict[str, List]:
+    """Map each anchor on a page to its own elements, plus the ids of every claimed element
+
+    The None anchor (the page itself) maps to the whole main content; callers skip claimed elements.
+    """
+    sections = {}
+    claimed = set()
+    for anchor in anchors:
+        if anchor is None:
+            continue
+        elements = find_section(main_content, anchor)
+        if not elements:
+            logger.warning(f"Section #{anchor} not found on page")
+        sections[anchor] = elements
+        claimed.update(id(elem) for elem in elements)
+    
+    if None in anchors:
+        sections[None] = [main_content]
+    return sections, claimed
+
+def is_claimed(elem, claimed: set) -> bool:
+    """True if the element sits inside an element that belongs to an anchored section"""
+    if id(elem) in claimed:
+        return True
+    return any(id(parent) in claimed for parent in elem.parents)
+
+def class_matches(tag, pattern) -> bool:
+    """True if any of the tag's classes matches, as find(class_=pattern) tests them"""
+    classes = tag.get('class')
+    if not classes:
+        return False
+    if isinstance(classes, str):
+        classes = [classes]
+    return any(pattern.search(value) for value in classes) or pattern.search(' '.join(classes)) is not None
+
+def extract_hotel(card, city: str) -> Dict:
+    """Read every field of a Funadiq hotel card in one walk over its descendants
+
+    Each field takes its first match in document order, as a find() per field would.
+    """
+    hotel_data = {
+        "city": city,
+        "name": "",
+        "area": "",
+        "stars": 0,
+        "distance_to_haram": "",
+        "price": "",
+        "amenities": [],
+        "room_types": [],
+        "source": "funadiq"
+    }
+    name_elem = stars_elem = area_elem = distance_elem = None
+    price_elem = price_text = amenities_elem = None
+    room_types = set()
+    for node in card.descendants:
+        if isinstance(node, NavigableString):
+            if area_elem is None and HOTEL_AREA_TEXT.search(node):
+                area_elem = node
+            if distance_elem is None and HOTEL_DISTANCE_TEXT.search(node):
+                distance_elem = node
+            if price_text is None and HOTEL_PRICE_TEXT.search(node):
+                price_text = node
+            for room_type, pattern in ROOM_TYPES:
+                if room_type not in room_types and pattern.search(node):
+                    room_types.add(room_type)
+        else:
+            if name_elem is None and node.name in HOTEL_NAME_TAGS and class_matches(node, HOTEL_NAME_CLASS):
+                name_elem = node
+            if stars_elem is None and class_matches(node, HOTEL_STARS_CLASS):
+                stars_elem = node
+            if price_elem is None and class_matches(node, HOTEL_PRICE_CLASS):
+                price_elem = node
+            if amenities_elem is None and class_matches(node, HOTEL_AMENITIES_CLASS):
+                amenities_elem = node
+    
+    if name_elem:
+        hotel_data["name"] = name_elem.get_text(strip=True)
+    if area_elem:
+        hotel_data["area"] = area_elem.parent.get_text(strip=True)
+    if stars_elem:
+        stars_match = DIGITS.search(stars_elem.get_text(strip=True))
+        if stars_match:
+            hotel_data["stars"] = int(stars_match.group(1))
+    if distance_elem:
+        hotel_data["distance_to_haram"] = distance_elem.parent.get_text(strip=True)
+    if price_elem:
+        hotel_data["price"] = price_elem.get_text(" ", strip=True)
+    elif price_text:
+        hotel_data["price"] = " ".join(price_text.split())
+    if amenities_elem:
+        items = amenities_elem.find_all('li') or [amenities_elem]
+        hotel_data["amenities"] = [text for text in (item.get_text(strip=True) for item in items) if text]
+    # Room types keep their listed order
+    hotel_data["room_types"] = [room_type for room_type, _ in ROOM_TYPES if room_type in room_types]
+    return hotel_data
+
+def reddit_post_record(post_data: Dict, subreddit: str, term: str) -> Dict:
+    """The reddit_reviews record for one post from a search.json listing"""
+    return {
+        "title": post_data.get('title', ''),
+        "content": post_data.get('selftext', ''),
+        "subreddit": subreddit,
+        "score": post_data.get('score', 0),
+        "created": datetime.fromtimestamp(post_data.get('created_utc', 0)).isoformat(),
+        "url": f"https://reddit.com{post_data.get('permalink', '')}",
+        "search_term": term
+    }
+
 class UmrahDataScraper:
-    def __init__(self):
-        self.session = requests.Session()
+    NUSUK_BASE_URL = "https://www.nusuk.sa"
+    FUNADIQ_BASE_URL = "https://www.funadiq.com"
+    REDDIT_BASE_URL = "https://www.reddit.com"
+    REDDIT_SUBREDDITS = ["islam", "hajj", "saudiarabia", "muslimlounge"]
+    REDDIT_SEARCH_TERMS = ["umrah", "makkah hotel", "madinah hotel", "umrah experience"]
+    
+    def __init__(self, max_workers: int = 8, min_interval: float = 1.0,
+                 host_intervals: Dict[str, float] = None, http_cache_dir: str = "http_cache",
+                 session: requests.Session = None):
+        # Revalidate pages with ETag/Last-Modified so unchanged pages are neither downloaded nor re-parsed;
+        # a given session (e.g. recording or replaying fixtures) is used as is
+        if session is not None:
+            self.session = session
+        elif http_cache_dir:
+            self.session = CachingSession(HTTPCache(http_cache_dir))
+        else:
+            self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        
+        # Be respectful to the servers: one request per host per interval, Reddit and Funadiq slower
+        if host_intervals is None:
+            host_intervals = {
+                "www.reddit.com": 2.0,
+                "www.funadiq.com": 2.0
+            }
+        self.fetcher = ConcurrentFetcher(
+            self.session,
+            max_workers=max_workers,
+            min_interval=min_interval,
+            host_intervals=host_intervals
+        )
         self.data = {
             "rituals": [],
             "destinations": [],
             "hotels": [],
             "reddit_reviews": []
         }
+        
+        # When set, records are streamed to this JSONL writer instead of being kept in self.data
+        self.writer = None
+        self.counts = {category: 0 for category in CATEGORIES}
+        self._counts_lock = threading.Lock()
+    
+    def emitting(self, category: str, parse):
+        """Wrap a page parser so its records are written out as soon as the page is parsed
+        
+        While streaming, records are not returned, so memory stays flat however much is scraped.
+        """
+        def parse_and_emit(job: Dict, response: requests.Response) -> List[Dict]:
+            records = parse(job, response)
+            with self._counts_lock:
+                self.counts[category] += len(records)
+            if self.writer is None:
+                return records
+            for record in records:
+                self.writer.write(category, record)
+            return []
+        
+        return parse_and_emit
+    
+    def reuse_records(self, parse):
+        """Wrap a page parser so pages revalidated with a 304 reuse the records extracted last time"""
+        cache = getattr(self.session, "cache", None)
+        if cache is None:
+            return parse
+        
+        def cached_parse(job: Dict, response: requests.Response):
+            # Records depend on the parser, its version and what the job asked for (e.g. which anchors)
+            job_hash = hashlib.sha256(json.dumps(job, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+            key = f"{parse.__name__}-{PARSER_VERSION}-{job_hash}"
+            
+            if getattr(response, "from_cache", False):
+                records = cache.get_records(job["url"], key)
+                if records is not None:
+                    return records
+            
+            records = parse(job, response)
+            if cache.lookup(job["url"]):
+                cache.put_records(job["url"], key, records)
+            return records
+        
+        return cached_parse
     
     def scrape_nusuk_rituals(self):
         """Scrape Umrah rituals from Nusuk.sa"""
         logger.info("Scraping Nusuk rituals...")
         
+        base = f"{self.NUSUK_BASE_URL}/rituals"
         ritual_sections = [
-            {"url": "https://www.nusuk.sa/rituals", "section": "main"},
-            {"url": "https://www.nusuk.sa/rituals#entrance", "section": "entrance"},
-            {"url": "https://www.nusuk.sa/rituals#access", "section": "access"},
-            {"url": "https://www.nusuk.sa/rituals#miqat", "section": "miqat"},
-            {"url": "https://www.nusuk.sa/rituals#ihram", "section": "ihram"},
-            {"url": "https://www.nusuk.sa/rituals#sanctuary", "section": "sanctuary"},
-            {"url": "https://www.nusuk.sa/rituals#tawaf", "section": "tawaf"},
-            {"url": "https://www.nusuk.sa/rituals#sai", "section": "sai"},
-            {"url": "https://www.nusuk.sa/rituals#ziyarah", "section": "ziyarah"}
+            {"url": base, "section": "main"},
+            {"url": f"{base}#entrance", "section": "entrance"},
+            {"url": f"{base}#access", "section": "access"},
+            {"url": f"{base}#miqat", "section": "miqat"},
+            {"url": f"{base}#ihram", "section": "ihram"},
+            {"url": f"{base}#sanctuary", "section": "sanctuary"},
+            {"url": f"{base}#tawaf", "section": "tawaf"},
+            {"url": f"{base}#sai", "section": "sai"},
+            {"url": f"{base}#ziyarah", "section": "ziyarah"}
         ]
         
-        for ritual in ritual_sections:
-            try:
-                response = self.session.get(ritual["url"])
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Extract content based on section
-                content_data = {
-                    "section": ritual["section"],
-                    "url": ritual["url"],
-                    "title": "",
-                    "content": "",
-                    "sub_sections": []
-                }
-                
-                # Try to find the main content area
-                main_content = soup.find('main') or soup.find('div', {'class': re.compile('content|main')})
+        # Fetch and parse each distinct page once, then split it into its anchored sections
+        for page_rituals in self.fetcher.map(
+            group_by_page(ritual_sections),
+            self.emitting("rituals", self.reuse_records(self.parse_ritual_page)),
+            label=lambda page: f"ritual page {page['url']}"
+        ):
+            self.data["rituals"].extend(page_rituals)
+    
+    def parse_ritual_page(self, page: Dict, response: requests.Response) -> List[Dict]:
+        """Extract every requested ritual section from one Nusuk page"""
+        response.raise_for_status()
+        # Try to find the main content area
+        main_content = find_main_content(response.content)
+        
+        rituals = []
+        if main_content:
+            sections, claimed = split_sections(main_content, [ritual["anchor"] for ritual in page["sections"]])
+        
+        for ritual in page["sections"]:
+            # Extract content based on section
+            content_data = {
+                "section": ritual["section"],
+                "url": ritual["url"],
+                "title": "",
+                "content": "",
+                "sub_sections": []
+            }
+            
+            if main_content:
+                anchored = ritual["anchor"] is not None
+                roots = sections[ritual["anchor"]]
+                if anchored and not roots:
+                    continue
                 
-                if main_content:
-                    # Extract title
+                # Extract title: the page heading for main, the section's own heading otherwise
+                if anchored:
+                    for root in roots:
+                        title = root if root.name in HEADING_TAGS else root.find(HEADING_TAGS)
+                        if title:
+                            content_data["title"] = title.get_text(strip=True)
+                            break
+                else:
                     title = main_content.find('h1') or main_content.find('h2')
                     if title:
                         content_data["title"] = title.get_text(strip=True)
-                    
-                    # Extract paragraphs and lists
-                    for elem in main_content.find_all(['p', 'ul', 'ol', 'h3', 'h4']):
+                
+                # Extract paragraphs and lists
+                for root in roots:
+                    blocks = [root] if root.name in ['p', 'ul', 'ol', 'h3', 'h4'] else []
+                    blocks += root.find_all(['p', 'ul', 'ol', 'h3', 'h4'])
+                    for elem in blocks:
+                        # The main section leaves anchored sections to their own records
+                        if not anchored and is_claimed(elem, claimed):
+                            continue
                         text = elem.get_text(strip=True)
-                        if text:
-                            if elem.name in ['h3', 'h4']:
-                                content_data["sub_sections"].append({"heading": text, "content": []})
+                        if not text or (anchored and text == content_data["title"]):
+                            continue
+                        if elem.name in ['h3', 'h4']:
+                            content_data["sub_sections"].append({"heading": text, "content": []})
+                        else:
+                            if content_data["sub_sections"]:
+                                content_data["sub_sections"][-1]["content"].append(text)
                             else:
-                                if content_data["sub_sections"]:
-                                    content_data["sub_sections"][-1]["content"].append(text)
-                                else:
-                                    content_data["content"] += text + "\n"
-                
-                self.data["rituals"].append(content_data)
-                logger.info(f"Scraped ritual section: {ritual['section']}")
-                time.sleep(1)  # Be respectful to the server
-                
-            except Exception as e:
-                logger.error(f"Error scraping ritual {ritual['section']}: {str(e)}")
+                                content_data["content"] += text + "\n"
+            
+            rituals.append(content_data)
+            logger.info(f"Scraped ritual section: {ritual['section']}")
+        
+        return rituals
     
     def scrape_nusuk_destinations(self):
         """Scrape destination information from Nusuk.sa"""
         logger.info("Scraping Nusuk destinations...")
         
+        makkah = f"{self.NUSUK_BASE_URL}/destination/makkah"
+        madina = f"{self.NUSUK_BASE_URL}/destination/madina"
         destinations = [
             {
                 "city": "makkah",
                 "urls": [
-                    "https://www.nusuk.sa/destination/makkah",
-                    "https://www.nusuk.sa/destination/makkah#the-grand-mosque",
-                    "https://www.nusuk.sa/destination/makkah#the-grand-mosque-services",
-                    "https://www.nusuk.sa/destination/makkah#holy-sites",
-                    "https://www.nusuk.sa/destination/makkah#shopping",
-                    "https://www.nusuk.sa/destination/makkah#restaurants-and-cafes"
+                    makkah,
+                    f"{makkah}#the-grand-mosque",
+                    f"{makkah}#the-grand-mosque-services",
+                    f"{makkah}#holy-sites",
+                    f"{makkah}#shopping",
+                    f"{makkah}#restaurants-and-cafes"
                 ]
             },
             {
                 "city": "madina",
                 "urls": [
-                    "https://www.nusuk.sa/destination/madina",
-                    "https://www.nusuk.sa/destination/madina#prophet-mosque-services",
-                    "https://www.nusuk.sa/destination/madina#attractions",
-                    "https://www.nusuk.sa/destination/madina#shopping",
-                    "https://www.nusuk.sa/destination/madina#restaurants-and-cafes"
+                    madina,
+                    f"{madina}#prophet-mosque-services",
+                    f"{madina}#attractions",
+                    f"{madina}#shopping",
+                    f"{madina}#restaurants-and-cafes"
                 ]
             }
         ]
         
+        # Fetch and parse each city page once, then split it into its anchored sections
+        pages = []
+        for dest in destinations:
+            for page in group_by_page([{"url": url} for url in dest["urls"]]):
+                page["city"] = dest["city"]
+                pages.append(page)
+        
+        sections = []
+        for page_sections in self.fetcher.map(
+            pages,
+            self.emitting("destinations", self.reuse_records(self.parse_destination_page)),
+            label=lambda page: f"destination {page['url']}"
+        ):
+            sections.extend(page_sections)
+        
+        # The legacy JSON document nests sections under their city
         for dest in destinations:
+            if self.writer is not None:
+                break
             city_data = {
                 "city": dest["city"],
                 "sections": []
             }
+            for section in sections:
+                if section["city"] == dest["city"]:
+                    city_data["sections"].append({k: v for k, v in section.items() if k != "city"})
+            self.data["destinations"].append(city_data)
+    
+    def parse_destination_page(self, page: Dict, response: requests.Response) -> List[Dict]:
+        """Extract every requested section from one Nusuk destination page, tagged with its city"""
+        response.raise_for_status()
+        # Extract content
+        main_content = find_main_content(response.content)
+        
+        page_sections = []
+        if main_content:
+            sections, claimed = split_sections(main_content, [item["anchor"] for item in page["sections"]])
+        
+        for item in page["sections"]:
+            section_data = {
+                "city": page["city"],
+                "url": item["url"],
+                "section": item["anchor"] or "main",
+                "content": ""
+            }
             
-            for url in dest["urls"]:
-                try:
-                    response = self.session.get(url)
-                    response.raise_for_status()
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    section_data = {
-                        "url": url,
-                        "section": url.split('#')[-1] if '#' in url else "main",
-                        "content": ""
-                    }
-                    
-                    # Extract content
-                    main_content = soup.find('main') or soup.find('div', {'class': re.compile('content|main')})
-                    if main_content:
-                        section_data["content"] = main_content.get_text(strip=True)
-                    
-                    city_data["sections"].append(section_data)
-                    logger.info(f"Scraped {dest['city']} - {section_data['section']}")
-                    time.sleep(1)
-                    
-                except Exception as e:
-                    logger.error(f"Error scraping destination {url}: {str(e)}")
+            if main_content:
+                roots = sections[item["anchor"]]
+                if item["anchor"] is not None and not roots:
+                    continue
+                
+                # Same text as get_text(strip=True); main leaves anchored sections to their own records
+                section_data["content"] = "".join(
+                    text.strip()
+                    for root in roots
+                    for text in root.strings
+                    if text.strip() and (item["anchor"] is not None or not is_claimed(text, claimed))
+                )
             
-            self.data["destinations"].append(city_data)
+            page_sections.append(section_data)
+            logger.info(f"Scraped {page['city']} - {section_data['section']}")
+        
+        return page_sections
     
     def scrape_funadiq_hotels(self):
         """Scrape hotel data from Funadiq"""
         logger.info("Scraping Funadiq hotels...")
         
         cities = [
-            {"name": "makkah", "url": "https://www.funadiq.com/properties_makkah"},
-            {"name": "madinah", "url": "https://www.funadiq.com/properties_madinah"}
+            {"name": "makkah", "url": f"{self.FUNADIQ_BASE_URL}/properties_makkah"},
+            {"name": "madinah", "url": f"{self.FUNADIQ_BASE_URL}/properties_madinah"}
         ]
         
-        for city in cities:
-            try:
-                response = self.session.get(city["url"])
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Find hotel listings
-                hotels = soup.find_all('div', class_=re.compile('hotel|property|listing'))
-                
-                for hotel in hotels:
-                    hotel_data = {
-                        "city": city["name"],
-                        "name": "",
-                        "area": "",
-                        "stars": 0,
-                        "distance_to_haram": "",
-                        "price": "",
-                        "amenities": [],
-                        "room_types": [],
-                        "source": "funadiq"
-                    }
-                    
-                    # Extract hotel name
-                    name_elem = hotel.find(['h2', 'h3', 'h4'], class_=re.compile('title|name'))
-                    if name_elem:
-                        hotel_data["name"] = name_elem.get_text(strip=True)
-                    
-                    # Extract area
-                    area_elem = hotel.find(text=re.compile('Area|District|Location'))
-                    if area_elem:
-                        hotel_data["area"] = area_elem.parent.get_text(strip=True)
-                    
-                    # Extract stars
-                    stars_elem = hotel.find(class_=re.compile('star|rating'))
-                    if stars_elem:
-                        stars_text = stars_elem.get_text(strip=True)
-                        stars_match = re.search(r'(\d+)', stars_text)
-                        if stars_match:
-                            hotel_data["stars"] = int(stars_match.group(1))
-                    
-                    # Extract distance to Haram
-                    distance_elem = hotel.find(text=re.compile('meter|km|Haram'))
-                    if distance_elem:
-                        hotel_data["distance_to_haram"] = distance_elem.parent.get_text(strip=True)
-                    
-                    # Extract special room types
-                    for room_type in ["Kaaba view", "Haram view", "walking distance", "shuttle", "prayer hall"]:
-                        if hotel.find(text=re.compile(room_type, re.I)):
-                            hotel_data["room_types"].append(room_type)
-                    
-                    if hotel_data["name"]:  # Only add if we found a name
-                        self.data["hotels"].append(hotel_data)
-                
-                logger.info(f"Scraped {len(hotels)} hotels from {city['name']}")
-                time.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"Error scraping Funadiq {city['name']}: {str(e)}")
+        for city_hotels in self.fetcher.map(
+            cities,
+            self.emitting("hotels", self.reuse_records(self.parse_hotel_listing)),
+            label=lambda city: f"Funadiq {city['name']}"
+        ):
+            self.data["hotels"].extend(city_hotels)
+    
+    def parse_hotel_listing(self, city: Dict, response: requests.Response) -> List[Dict]:
+        """Extract all hotels from a Funadiq city listing page"""
+        response.raise_for_status()
+        # Find hotel listings; only the cards are parsed into a tree
+        soup = BeautifulSoup(response.content, HTML_PARSER, parse_only=HOTEL_CARDS)
+        hotels = soup.find_all('div', class_=HOTEL_CARD_CLASS)
+        city_hotels = []
+        
+        for hotel in hotels:
+            hotel_data = extract_hotel(hotel, city["name"])
+            if hotel_data["name"]:  # Only add if we found a name
+                city_hotels.append(hotel_data)
+        
+        logger.info(f"Scraped {len(hotels)} hotels from {city['name']}")
+        return city_hotels
     
     def scrape_reddit_reviews(self):
         """Scrape Reddit posts about Umrah experiences"""
@@ -217,69 +510,104 @@ class UmrahDataScraper:
         
         # Note: For production, you should use Reddit API with proper authentication
         # This is a simplified example
-        subreddits = ["islam", "hajj", "saudiarabia", "muslimlounge"]
-        search_terms = ["umrah", "makkah hotel", "madinah hotel", "umrah experience"]
+        # Using Reddit's JSON endpoint (limited without API key)
+        jobs = [
+            {
+                "subreddit": subreddit,
+                "term": term,
+                "url": f"{self.REDDIT_BASE_URL}/r/{subreddit}/search.json?q={term}&restrict_sr=1&limit=10",
+                "headers": {'User-Agent': 'UmrahBot/1.0'}
+            }
+            for subreddit in self.REDDIT_SUBREDDITS
+            for term in self.REDDIT_SEARCH_TERMS
+        ]
         
         reddit_data = []
-        
-        for subreddit in subreddits:
-            for term in search_terms:
-                try:
-                    # Using Reddit's JSON endpoint (limited without API key)
-                    url = f"https://www.reddit.com/r/{subreddit}/search.json?q={term}&restrict_sr=1&limit=10"
-                    response = self.session.get(url, headers={'User-Agent': 'UmrahBot/1.0'})
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        posts = data.get('data', {}).get('children', [])
-                        
-                        for post in posts:
-                            post_data = post.get('data', {})
-                            reddit_post = {
-                                "title": post_data.get('title', ''),
-                                "content": post_data.get('selftext', ''),
-                                "subreddit": subreddit,
-                                "score": post_data.get('score', 0),
-                                "created": datetime.fromtimestamp(post_data.get('created_utc', 0)).isoformat(),
-                                "url": f"https://reddit.com{post_data.get('permalink', '')}",
-                                "search_term": term
-                            }
-                            
-                            if reddit_post["title"] and reddit_post["content"]:
-                                reddit_data.append(reddit_post)
-                        
-                        logger.info(f"Found {len(posts)} posts for '{term}' in r/{subreddit}")
-                        time.sleep(2)  # Respect rate limits
-                        
-                except Exception as e:
-                    logger.error(f"Error scraping Reddit {subreddit}/{term}: {str(e)}")
+        for posts in self.fetcher.map(
+            jobs,
+            self.emitting("reddit_reviews", self.reuse_records(self.parse_reddit_search)),
+            label=lambda job: f"Reddit {job['subreddit']}/{job['term']}"
+        ):
+            reddit_data.extend(posts)
         
         self.data["reddit_reviews"] = reddit_data
     
+    def parse_reddit_search(self, job: Dict, response: requests.Response) -> List[Dict]:
+        """Extract posts from one Reddit search.json response"""
+        subreddit = job["subreddit"]
+        term = job["term"]
+        reddit_data = []
+        
+        if response.status_code == 200:
+            data = response.json()
+            posts = data.get('data', {}).get('children', [])
+            
+            for post in posts:
+                reddit_post = reddit_post_record(post.get('data', {}), subreddit, term)
+                if reddit_post["title"] and reddit_post["content"]:
+                    reddit_data.append(reddit_post)
+            
+            logger.info(f"Found {len(posts)} posts for '{term}' in r/{subreddit}")
+        
+        return reddit_data
+    
     def save_data(self, filename="umrah_scraped_data.json"):
         """Save scraped data to JSON file"""
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(self.data, f, ensure_ascii=False, indent=2)
         logger.info(f"Data saved to {filename}")
     
-    def scrape_all(self):
-        """Run all scraping functions"""
+    def scrape_all(self, parallel: bool = True, filename="umrah_scraped_data.jsonl"):
+        """Run all scraping functions, concurrently unless parallel is False
+        
+        Records are streamed to a JSONL file (gzip-compressed for .jsonl.gz) as they are scraped;
+        a .json filename keeps the legacy single-document format.
+        """
         logger.info("Starting comprehensive scraping...")
         
-        self.scrape_nusuk_rituals()
-        self.scrape_nusuk_destinations()
-        self.scrape_funadiq_hotels()
-        self.scrape_reddit_reviews()
+        if filename.endswith(".json"):
+            self._run_scrapers(parallel)
+            self.save_data(filename)
+        else:
+            with JsonlWriter(filename) as writer:
+                self.writer = writer
+                try:
+                    self._run_scrapers(parallel)
+                finally:
+                    self.writer = None
         
-        self.save_data()
         logger.info("Scraping completed!")
         
         # Print summary
         print(f"\nScraping Summary:")
-        print(f"- Rituals: {len(self.data['rituals'])} sections")
-        print(f"- Destinations: {len(self.data['destinations'])} cities")
-        print(f"- Hotels: {len(self.data['hotels'])} properties")
-        print(f"- Reddit Reviews: {len(self.data['reddit_reviews'])} posts")
+        print(f"- Rituals: {self.counts['rituals']} sections")
+        print(f"- Destinations: {self.counts['destinations']} sections")
+        print(f"- Hotels: {self.counts['hotels']} properties")
+        print(f"- Reddit Reviews: {self.counts['reddit_reviews']} posts")
+        
+        cache = getattr(self.session, "cache", None)
+        if cache and cache.stats:
+            print(f"\nHTTP Cache:")
+            for host, stats in sorted(cache.stats.items()):
+                print(f"- {host}: {stats['hits']} hits, {stats['misses']} misses, "
+                      f"{stats['bytes_saved'] / 1024:.1f} KiB saved")
+    
+    def _run_scrapers(self, parallel: bool):
+        scrapers = [
+            self.scrape_nusuk_rituals,
+            self.scrape_nusuk_destinations,
+            self.scrape_funadiq_hotels,
+            self.scrape_reddit_reviews
+        ]
+        
+        if parallel:
+            # Each scraper fans out over the shared fetcher; hosts are rate limited independently
+            with ThreadPoolExecutor(max_workers=len(scrapers)) as executor:
+                for future in [executor.submit(scraper) for scraper in scrapers]:
+                    future.result()
+        else:
+            for scraper in scrapers:
+                scraper()
 
 if __name__ == "__main__":
     scraper = UmrahDataScraper()
@@ -0,0 +1,246 @@
+"""Record scraper HTTP responses to disk and replay them through the scrapers offline.
+
+record runs a full scrape through a recording session and saves every
+response (body, status, content type, encoding) plus the records extracted
+from them as the golden output. check replays the fixtures through the
+current parsers, with no network, and fails if any record differs from the
+golden output; update-golden accepts the current output after an intended
+change. --stand-in records from bench_scraper.py's local server instead of
+the real sites, with --hotels cards per Funadiq listing.
+
+    python scraper_fixtures.py record --fixtures scraper_fixtures
+    python scraper_fixtures.py check --fixtures scraper_fixtures
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urldefrag
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from scraper import UmrahDataScraper
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+GOLDEN_FILENAME = "golden.json"
+
+# Base URL attributes of UmrahDataScraper; replays point the scraper where the fixtures came from
+BASE_URL_ATTRIBUTES = ["NUSUK_BASE_URL", "FUNADIQ_BASE_URL", "REDDIT_BASE_URL"]
+
+
+class FixtureMissing(KeyError):
+    """A replayed scrape requested a URL that was never recorded"""
+
+
+def use_utc():
+    """Reddit timestamps are rendered in local time; pin it so golden output matches on any machine"""
+    os.environ["TZ"] = "UTC"
+    if hasattr(time, "tzset"):
+        time.tzset()
+
+
+class FixtureStore:
+    """Recorded responses on disk: a manifest keyed by URL and one body file per response"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_FILENAME)
+        self.golden_path = os.path.join(directory, GOLDEN_FILENAME)
+        self.responses: Dict[str, Dict[str, Any]] = {}
+        self.base_urls: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            self.responses = manifest["responses"]
+            self.base_urls = manifest.get("base_urls", {})
+
+    @staticmethod
+    def key(url: str) -> str:
+        # Fragments never reach the server, so they never tell two responses apart
+        return urldefrag(url)[0]
+
+    def add(self, url: str, response: requests.Response):
+        key = self.key(url)
+        filename = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16] + ".body"
+        os.makedirs(os.path.join(self.directory, "responses"), exist_ok=True)
+        with open(os.path.join(self.directory, "responses", filename), "wb") as f:
+            f.write(response.content)
+        with self._lock:
+            self.responses[key] = {
+                "file": filename,
+                "status": response.status_code,
+                "content_type": response.headers.get("Content-Type"),
+                "encoding": response.encoding,
+                "bytes": len(response.content)
+            }
+
+    def response(self, url: str) -> requests.Response:
+        entry = self.responses.get(self.key(url))
+        if entry is None:
+            raise FixtureMissing(url)
+        with open(os.path.join(self.directory, "responses", entry["file"]), "rb") as f:
+            body = f.read()
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response._content = body
+        response.headers = CaseInsensitiveDict({"Content-Type": entry["content_type"]} if entry["content_type"] else {})
+        response.encoding = entry["encoding"]
+        response.url = url
+        response.request = requests.Request("GET", url).prepare()
+        response.from_cache = False
+        return response
+
+    def save(self, base_urls: Dict[str, str]):
+        self.base_urls = base_urls
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "base_urls": base_urls,
+                "responses": self.responses
+            }, f, indent=2, sort_keys=True)
+
+    def load_golden(self) -> Dict[str, List[Dict]]:
+        with open(self.golden_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_golden(self, data: Dict[str, List[Dict]]):
+        with open(self.golden_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+class RecordingSession(requests.Session):
+    """Session that fetches normally and stores every GET response in a FixtureStore"""
+
+    def __init__(self, store: FixtureStore):
+        super().__init__()
+        self.store = store
+
+    def request(self, method, url, *args, **kwargs):
+        response = super().request(method, url, *args, **kwargs)
+        if method.upper() == "GET":
+            self.store.add(url, response)
+        return response
+
+
+class ReplaySession(requests.Session):
+    """Session that answers GETs from a FixtureStore and never touches the network"""
+
+    def __init__(self, store: FixtureStore):
+        super().__init__()
+        self.store = store
+
+    def request(self, method, url, *args, **kwargs):
+        if method.upper() != "GET":
+            raise FixtureMissing(f"{method} {url}")
+        return self.store.response(url)
+
+
+def replay_scraper(store: FixtureStore) -> UmrahDataScraper:
+    """A scraper wired to the fixtures: no rate limiting, base URLs as recorded"""
+    scraper = UmrahDataScraper(min_interval=0.0, host_intervals={}, session=ReplaySession(store))
+    for name, url in store.base_urls.items():
+        setattr(scraper, name, url)
+    return scraper
+
+
+def scrape(scraper: UmrahDataScraper) -> Dict[str, List[Dict]]:
+    """Run every scraper once, serially so records come out in a stable order, and return the records"""
+    # The legacy .json format keeps the records in scraper.data; the printed summary is dropped
+    with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(io.StringIO()):
+        scraper.scrape_all(parallel=False, filename=os.path.join(workdir, "scraped.json"))
+    return scraper.data
+
+
+def compare(golden: Dict[str, List[Dict]], current: Dict[str, List[Dict]]) -> List[str]:
+    """Differences between two scrapes, one line each; empty when they are identical"""
+    problems = []
+    for category in sorted(set(golden) | set(current)):
+        expected, actual = golden.get(category, []), current.get(category, [])
+        if len(expected) != len(actual):
+            problems.append(f"{category}: {len(actual)} records, golden has {len(expected)}")
+        for i, (before, after) in enumerate(zip(expected, actual)):
+            if before != after:
+                fields = sorted(key for key in set(before) | set(after) if before.get(key) != after.get(key))
+                problems.append(f"{category}[{i}]: {', '.join(fields)} differ "
+                                f"(golden {json.dumps({key: before.get(key) for key in fields})[:200]}, "
+                                f"now {json.dumps({key: after.get(key) for key in fields})[:200]})")
+    return problems
+
+
+def check(directory: str) -> Tuple[bool, List[str]]:
+    """Replay the fixtures and compare with the golden output"""
+    use_utc()
+    store = FixtureStore(directory)
+    current = scrape(replay_scraper(store))
+    # Records go through JSON on disk, so compare them the same way
+    problems = compare(store.load_golden(), json.loads(json.dumps(current)))
+    return not problems, problems
+
+
+def record(directory: str, stand_in: bool = False, hotels: int = 50, latency: float = 0.0):
+    """Scrape the live sites (or the local stand-in) once, saving responses and the golden output"""
+    use_utc()
+    store = FixtureStore(directory)
+    store.responses = {}
+    server = None
+    if stand_in:
+        import bench_scraper
+        bench_scraper.StandInHandler.hotels = hotels
+        server = bench_scraper.start_stand_in(latency)
+        scraper = UmrahDataScraper(min_interval=0.0, host_intervals={}, session=RecordingSession(store))
+        bench_scraper.point_at(scraper, server.server_address[1])
+    else:
+        scraper = UmrahDataScraper(session=RecordingSession(store))
+    try:
+        data = scrape(scraper)
+    finally:
+        if server:
+            server.shutdown()
+    store.save({name: getattr(scraper, name) for name in BASE_URL_ATTRIBUTES})
+    store.save_golden(data)
+    return store, data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["record", "check", "update-golden"])
+    parser.add_argument("--fixtures", default="scraper_fixtures", help="fixture directory")
+    parser.add_argument("--stand-in", action="store_true", help="record from the local stand-in server")
+    parser.add_argument("--hotels", type=int, default=50, help="hotel cards per stand-in Funadiq listing")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.command == "record":
+        store, data = record(args.fixtures, args.stand_in, args.hotels)
+        total = sum(entry["bytes"] for entry in store.responses.values())
+        print(f"Recorded {len(store.responses)} responses ({total / 1024:.0f} KiB) to {args.fixtures}: "
+              + ", ".join(f"{len(records)} {category}" for category, records in data.items()))
+    elif args.command == "update-golden":
+        use_utc()
+        store = FixtureStore(args.fixtures)
+        store.save_golden(scrape(replay_scraper(store)))
+        print(f"Golden output in {store.golden_path} updated from the current parsers")
+    else:
+        ok, problems = check(args.fixtures)
+        for problem in problems[:20]:
+            print(problem)
+        print("Output matches the golden records" if ok else f"{len(problems)} differences from the golden records")
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Generate a synthetic scrape in the umrah_scraped_data schema, for offline benchmarks.
+
+Records have the fields scraper.py writes (rituals with sub-sections,
+destination sections nested under their city, Funadiq hotels, Reddit posts)
+and ids that stay unique at any scale. Scale 1 is about the size of a real
+scrape; text is drawn from per-topic vocabularies, so retrieval has something
+to separate. The same scale and seed always give the same corpus.
+
+    python synthetic_corpus.py --scale 100 --output umrah_scraped_data.jsonl.gz
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Tuple
+
+from scraped_data import CATEGORIES, JsonlWriter
+
+# Records per category at scale 1, close to what a full scrape returns
+BASE_COUNTS = {"rituals": 9, "destinations": 11, "hotels": 60, "reddit_reviews": 160}
+
+RITUAL_SECTIONS = ["main", "entrance", "access", "miqat", "ihram", "sanctuary", "tawaf", "sai", "ziyarah"]
+DESTINATION_SECTIONS = {
+    "makkah": ["main", "the-grand-mosque", "the-grand-mosque-services", "holy-sites", "shopping",
+               "restaurants-and-cafes"],
+    "madina": ["main", "prophet-mosque-services", "attractions", "shopping", "restaurants-and-cafes"]
+}
+HOTEL_CITIES = ["makkah", "madinah"]
+HOTEL_AREAS = {
+    "makkah": ["Ajyad", "Ibrahim Al Khalil", "Jabal Omar", "Aziziyah", "Misfalah", "Kudai"],
+    "madinah": ["Central Area North", "Central Area South", "Bab Al Salam", "Quba", "Al Aqiq"]
+}
+HOTEL_NAMES = ["Tower", "Plaza", "Suites", "Residence", "Grand", "Palace", "Inn", "Hotel"]
+HOTEL_BRANDS = ["Al Safwa", "Dar Al Eiman", "Hilton", "Swissotel", "Pullman", "Anwar", "Taiba", "Elaf",
+                "Le Meridien", "Shaza", "Al Marwa", "Zamzam", "Dar Al Taqwa", "Movenpick", "Oberoi"]
+# The room types scraper.py recognises, in the order it lists them
+ROOM_TYPES = ["Kaaba view", "Haram view", "walking distance", "shuttle", "prayer hall"]
+AMENITIES = ["Free WiFi", "Breakfast", "Restaurant", "Prayer hall", "Laundry", "Airport transfer",
+             "24-hour front desk", "Wheelchair access", "Room service"]
+SUBREDDITS = ["islam", "hajj", "saudiarabia", "muslimlounge"]
+SEARCH_TERMS = ["umrah", "makkah hotel", "madinah hotel", "umrah experience"]
+
+VOCABULARY = {
+    "rituals": "tawaf sai ihram miqat talbiyah kaaba safa marwah zamzam niyyah halq taqsir dua intention "
+               "circuits black stone maqam ibrahim clothing prohibited state pilgrim rites",
+    "destinations": "quba uhud museum market mountain cave hira thawr history mosque visit ziyarat shopping "
+                    "restaurants cafes services gates courtyard clock tower baqi",
+    "hotels": "hotel room suite view shuttle breakfast walking distance clock tower stars price checkin",
+    "reddit_reviews": "experience crowd family tips advice wheelchair heat queue guide group booked trip "
+                      "recommend stayed elderly parents visa flight night early"
+}
+COMMON_WORDS = "umrah makkah madinah haram prayer pilgrims the and for with near during after".split()
+
+
+def sentence(rng: random.Random, category: str, words: int) -> str:
+    vocabulary = VOCABULARY[category].split()
+    text = " ".join(rng.choice(vocabulary) if rng.random() < 0.6 else rng.choice(COMMON_WORDS)
+                    for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def paragraph(rng: random.Random, category: str, sentences: int) -> str:
+    return " ".join(sentence(rng, category, rng.randint(8, 18)) for _ in range(sentences))
+
+
+def ritual(rng: random.Random, i: int) -> Dict[str, Any]:
+    base = RITUAL_SECTIONS[i % len(RITUAL_SECTIONS)]
+    section = base if i < len(RITUAL_SECTIONS) else f"{base}-{i // len(RITUAL_SECTIONS)}"
+    return {
+        "section": section,
+        "url": "https://www.nusuk.sa/rituals" if section == "main" else f"https://www.nusuk.sa/rituals#{section}",
+        "title": f"{base.replace('-', ' ').title()} guidance",
+        "content": paragraph(rng, "rituals", rng.randint(3, 8)) + "\n",
+        "sub_sections": [
+            {"heading": sentence(rng, "rituals", 4)[:-1],
+             "content": [paragraph(rng, "rituals", rng.randint(1, 3)) for _ in range(rng.randint(1, 4))]}
+            for _ in range(rng.randint(1, 5))
+        ]
+    }
+
+
+def destination_section(rng: random.Random, city: str, i: int) -> Dict[str, Any]:
+    names = DESTINATION_SECTIONS[city]
+    base = names[i % len(names)]
+    section = base if i < len(names) else f"{base}-{i // len(names)}"
+    url = f"https://www.nusuk.sa/destination/{city}"
+    return {
+        "url": url if section == "main" else f"{url}#{section}",
+        "section": section,
+        "content": paragraph(rng, "destinations", rng.randint(4, 12))
+    }
+
+
+def hotel(rng: random.Random, i: int) -> Dict[str, Any]:
+    city = HOTEL_CITIES[i % len(HOTEL_CITIES)]
+    distance = rng.choice([f"{rng.randint(50, 950)} meters to Haram", f"{rng.uniform(1, 6):.1f} km to Haram"])
+    return {
+        "city": city,
+        "name": f"{rng.choice(HOTEL_BRANDS)} {rng.choice(HOTEL_NAMES)} {i}",
+        "area": rng.choice(HOTEL_AREAS[city]),
+        "stars": rng.choice([2, 3, 3, 4, 4, 5, 5]),
+        "distance_to_haram": distance,
+        # Price text and amenity items as scraper.py reads them off a Funadiq card, in card order
+        "price": f"SAR {rng.randint(150, 4000):,} / night",
+        "amenities": sorted(rng.sample(AMENITIES, rng.randint(2, 6)), key=AMENITIES.index),
+        "room_types": sorted(rng.sample(ROOM_TYPES, rng.randint(1, 3)), key=ROOM_TYPES.index),
+        "source": "funadiq"
+    }
+
+
+def reddit_post(rng: random.Random, i: int, epoch: datetime) -> Dict[str, Any]:
+    subreddit = SUBREDDITS[i % len(SUBREDDITS)]
+    return {
+        "title": sentence(rng, "reddit_reviews", rng.randint(5, 10))[:-1],
+        "content": paragraph(rng, "reddit_reviews", rng.randint(1, 10)),
+        "subreddit": subreddit,
+        "score": int(rng.paretovariate(1.2)) - 1,
+        "created": (epoch + timedelta(minutes=37 * i)).isoformat(),
+        "url": f"https://reddit.com/r/{subreddit}/comments/syn{i:07d}/",
+        "search_term": SEARCH_TERMS[(i // len(SUBREDDITS)) % len(SEARCH_TERMS)]
+    }
+
+
+def iter_records(scale: float = 1, seed: int = 0) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (category, record) pairs as scraped_data.iter_records does, destinations one section at a time"""
+    rng = random.Random(seed)
+    counts = {category: max(1, round(count * scale)) for category, count in BASE_COUNTS.items()}
+    for i in range(counts["rituals"]):
+        yield "rituals", ritual(rng, i)
+    cities = list(DESTINATION_SECTIONS)
+    for i in range(counts["destinations"]):
+        city = cities[i % len(cities)]
+        yield "destinations", dict(destination_section(rng, city, i // len(cities)), city=city)
+    for i in range(counts["hotels"]):
+        yield "hotels", hotel(rng, i)
+    epoch = datetime(2023, 1, 1)
+    for i in range(counts["reddit_reviews"]):
+        yield "reddit_reviews", reddit_post(rng, i, epoch)
+
+
+def generate(scale: float = 1, seed: int = 0) -> Dict[str, Any]:
+    """The whole corpus as one legacy umrah_scraped_data.json document"""
+    data = {category: [] for category in CATEGORIES}
+    cities = {}
+    for category, record in iter_records(scale, seed):
+        if category == "destinations":
+            city = record.pop("city")
+            if city not in cities:
+                cities[city] = {"city": city, "sections": []}
+                data["destinations"].append(cities[city])
+            cities[city]["sections"].append(record)
+        else:
+            data[category].append(record)
+    return data
+
+
+def write(filename: str, scale: float = 1, seed: int = 0) -> Dict[str, int]:
+    """Write the corpus as legacy JSON (.json) or streamed JSONL (.jsonl, .jsonl.gz); returns record counts"""
+    if filename.endswith(".json"):
+        data = generate(scale, seed)
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        counts = {category: len(records) for category, records in data.items()}
+        counts["destinations"] = sum(len(city["sections"]) for city in data["destinations"])
+        return counts
+    with JsonlWriter(filename) as writer:
+        for category, record in iter_records(scale, seed):
+            writer.write(category, record)
+    return dict(writer.counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1, help="multiple of a real scrape's size (1 to 1000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="umrah_scraped_data.jsonl.gz")
+    args = parser.parse_args()
+    counts = write(args.output, args.scale, args.seed)
+    print(f"Wrote {args.output}: " + ", ".join(f"{count} {category}" for category, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()